@@ -0,0 +1 @@
+"""Benchmarks for the agent workshop utilities and stage workflows."""
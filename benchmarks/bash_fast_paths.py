@@ -0,0 +1,107 @@
+"""
+Per-call latency of ``bash.run`` commands: in-process fast path vs fork/exec.
+
+Every command is first run both ways and the outputs compared, so the
+benchmark doubles as a parity check against the real binaries (a mismatch
+exits with code 1). Commands the fast path declines are reported as
+``fallback``.
+
+Run with: python -m benchmarks.bash_fast_paths --root . --repeat 200
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import shlex
+import statistics
+import subprocess
+import time
+from pathlib import Path
+
+from utils.tools.fast_commands import run_in_process
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+
+COMMANDS = (
+    "pwd",
+    "ls",
+    "ls -a stages",
+    "ls README.md utils/tools",
+    "cat utils/tools/bash.py",
+    "cat missing.txt",
+    "head -n 20 README.md",
+    "tail -5 README.md",
+    "wc -l README.md",
+    "wc utils/cli.py utils/tools/bash.py",
+    "stat -c '%n %s %F %a' README.md",
+    "find stages -name '*.py'",
+    "find utils -maxdepth 1 -type f",
+    "grep -n WORKSPACE_ROOT utils/tools/bash.py",
+    "grep -rn TODO stages",
+    "grep -rl import utils",
+    "grep -c def utils/cli.py utils/streaming.py",
+)
+
+
+def _subprocess(args: list[str], root: Path) -> tuple[int, str, str]:
+    completed = subprocess.run(args, cwd=str(root), capture_output=True, check=False)
+    return (
+        completed.returncode,
+        completed.stdout.decode("utf-8", errors="replace"),
+        completed.stderr.decode("utf-8", errors="replace"),
+    )
+
+
+def _median_us(run, repeat: int) -> float:
+    timings: list[float] = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        run()
+        timings.append((time.perf_counter() - started) * 1_000_000)
+    return statistics.median(timings)
+
+
+def measure(command: str, root: Path, repeat: int) -> dict[str, object]:
+    args = shlex.split(command)
+    fast = run_in_process(args, root)
+    expected = _subprocess(args, root)
+    result: dict[str, object] = {
+        "subprocess_us": round(_median_us(lambda: _subprocess(args, root), repeat), 1),
+        "fast_path": fast is not None,
+        "matches": fast is None or fast == expected,
+    }
+    if fast is not None:
+        in_process = _median_us(lambda: run_in_process(args, root), repeat)
+        result["in_process_us"] = round(in_process, 1)
+        result["speedup"] = round(float(result["subprocess_us"]) / in_process, 1)
+    return result
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--root", type=Path, default=REPO_ROOT, help="Directory commands run in.")
+    parser.add_argument("--repeat", type=int, default=100, help="Calls per command and mode.")
+    parser.add_argument("--output", type=Path, help="Write results as JSON to this path.")
+    args = parser.parse_args(argv)
+    os.environ.setdefault("LANG", "C.UTF-8")
+
+    results: dict[str, dict[str, object]] = {}
+    print(f"{'command':<45} {'subprocess':>12} {'in-process':>12} {'speedup':>8}")
+    for command in COMMANDS:
+        summary = results[command] = measure(command, args.root.resolve(), args.repeat)
+        if summary["fast_path"]:
+            fast = f"{summary['in_process_us']:>10.1f}us {summary['speedup']:>7.1f}x"
+        else:
+            fast = f"{'fallback':>12}"
+        flag = "" if summary["matches"] else "  OUTPUT MISMATCH"
+        print(f"{command:<45} {summary['subprocess_us']:>10.1f}us {fast}{flag}")
+
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2) + "\n", encoding="utf-8")
+    return 0 if all(summary["matches"] for summary in results.values()) else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,163 @@
+"""
+Query latency of ``repo.grep`` (trigram index) vs a ``grep -rn`` subprocess.
+
+For each repository size a synthetic tree of Python-like files is generated
+in a temporary directory. The benchmark reports the time to build the index
+from scratch, the time of an incremental refresh after touching a few files,
+and the median latency of each query both ways. Every query's matches are
+compared against grep's, so the benchmark doubles as a correctness check (a
+mismatch exits with code 1).
+
+Run with: python -m benchmarks.repo_grep --sizes 1000,10000,100000
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import re
+import statistics
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+
+from utils.trigram_index import TrigramIndex, plan_query
+
+# (label, pattern, grep flags); patterns use syntax shared by grep -E and Python.
+QUERIES = (
+    ("rare literal", "handle_rare_event", ["-F"]),
+    ("common literal", "return value", ["-F"]),
+    ("rare regex", r"def [a-z]+_rare_[0-9]+\(", ["-E"]),
+    ("alternation", "needle_alpha|needle_omega", ["-E"]),
+    ("no match", "never_seen_token", ["-F"]),
+    ("ignore case", "HANDLE_RARE_EVENT", ["-F", "-i"]),
+)
+_WORDS = [f"{prefix}{index}" for prefix in ("item", "node", "value", "task", "cache") for index in range(400)]
+
+
+def _write_file(path: Path, rng: random.Random, number: int, rare: bool) -> None:
+    lines = [f'"""Module {number}."""', "", "import os", ""]
+    for function in range(8):
+        name = "_".join(rng.sample(_WORDS, 2))
+        lines.append(f"def {name}_{function}(value):")
+        for _ in range(4):
+            lines.append(f"    {rng.choice(_WORDS)} = {rng.choice(_WORDS)}(value)  # {rng.choice(_WORDS)}")
+        lines.append("    return value")
+        lines.append("")
+    if rare:
+        lines.append(f"def handle_rare_{number}(event):")
+        lines.append("    return handle_rare_event(event, needle_alpha if event else needle_omega)")
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+
+def generate_tree(root: Path, files: int, seed: int = 0) -> None:
+    rng = random.Random(seed)
+    rare = set(rng.sample(range(files), max(files // 1000, 3)))
+    for number in range(files):
+        directory = root / f"pkg{number // 1000}" / f"mod{number // 100 % 10}"
+        directory.mkdir(parents=True, exist_ok=True)
+        _write_file(directory / f"file{number}.py", rng, number, number in rare)
+
+
+def _grep(root: Path, pattern: str, flags: list[str]) -> set[tuple[str, int]]:
+    completed = subprocess.run(
+        ["grep", "-rnI", *flags, "--", pattern, "."],
+        cwd=root,
+        capture_output=True,
+        check=False,
+    )
+    matches: set[tuple[str, int]] = set()
+    for line in completed.stdout.decode("utf-8", errors="replace").splitlines():
+        path, number, _ = line.split(":", 2)
+        matches.add((path.removeprefix("./"), int(number)))
+    return matches
+
+
+def _indexed(index: TrigramIndex, pattern: str, flags: list[str]) -> set[tuple[str, int]]:
+    fixed, ignore_case = "-F" in flags, "-i" in flags
+    regex = re.compile(
+        re.escape(pattern) if fixed else pattern, re.MULTILINE | (re.IGNORECASE if ignore_case else 0)
+    )
+    query = plan_query(pattern, fixed_strings=fixed, ignore_case=ignore_case)
+    return {(path, number) for path, number, _ in index.search(regex, query)}
+
+
+def _median_ms(run, repeat: int) -> float:
+    timings: list[float] = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        run()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def measure_size(files: int, repeat: int) -> dict[str, object]:
+    with tempfile.TemporaryDirectory(prefix="repo-grep-bench-") as directory:
+        root = Path(directory)
+        generate_tree(root, files)
+        index = TrigramIndex(root)
+        started = time.perf_counter()
+        index.refresh()
+        build_s = time.perf_counter() - started
+
+        for number in range(0, files, max(files // 5, 1)):
+            path = root / f"pkg{number // 1000}" / f"mod{number // 100 % 10}" / f"file{number}.py"
+            path.write_text(path.read_text(encoding="utf-8") + "# touched\n", encoding="utf-8")
+        started = time.perf_counter()
+        refreshed = index.refresh()
+        refresh_s = time.perf_counter() - started
+
+        queries: dict[str, dict[str, object]] = {}
+        for label, pattern, flags in QUERIES:
+            expected = _grep(root, pattern, flags)
+            queries[label] = {
+                "matches": len(expected),
+                "correct": _indexed(index, pattern, flags) == expected,
+                "grep_ms": round(_median_ms(lambda: _grep(root, pattern, flags), repeat), 2),
+                "index_ms": round(_median_ms(lambda: _indexed(index, pattern, flags), repeat), 2),
+            }
+        return {
+            "files": files,
+            "build_s": round(build_s, 2),
+            "refresh_s": round(refresh_s, 3),
+            "refreshed_files": refreshed.indexed,
+            "queries": queries,
+        }
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--sizes", default="1000,10000,100000", help="Comma-separated repository sizes in files."
+    )
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per query and mode.")
+    parser.add_argument("--output", type=Path, help="Write results as JSON to this path.")
+    args = parser.parse_args(argv)
+
+    results: list[dict[str, object]] = []
+    for files in (int(size) for size in args.sizes.split(",")):
+        summary = measure_size(files, args.repeat)
+        results.append(summary)
+        print(
+            f"\n{files} files: index built in {summary['build_s']}s, "
+            f"refresh of {summary['refreshed_files']} touched file(s) in {summary['refresh_s']}s"
+        )
+        print(f"{'query':<16} {'matches':>8} {'grep -rn':>12} {'repo.grep':>12} {'speedup':>8}")
+        for label, query in summary["queries"].items():
+            speedup = query["grep_ms"] / max(query["index_ms"], 0.001)
+            flag = "" if query["correct"] else "  RESULT MISMATCH"
+            print(
+                f"{label:<16} {query['matches']:>8} {query['grep_ms']:>10.2f}ms "
+                f"{query['index_ms']:>10.2f}ms {speedup:>7.1f}x{flag}"
+            )
+
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2) + "\n", encoding="utf-8")
+    correct = all(query["correct"] for summary in results for query in summary["queries"].values())
+    return 0 if correct else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,145 @@
+"""
+Startup-time benchmark for every runnable ``stages.*`` module.
+
+Each entry point is imported in a fresh interpreter with ``-X importtime``
+several times. The median wall time and the heaviest top-level imports are
+reported, results are written as JSON, and an optional baseline comparison
+flags regressions (exit code 1).
+
+Run with: python -m benchmarks.startup --output startup.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+# Shared modules every stage imports; tracked so lazy-loading regressions show up.
+COMMON_MODULES = ("utils.cli", "utils.tools", "utils.ollama_adaptor")
+
+
+def discover_entry_points(root: Path = REPO_ROOT / "stages") -> list[str]:
+    """Return dotted names of ``stages`` modules that define a ``__main__`` block."""
+
+    modules: list[str] = []
+    for path in sorted(root.rglob("*.py")):
+        text = path.read_text(encoding="utf-8")
+        if "__name__ == \"__main__\"" not in text and "__name__ == '__main__'" not in text:
+            continue
+        relative = path.relative_to(REPO_ROOT).with_suffix("")
+        modules.append(".".join(relative.parts))
+    return modules
+
+
+def _parse_importtime(stderr: str, top: int) -> list[tuple[str, int]]:
+    """Return the ``top`` heaviest top-level imports as (module, cumulative_us)."""
+
+    entries: list[tuple[str, int]] = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = (part for part in line[len("import time:"):].split("|"))
+        if name.startswith("  ") or not cumulative.strip().isdigit():
+            continue
+        entries.append((name.strip(), int(cumulative)))
+    entries.sort(key=lambda item: item[1], reverse=True)
+    return entries[:top]
+
+
+def measure_module(module: str, repeat: int, top: int = 5) -> dict[str, object]:
+    """Import ``module`` in ``repeat`` fresh interpreters and summarise the cost."""
+
+    timings: list[float] = []
+    heaviest: list[tuple[str, int]] = []
+    error: str | None = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        completed = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            cwd=str(REPO_ROOT),
+            capture_output=True,
+            text=True,
+            check=False,
+        )
+        timings.append((time.perf_counter() - started) * 1000)
+        if completed.returncode != 0:
+            error = completed.stderr.strip().splitlines()[-1]
+            break
+        heaviest = _parse_importtime(completed.stderr, top)
+    return {
+        "median_ms": round(statistics.median(timings), 1),
+        "min_ms": round(min(timings), 1),
+        "heaviest_imports": [
+            {"module": name, "cumulative_ms": round(us / 1000, 1)} for name, us in heaviest
+        ],
+        "error": error,
+    }
+
+
+def compare_to_baseline(
+    results: dict[str, dict[str, object]],
+    baseline: dict[str, dict[str, object]],
+    tolerance: float,
+    metric: str = "median_ms",
+    unit: str = "ms",
+) -> list[str]:
+    """Return human-readable regressions where ``metric`` grew past ``tolerance``."""
+
+    regressions: list[str] = []
+    for module, current in results.items():
+        previous = baseline.get(module)
+        if not previous or previous.get(metric) is None or current.get(metric) is None:
+            continue
+        before = float(previous[metric])
+        after = float(current[metric])
+        if before and after > before * (1 + tolerance):
+            regressions.append(
+                f"{module}: {before:.1f}{unit} -> {after:.1f}{unit} (+{(after / before - 1):.0%})"
+            )
+    return regressions
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=5, help="Fresh interpreters per module.")
+    parser.add_argument("--output", type=Path, help="Write results as JSON to this path.")
+    parser.add_argument("--baseline", type=Path, help="Compare against a previous JSON result.")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.2,
+        help="Allowed relative slowdown before a module counts as a regression.",
+    )
+    args = parser.parse_args(argv)
+
+    modules = [*COMMON_MODULES, *discover_entry_points()]
+    results: dict[str, dict[str, object]] = {}
+    for module in modules:
+        results[module] = measure_module(module, args.repeat)
+        summary = results[module]
+        status = f"error: {summary['error']}" if summary["error"] else ""
+        print(f"{module:<50} {summary['median_ms']:>8.1f} ms  {status}")
+
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2) + "\n", encoding="utf-8")
+
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+        regressions = compare_to_baseline(results, baseline, args.tolerance)
+        if regressions:
+            print("\nStartup regressions:")
+            for line in regressions:
+                print(f"  - {line}")
+            return 1
+        print("\nNo startup regressions against baseline.")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
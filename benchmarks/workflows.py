@@ -0,0 +1,426 @@
+"""
+End-to-end benchmark of every stage workflow against a pluggable backend.
+
+Workflows: the Stage 0 weather agent, the Stage 1 bash explorer, the Stage 2
+MCP mentor, the Stage 3 multi-agent workflow and the Stage 3 red/blue audit.
+Each run happens in a fresh interpreter, so module state and peak RSS are per
+workflow. It reports the median wall time (agent setup included, imports
+excluded), LLM calls, turns, handoffs, tool calls, tokens, cumulative tool
+time and peak RSS. Results are written as JSON; with ``--baseline`` a wall
+time or peak RSS past the tolerance counts as a regression (exit code 1), as
+does a workflow that fails.
+
+``--backend stub`` (default) serves scripted replies from ``utils.stub_server``
+in this process, so the numbers measure the agent plumbing rather than the
+model; ``--backend ollama`` uses the hosts configured by ``OPENAI_BASE_URL`` /
+``OPENAI_BASE_URLS``. The response cache is always off.
+
+Run with: python -m benchmarks.workflows --output workflows.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import resource
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections.abc import AsyncIterator
+from contextlib import AsyncExitStack, asynccontextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+from benchmarks.startup import REPO_ROOT, compare_to_baseline
+
+
+@dataclass(frozen=True)
+class Workflow:
+    factory: str
+    prompt: str
+    # module:callable building the run context, for workflows with shared state.
+    context: str | None = None
+    max_turns: int = 20
+
+
+WORKFLOWS = {
+    "stage0_weather": Workflow(
+        "stages.stage0.demo:build_agent",
+        "What's the weather like in San Francisco today?",
+    ),
+    "stage1_bash_explorer": Workflow(
+        "stages.stage1.demo:build_agent",
+        "Give me a quick project status:\n"
+        "1. List the root directories.\n"
+        "2. Confirm whether a Dockerfile exists.\n"
+        "3. Suggest the next shell command I should run.",
+    ),
+    "stage2_mcp_mentor": Workflow(
+        "stages.stage2.demo:build_agent",
+        "Prepare a short update for the instructor:\n"
+        "1. Summarise outstanding TODO markers in stages/stage2/activity/starter_agent.py\n"
+        "2. Explain how Stage 2 builds on Stage 1 using the curriculum MCP data\n"
+        "3. Suggest the next improvement task for the learner",
+    ),
+    "stage3_multi_agent": Workflow(
+        "stages.stage3.demo:build_agent",
+        "We need a Stage 3 workflow that prepares learners for multi-agent collaboration. "
+        "Follow the coordination plan.",
+        context="stages.stage3.demo:WorkflowState",
+    ),
+    "stage3_red_blue": Workflow(
+        "benchmarks.workflows:build_red_blue",
+        "Audit the server.py file until it is secure.",
+        context="stages.stage3.activity.starter_workflow:AuditState",
+    ),
+}
+
+_FIXED_SERVER = '''import os
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+ADMIN_PASSWORD = os.environ["ADMIN_PASSWORD"]
+
+
+class Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.send_response(404)
+        self.end_headers()
+
+
+def run():
+    HTTPServer(("127.0.0.1", 8000), Handler).serve_forever()
+'''
+
+
+def _call(name: str, **arguments: Any) -> dict[str, Any]:
+    return {"name": name, "arguments": arguments}
+
+
+# Scripted replies for the stub backend. A step index counts the earlier
+# assistant turns whose tool calls all belong to the requesting agent (see
+# utils.stub_server), so agents revisited after handoffs skip ahead; the
+# unreachable steps below are placeholders that keep those indices aligned.
+STUB_SCRIPT: dict[str, Any] = {
+    "agents": {
+        "weather information": [
+            {"tool_calls": [_call("get_weather_tool", city="San Francisco")]},
+            {"content": "It is sunny and 25°C in San Francisco."},
+        ],
+        "auditing the repository": [
+            {
+                "tool_calls": [
+                    _call("bash.run_many", commands=["ls", "ls -a", "ls stages"]),
+                    _call("repo.grep", pattern="def main", path="stages"),
+                ]
+            },
+            {"content": "The root holds stages/, utils/ and a Dockerfile. Next: ls stages/stage1."},
+        ],
+        "support workshop learners": [
+            {
+                "tool_calls": [
+                    _call("repo.find_todos", relative_path="stages/stage2/activity/starter_agent.py"),
+                    _call("fetch_stage_summary", stage="stage2"),
+                ]
+            },
+            {"content": "Stage 2 adds MCP tools on top of the Stage 1 bash tools."},
+        ],
+        "Coordinate the multi-agent workflow": [
+            {"tool_calls": [_call("transfer_to_research_agent")]},
+            {"content": '{"research": "done", "plan": []}'},
+        ],
+        "Investigate the repository": [
+            {
+                "tool_calls": [
+                    _call("workflow.capture_todos", relative_path="."),
+                    _call("bash.run_many", commands=["ls", "ls stages/stage3"]),
+                    _call("repo.grep", pattern="TODO", path="stages"),
+                    _call("fetch_stage_summary", stage="stage3"),
+                ]
+            },
+            {"content": "Research notes captured; Stage 2 assets need finished TODOs."},
+        ],
+        "Orchestrate the security audit": [
+            {"tool_calls": [_call("transfer_to_red_team")]},
+            {"tool_calls": [_call("transfer_to_blue_team")]},
+            {"tool_calls": [_call("transfer_to_red_team")]},
+            {
+                "content": json.dumps(
+                    {
+                        "final_file_path": "server.py",
+                        "resolved_issues": ["command injection", "hard-coded password"],
+                        "status": "SECURE",
+                        "iterations": 1,
+                    }
+                )
+            },
+        ],
+        "You are the Red Team": [
+            {"tool_calls": [_call("fs.read_code")]},
+            {
+                "tool_calls": [
+                    _call("audit.report_issue", severity="high", description="Command injection in /ping."),
+                    _call("audit.report_issue", severity="medium", description="Hard-coded admin password."),
+                ]
+            },
+            {"tool_calls": [_call("transfer_to_ciso")]},
+            {"tool_calls": [_call("fs.read_code")]},
+            {"tool_calls": [_call("fs.read_code")]},
+            {"tool_calls": [_call("fs.read_code")]},
+            {"tool_calls": [_call("transfer_to_ciso")]},
+        ],
+        "You are the Blue Team": [
+            {"tool_calls": [_call("fs.read_code")]},
+            {"tool_calls": [_call("fs.read_code")]},
+            {"tool_calls": [_call("fs.read_code")]},
+            {
+                "tool_calls": [
+                    _call(
+                        "fs.rewrite_code",
+                        new_content=_FIXED_SERVER,
+                        fix_summary="Removed the shell call and moved the password to the environment.",
+                    )
+                ]
+            },
+            {"tool_calls": [_call("transfer_to_ciso")]},
+        ],
+    },
+    "default": [{"content": "Done."}],
+}
+STUB_TTFT = 0.02
+STUB_TOKEN_LATENCY = 0.002
+
+
+@asynccontextmanager
+async def build_red_blue() -> AsyncIterator[Any]:
+    """
+    The Stage 3 red/blue audit with the starter's TODO agents filled in.
+
+    The Blue Team rewrites ``server.py``, so the workflow audits a temporary
+    copy to leave the activity file untouched.
+    """
+
+    from agents import Agent, ModelSettings
+
+    from stages.stage3.activity import starter_workflow as activity
+    from utils.ollama_adaptor import model
+    from utils.scheduler import Priority, prioritized
+
+    original = activity.TARGET_FILE
+    with tempfile.TemporaryDirectory() as scratch:
+        activity.TARGET_FILE = Path(scratch) / original.name
+        shutil.copyfile(original, activity.TARGET_FILE)
+        try:
+            red_agent = Agent(
+                name="Red Team",
+                instructions=(
+                    "You are the Red Team. Read server.py with fs.read_code, report every security "
+                    "issue with audit.report_issue, then hand back to the CISO."
+                ),
+                tools=[activity.read_code, activity.report_issue],
+                model=model,
+                model_settings=ModelSettings(temperature=0.1),
+            )
+            blue_agent = Agent(
+                name="Blue Team",
+                instructions=(
+                    "You are the Blue Team. Read server.py with fs.read_code, fix the reported issues "
+                    "with fs.rewrite_code, then hand back to the CISO."
+                ),
+                tools=[activity.read_code, activity.rewrite_code],
+                model=model,
+                model_settings=ModelSettings(temperature=0.1),
+            )
+            ciso_agent = Agent(
+                name="CISO",
+                instructions=(
+                    "Orchestrate the security audit of 'server.py'.\n"
+                    "Phase 1: Call Red Team to scan the code.\n"
+                    "Phase 2: Check results.\n"
+                    "   - If vulnerabilities found: Call Blue Team to fix them. Then loop back to Red Team.\n"
+                    "   - If NO vulnerabilities found: Output the final SecurityReport (Status: SECURE).\n"
+                    "   - If iteration > 3: Abort and output SecurityReport (Status: UNSAFE)."
+                ),
+                handoffs=[blue_agent, red_agent],
+                model=prioritized(model, Priority.INTERACTIVE),
+                model_settings=ModelSettings(temperature=0.1),
+                output_type=activity.SecurityReport,
+            )
+            red_agent.handoffs = [ciso_agent]
+            blue_agent.handoffs = [ciso_agent]
+            yield ciso_agent
+        finally:
+            activity.TARGET_FILE = original
+
+
+async def _run_workflow(workflow: Workflow) -> dict[str, Any]:
+    """Run ``workflow`` once in this process and collect its metrics."""
+
+    from utils.batch import enter_agent, load_object
+    from utils.metrics import MetricsRunHooks
+    from utils.streaming import run_agent
+
+    hooks = MetricsRunHooks()
+    context = load_object(workflow.context)() if workflow.context else None
+    started = time.perf_counter()
+    async with AsyncExitStack() as stack:
+        agent = await enter_agent(load_object(workflow.factory), stack)
+        await run_agent(
+            agent, workflow.prompt, context=context, hooks=hooks, max_turns=workflow.max_turns
+        )
+    wall_ms = (time.perf_counter() - started) * 1000
+    tool_calls, tool_seconds = hooks.tool_latency.total()
+    return {
+        "wall_ms": round(wall_ms, 1),
+        "llm_calls": int(hooks.llm_requests.total()),
+        "turns": int(hooks.run_turns.total()[1]),
+        "handoffs": int(hooks.handoffs.total()),
+        "tool_calls": tool_calls,
+        "tool_errors": int(hooks.tool_calls.total(status="error")),
+        "tool_time_ms": round(tool_seconds * 1000, 1),
+        "input_tokens": int(hooks.prompt_tokens.total()),
+        "output_tokens": int(hooks.completion_tokens.total()),
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }
+
+
+def _run_child(name: str, result_path: Path) -> int:
+    result = asyncio.run(_run_workflow(WORKFLOWS[name]))
+    result_path.write_text(json.dumps(result), encoding="utf-8")
+    return 0
+
+
+def measure_workflow(
+    name: str, repeat: int, env: dict[str, str], timeout: float
+) -> dict[str, object]:
+    """Run workflow ``name`` in ``repeat`` fresh interpreters and summarise the runs."""
+
+    runs: list[dict[str, Any]] = []
+    error: str | None = None
+    with tempfile.TemporaryDirectory() as scratch:
+        result_path = Path(scratch) / "result.json"
+        for _ in range(repeat):
+            try:
+                completed = subprocess.run(
+                    [sys.executable, "-m", "benchmarks.workflows", "--child", name, "--result", str(result_path)],
+                    cwd=str(REPO_ROOT),
+                    env=env,
+                    capture_output=True,
+                    text=True,
+                    timeout=timeout,
+                    check=False,
+                )
+            except subprocess.TimeoutExpired:
+                error = f"timed out after {timeout:.0f}s"
+                break
+            if completed.returncode != 0:
+                lines = completed.stderr.strip().splitlines()
+                error = lines[-1] if lines else f"exit code {completed.returncode}"
+                break
+            runs.append(json.loads(result_path.read_text(encoding="utf-8")))
+    if not runs:
+        return {"median_ms": None, "error": error}
+    walls = [run["wall_ms"] for run in runs]
+    last = runs[-1]
+    return {
+        "median_ms": round(statistics.median(walls), 1),
+        "min_ms": round(min(walls), 1),
+        "runs": len(runs),
+        **{key: value for key, value in last.items() if key not in ("wall_ms", "peak_rss_mb")},
+        "peak_rss_mb": max(run["peak_rss_mb"] for run in runs),
+        "error": error,
+    }
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--backend", choices=("stub", "ollama"), default="stub")
+    parser.add_argument("--repeat", type=int, default=3, help="Fresh interpreters per workflow.")
+    parser.add_argument(
+        "--workflows",
+        default=",".join(WORKFLOWS),
+        help="Comma-separated subset of workflows to run.",
+    )
+    parser.add_argument("--timeout", type=float, default=600, help="Seconds allowed per run.")
+    parser.add_argument("--output", type=Path, help="Write results as JSON to this path.")
+    parser.add_argument("--baseline", type=Path, help="Compare against a previous JSON result.")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.2,
+        help="Allowed relative growth of wall time or peak RSS before it counts as a regression.",
+    )
+    parser.add_argument("--child", choices=tuple(WORKFLOWS), help=argparse.SUPPRESS)
+    parser.add_argument("--result", type=Path, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        return _run_child(args.child, args.result)
+
+    names = [name.strip() for name in args.workflows.split(",") if name.strip()]
+    unknown = [name for name in names if name not in WORKFLOWS]
+    if unknown:
+        parser.error(f"unknown workflow(s): {', '.join(unknown)}")
+
+    env = {**os.environ, "OLLAMA_RESPONSE_CACHE": "0"}
+    stub = None
+    if args.backend == "stub":
+        from utils.stub_server import StubConfig, run_in_thread
+
+        stub = run_in_thread(
+            StubConfig(ttft=STUB_TTFT, token_latency=STUB_TOKEN_LATENCY, script=STUB_SCRIPT)
+        )
+        env.update(OPENAI_BASE_URL=stub.base_url, OPENAI_BASE_URLS=stub.base_url)
+
+    print(
+        f"{'workflow':<22} {'wall':>10} {'llm':>4} {'turns':>5} {'tools':>5} "
+        f"{'tool time':>10} {'tokens in/out':>14} {'peak RSS':>9}"
+    )
+    results: dict[str, dict[str, object]] = {}
+    try:
+        for name in names:
+            summary = results[name] = {
+                "backend": args.backend,
+                **measure_workflow(name, args.repeat, env, args.timeout),
+            }
+            if summary["median_ms"] is None:
+                print(f"{name:<22} error: {summary['error']}")
+                continue
+            tokens = f"{summary['input_tokens']}/{summary['output_tokens']}"
+            print(
+                f"{name:<22} {summary['median_ms']:>8.1f}ms {summary['llm_calls']:>4} "
+                f"{summary['turns']:>5} {summary['tool_calls']:>5} {summary['tool_time_ms']:>8.1f}ms "
+                f"{tokens:>14} {summary['peak_rss_mb']:>6.1f} MB"
+            )
+    finally:
+        if stub is not None:
+            stub.stop()
+
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2) + "\n", encoding="utf-8")
+
+    failed = [name for name, summary in results.items() if summary["error"]]
+    if failed:
+        print(f"\nFailed workflows: {', '.join(failed)}")
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+        regressions = compare_to_baseline(results, baseline, args.tolerance)
+        regressions += compare_to_baseline(
+            results, baseline, args.tolerance, metric="peak_rss_mb", unit=" MB"
+        )
+        if regressions:
+            print("\nWorkflow regressions:")
+            for line in regressions:
+                print(f"  - {line}")
+            return 1
+        print("\nNo workflow regressions against baseline.")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -7,9 +7,10 @@ from __future__ import annotations
 
 import asyncio
 
-from agents import Agent, ModelSettings, Runner, function_tool
+from agents import Agent, ModelSettings, function_tool
 
 from utils.cli import build_verbose_hooks, parse_common_args
+from utils.streaming import run_agent
 from utils.ollama_adaptor import model
 
 
@@ -21,9 +22,8 @@ async def get_weather_tool(city: str):
     return "Sunny, 25°C"  # Mocked response for demonstration
 
 
-async def main(verbose: bool = False) -> None:
-    hooks = build_verbose_hooks(verbose)
-    explorer = Agent(
+def build_agent() -> Agent:
+    return Agent(
         name="Weather Explorer",
         instructions=(
             "You are a helpful agent that provides weather information for cities. "
@@ -33,10 +33,15 @@ async def main(verbose: bool = False) -> None:
         model_settings=ModelSettings(temperature=0.2),
     )
 
+
+async def main(verbose: bool = False, stream: bool = False) -> None:
+    hooks = build_verbose_hooks(verbose)
+    explorer = build_agent()
+
     question = "What's the weather like in San Francisco today?"
 
     print("> Asking the agent:", question)
-    result = await Runner.run(explorer, question, hooks=hooks)
+    result = await run_agent(explorer, question, hooks=hooks, stream=stream)
 
     print("\n=== Final Answer ===")
     print(result.final_output)
@@ -44,4 +49,4 @@ async def main(verbose: bool = False) -> None:
 
 if __name__ == "__main__":
     args = parse_common_args(__doc__)
-    asyncio.run(main(verbose=args.verbose))
+    asyncio.run(main(verbose=args.verbose, stream=args.stream))
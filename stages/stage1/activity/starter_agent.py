@@ -5,21 +5,28 @@ Goal: help the agent implement the `read.file` tool in
 `utils/tools/read_file.py` using the provided `bash.run` and `write.file`
 helpers.
 Run with: python -m stages.stage1.activity.starter_agent --verbose
+Add ``--context-budget 6000`` to compact stale tool outputs in long runs.
 """
 
 from __future__ import annotations
 
 import asyncio
 
-from agents import Agent, ModelSettings, Runner
+from agents import Agent, ModelSettings, RunConfig
 
-from utils.tools import run_bash_command, write_text_file
+from utils.tools import run_bash_command, write_text_edits, write_text_file
 from utils.cli import build_verbose_hooks, parse_common_args
+from utils.context_budget import HistoryManager
+from utils.streaming import run_agent
 from utils.ollama_adaptor import model
 
 TASK_FILE = "utils/tools/read_file.py"
 
-async def run_activity(verbose: bool = False) -> None:
+async def run_activity(
+    verbose: bool = False,
+    stream: bool = False,
+    context_budget: int | None = None,
+) -> None:
     hooks = build_verbose_hooks(verbose)
     write_agent = Agent(
         name="Read Tool Coach",
@@ -30,12 +37,16 @@ async def run_activity(verbose: bool = False) -> None:
         tools=[
             run_bash_command,
             write_text_file,
+            write_text_edits,
         ],
         model=model,
         model_settings=ModelSettings(temperature=0.2),
     )
 
-    result = await Runner.run(
+    # Opt-in: keep the growing bash.run/write.file history under a token budget.
+    history = HistoryManager(budgets={write_agent.name: context_budget}) if context_budget else None
+
+    result = await run_agent(
         write_agent,
         (
             # TODO: write the full prompt
@@ -43,11 +54,29 @@ async def run_activity(verbose: bool = False) -> None:
         ),
         hooks=hooks,
         max_turns=50,
+        run_config=RunConfig(call_model_input_filter=history) if history else None,
+        stream=stream,
     )
     print("\n=== Agent Report ===")
     print(result.final_output)
+    if history:
+        print(history.report())
 
 
 if __name__ == "__main__":
-    args = parse_common_args(__doc__)
-    asyncio.run(run_activity(verbose=args.verbose))
+    args = parse_common_args(
+        __doc__,
+        configure=lambda parser: parser.add_argument(
+            "--context-budget",
+            type=int,
+            metavar="TOKENS",
+            help="Compact stale tool outputs once the prompt exceeds this many tokens.",
+        ),
+    )
+    asyncio.run(
+        run_activity(
+            verbose=args.verbose,
+            stream=args.stream,
+            context_budget=args.context_budget,
+        )
+    )
@@ -20,9 +20,10 @@ from __future__ import annotations
 import asyncio
 from typing import Iterable, Sequence
 
-from agents import Agent, ModelSettings, Runner
+from agents import Agent, ModelSettings
 
 from utils.cli import build_verbose_hooks, parse_common_args
+from utils.streaming import run_agent
 from utils.ollama_adaptor import model
 from utils.tools import read_text_file
 
@@ -48,7 +49,7 @@ def _format_scenarios_for_prompt(scenarios: Iterable[tuple[str, dict[str, object
     return "\n".join(formatted)
 
 
-async def preview_read_tool(verbose: bool = False) -> None:
+async def preview_read_tool(verbose: bool = False, stream: bool = False) -> None:
     """Spin up an agent that runs the read.file tool for each scenario."""
 
     hooks = build_verbose_hooks(verbose)
@@ -73,11 +74,11 @@ async def preview_read_tool(verbose: bool = False) -> None:
         "Follow the workflow in your system instructions."
     )
 
-    result = await Runner.run(tester, prompt, hooks=hooks)
+    result = await run_agent(tester, prompt, hooks=hooks, stream=stream)
     print("\n=== Agent Report ===")
     print(result.final_output)
 
 
 if __name__ == "__main__":
     args = parse_common_args(__doc__)
-    asyncio.run(preview_read_tool(verbose=args.verbose))
+    asyncio.run(preview_read_tool(verbose=args.verbose, stream=args.stream))
@@ -7,27 +7,35 @@ from __future__ import annotations
 
 import asyncio
 
-from agents import Agent, ModelSettings, Runner
+from agents import Agent, ModelSettings
 
-from utils.tools.bash import run_bash_command
+from utils.tools.bash import run_bash_command, run_many_bash_commands
+from utils.tools.repo_grep import grep_repository
 from utils.cli import build_verbose_hooks, parse_common_args
+from utils.streaming import run_agent
 from utils.ollama_adaptor import model
 
 
-async def main(verbose: bool = False) -> None:
-    hooks = build_verbose_hooks(verbose)
-    repo_explorer = Agent(
+def build_agent() -> Agent:
+    return Agent(
         name="Bash Repo Explorer",
         instructions=(
             "You are auditing the repository. Use the bash.run tool to execute safe shell commands "
-            "such as ls, pwd, cat, head, tail, or stat. Summarise what you inspect and cite the "
+            "such as ls, pwd, cat, head, tail, or stat; when you need several independent commands, "
+            "send them together in one bash.run_many call. Use repo.grep to search file contents "
+            "across the repository. Summarise what you inspect and cite the "
             "commands you executed."
         ),
-        tools=[run_bash_command],
+        tools=[run_bash_command, run_many_bash_commands, grep_repository],
         model=model,
         model_settings=ModelSettings(temperature=0.25),
     )
 
+
+async def main(verbose: bool = False, stream: bool = False) -> None:
+    hooks = build_verbose_hooks(verbose)
+    repo_explorer = build_agent()
+
     prompt = (
         "Give me a quick project status:\n"
         "1. List the root directories.\n"
@@ -36,7 +44,7 @@ async def main(verbose: bool = False) -> None:
     )
 
     print("> Running Bash Repo Explorer...\n")
-    result = await Runner.run(repo_explorer, prompt, hooks=hooks)
+    result = await run_agent(repo_explorer, prompt, hooks=hooks, stream=stream)
 
     print("\n=== Final Answer ===")
     print(result.final_output)
@@ -44,4 +52,4 @@ async def main(verbose: bool = False) -> None:
 
 if __name__ == "__main__":
     args = parse_common_args(__doc__)
-    asyncio.run(main(verbose=args.verbose))
+    asyncio.run(main(verbose=args.verbose, stream=args.stream))
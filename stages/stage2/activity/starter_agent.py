@@ -11,11 +11,12 @@ import asyncio
 import sys
 from typing import Literal
 
-from agents import Agent, ModelSettings, Runner, function_tool
+from agents import Agent, ModelSettings, function_tool
 from agents.mcp import MCPServerStdio, MCPServerStdioParams
 from pydantic import BaseModel, Field
 
 from utils.cli import build_verbose_hooks, parse_common_args
+from utils.streaming import run_agent
 from utils.ollama_adaptor import model
 
 
@@ -60,7 +61,7 @@ WEATHER_SERVER_PARAMS = MCPServerStdioParams(
 )
 
 
-async def main(verbose: bool = False) -> None:
+async def main(verbose: bool = False, stream: bool = False) -> None:
     hooks = build_verbose_hooks(verbose)
     
     async with MCPServerStdio(
@@ -77,7 +78,7 @@ async def main(verbose: bool = False) -> None:
             "..."
         )
 
-        result = await Runner.run(weather_agent, query, hooks=hooks)
+        result = await run_agent(weather_agent, query, hooks=hooks, stream=stream)
         forecast = result.final_output_as(WeatherForecast)
 
         print("\n=== Weather Forecast (JSON) ===")
@@ -86,4 +87,4 @@ async def main(verbose: bool = False) -> None:
 
 if __name__ == "__main__":
     args = parse_common_args(__doc__)
-    asyncio.run(main(verbose=args.verbose))
\ No newline at end of file
+    asyncio.run(main(verbose=args.verbose, stream=args.stream))
\ No newline at end of file
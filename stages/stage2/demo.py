@@ -6,61 +6,49 @@ Run with: python -m stages.stage2.demo
 from __future__ import annotations
 
 import asyncio
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
 from pathlib import Path
 
 from agents import (
     Agent,
     ModelSettings,
-    Runner,
     ToolOutputText,
     function_tool,
 )
 from agents.mcp import MCPServerStdio, MCPServerStdioParams
 
 from utils.cli import build_verbose_hooks, parse_common_args
+from utils.streaming import run_agent
+from utils.todo_scanner import describe, todo_scanner
+from utils.workspace_path import get_workspace
 from utils.ollama_adaptor import model
 
-WORKSPACE_ROOT = Path("/workspace").resolve()
 REPO_ROOT = Path(__file__).resolve().parents[2]
 
 
-def _resolve_relative_path(relative_path: str) -> Path:
-    candidate = (WORKSPACE_ROOT / relative_path).resolve()
-    if not str(candidate).startswith(str(WORKSPACE_ROOT)):
-        msg = f"Path escape blocked for '{relative_path}'. Keep files inside {WORKSPACE_ROOT}."
-        raise ValueError(msg)
-    return candidate
-
-
 @function_tool(name_override="repo.find_todos")
-def find_repo_todos(relative_path: str, limit: int = 5) -> ToolOutputText:
+async def find_repo_todos(relative_path: str = ".", limit: int = 5) -> ToolOutputText:
     """
-    Return up to `limit` lines that contain TODO or FIXME in the target file.
+    Return up to `limit` lines that contain TODO or FIXME in the target file or directory.
 
     Args:
-        relative_path: File path relative to the repository root.
+        relative_path: File or directory path relative to the repository root.
         limit: Maximum number of matches to include.
     """
     try:
-        file_path = _resolve_relative_path(relative_path)
+        target = get_workspace().resolve(relative_path)
     except ValueError as exc:
         return ToolOutputText(text=str(exc))
 
-    if not file_path.exists() or not file_path.is_file():
+    if not target.exists():
         return ToolOutputText(text=f"No file found at {relative_path}")
 
-    matches: list[str] = []
-    with file_path.open("r", encoding="utf-8") as fh:
-        for idx, line in enumerate(fh, start=1):
-            if "TODO" in line or "FIXME" in line:
-                matches.append(f"L{idx}: {line.strip()}")
-            if len(matches) >= limit:
-                break
-
+    matches = await asyncio.to_thread(todo_scanner.scan, target)
     if not matches:
         return ToolOutputText(text=f"No TODO/FIXME markers in {relative_path}")
 
-    bullet_list = "\n".join(f"- {item}" for item in matches)
+    bullet_list = "\n".join(f"- {describe(match, target.is_dir())}" for match in matches[:limit])
     return ToolOutputText(text=f"TODO markers in {relative_path}:\n{bullet_list}")
 
 
@@ -71,14 +59,16 @@ CURRICULUM_SERVER_PARAMS = MCPServerStdioParams(
 )
 
 
-async def run_demo(verbose: bool = False) -> None:
-    hooks = build_verbose_hooks(verbose)
+@asynccontextmanager
+async def build_agent() -> AsyncIterator[Agent]:
+    """Yield the mentor agent while its curriculum MCP server is running."""
+
     async with MCPServerStdio(
         params=CURRICULUM_SERVER_PARAMS,
         cache_tools_list=True,
         name="Curriculum Server",
     ) as curriculum_server:
-        mentor = Agent(
+        yield Agent(
             name="Curriculum Mentor",
             instructions=(
                 "You support workshop learners. Combine the repo TODO summary with curriculum facts "
@@ -90,6 +80,10 @@ async def run_demo(verbose: bool = False) -> None:
             model_settings=ModelSettings(temperature=0.1),
         )
 
+
+async def run_demo(verbose: bool = False, stream: bool = False) -> None:
+    hooks = build_verbose_hooks(verbose)
+    async with build_agent() as mentor:
         prompt = (
             "Prepare a short update for the instructor:\n"
             "1. Summarise outstanding TODO markers in stages/stage2/activity/starter_agent.py\n"
@@ -98,7 +92,7 @@ async def run_demo(verbose: bool = False) -> None:
         )
 
         print("> Running Curriculum Mentor...\n")
-        result = await Runner.run(mentor, prompt, hooks=hooks)
+        result = await run_agent(mentor, prompt, hooks=hooks, stream=stream)
 
         print("\n=== Final Answer ===")
         print(result.final_output)
@@ -106,4 +100,4 @@ async def run_demo(verbose: bool = False) -> None:
 
 if __name__ == "__main__":
     args = parse_common_args(__doc__)
-    asyncio.run(run_demo(verbose=args.verbose))
+    asyncio.run(run_demo(verbose=args.verbose, stream=args.stream))
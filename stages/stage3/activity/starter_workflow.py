@@ -21,14 +21,16 @@ from agents import (
     Agent,
     ModelSettings,
     RunContextWrapper,
-    Runner,
     ToolOutputText,
     function_tool,
 )
 from pydantic import BaseModel
 
 from utils.cli import build_verbose_hooks, parse_common_args
+from utils.file_cache import file_cache
+from utils.streaming import run_agent
 from utils.ollama_adaptor import model
+from utils.scheduler import Priority, prioritized
 
 
 # --- Setup: The Vulnerable File ---
@@ -60,7 +62,7 @@ def read_code() -> str:
     """Read the current content of 'server.py'."""
     if not TARGET_FILE.exists():
         return "Error: server.py does not exist."
-    return TARGET_FILE.read_text(encoding="utf-8")
+    return file_cache.read_text(TARGET_FILE)
 
 
 @function_tool(name_override="fs.rewrite_code")
@@ -76,7 +78,7 @@ def rewrite_code(
         new_content: The complete Python code to write.
         fix_summary: Brief description of what was fixed.
     """
-    TARGET_FILE.write_text(new_content, encoding="utf-8")
+    file_cache.write_text(TARGET_FILE, new_content)
     
     # Clear vulnerabilities as we are attempting a fix
     count = len(ctx.context.vulnerabilities)
@@ -102,7 +104,7 @@ def report_issue(
 
 # --- Main Workflow ---
 
-async def main(verbose: bool = False) -> None:
+async def main(verbose: bool = False, stream: bool = False) -> None:
     # 1. Setup the environment
     hooks = build_verbose_hooks(verbose)
     state = AuditState()
@@ -129,7 +131,7 @@ async def main(verbose: bool = False) -> None:
             "   - If iteration > 3: Abort and output SecurityReport (Status: UNSAFE)."
         ),
         handoffs=[blue_agent, red_agent],
-        model=model,
+        model=prioritized(model, Priority.INTERACTIVE),
         model_settings=ModelSettings(temperature=0.1),
         output_type=SecurityReport,
     )
@@ -137,11 +139,12 @@ async def main(verbose: bool = False) -> None:
     # 3. Run
     print("> Starting Code Audit Simulation...\n")
     
-    result = await Runner.run(
+    result = await run_agent(
         ciso_agent, 
         "Audit the server.py file until it is secure.", 
         context=state, 
-        hooks=hooks
+        hooks=hooks,
+        stream=stream,
     )
 
     report = result.final_output_as(SecurityReport)
@@ -157,4 +160,4 @@ async def main(verbose: bool = False) -> None:
 
 if __name__ == "__main__":
     args = parse_common_args(__doc__)
-    asyncio.run(main(verbose=args.verbose))
\ No newline at end of file
+    asyncio.run(main(verbose=args.verbose, stream=args.stream))
\ No newline at end of file
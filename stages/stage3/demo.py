@@ -7,25 +7,31 @@ from __future__ import annotations
 
 import asyncio
 import sys
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
 from dataclasses import dataclass, field
+from itertools import groupby
 from pathlib import Path
 
 from agents import (
     Agent,
     ModelSettings,
     RunContextWrapper,
-    Runner,
     ToolOutputText,
     function_tool,
 )
 from agents.mcp import MCPServerStdio, MCPServerStdioParams
 
 from utils.cli import build_verbose_hooks, parse_common_args
-from utils.tools.bash import run_bash_command
+from utils.streaming import run_agent
+from utils.todo_scanner import describe, todo_scanner
+from utils.workspace_path import get_workspace
+from utils.tools.bash import run_bash_command, run_many_bash_commands
+from utils.tools.repo_grep import grep_repository
 from utils.ollama_adaptor import model
+from utils.scheduler import Priority, prioritized
 
 
-WORKSPACE_ROOT = Path("/workspace").resolve()
 REPO_ROOT = Path(__file__).resolve().parents[2]
 
 
@@ -37,52 +43,42 @@ class WorkflowState:
     action_items: list[str] = field(default_factory=list)
 
 
-def _resolve_relative_path(relative_path: str) -> Path:
-    candidate = (WORKSPACE_ROOT / relative_path).resolve()
-    if not str(candidate).startswith(str(WORKSPACE_ROOT)):
-        msg = f"Path escape blocked for '{relative_path}'."
-        raise ValueError(msg)
-    return candidate
-
-
 @function_tool(name_override="workflow.capture_todos")
-def capture_todos(
+async def capture_todos(
     ctx: RunContextWrapper[WorkflowState],
-    relative_path: str,
+    relative_path: str = ".",
     limit: int = 5,
 ) -> ToolOutputText:
     """
     Record TODO/FIXME markers for the shared context and return a formatted snippet.
 
+    Every marker under the path is recorded; only the first `limit` are returned.
+
     Args:
-        relative_path: File path relative to the workspace root.
+        relative_path: File or directory path relative to the workspace root.
         limit: Maximum number of matches to include.
     """
     try:
-        file_path = _resolve_relative_path(relative_path)
+        target = get_workspace().resolve(relative_path)
     except ValueError as exc:
         return ToolOutputText(text=str(exc))
 
-    if not file_path.is_file():
+    if not target.exists():
         return ToolOutputText(text=f"No file found at {relative_path}")
 
-    matches: list[str] = []
-    with file_path.open("r", encoding="utf-8") as fh:
-        for idx, line in enumerate(fh, start=1):
-            if "TODO" in line or "FIXME" in line:
-                matches.append(f"L{idx}: {line.strip()}")
-            if len(matches) >= limit:
-                break
-
+    matches = await asyncio.to_thread(todo_scanner.scan, target)
     if not matches:
         return ToolOutputText(text=f"No TODO markers in {relative_path}")
 
-    ctx.context.research_notes.append(
-        f"Found {len(matches)} TODO markers in {relative_path}:\n" + "\n".join(matches)
-    )
+    for path, group in groupby(matches, key=lambda match: match.path):
+        lines = [describe(match) for match in group]
+        ctx.context.research_notes.append(
+            f"Found {len(lines)} TODO markers in {path}:\n" + "\n".join(lines)
+        )
 
-    display = "\n".join(f"- {m}" for m in matches)
-    return ToolOutputText(text=f"TODO summary for {relative_path}:\n{display}")
+    display = "\n".join(f"- {describe(match, target.is_dir())}" for match in matches[:limit])
+    more = f"\n({len(matches) - limit} more recorded)" if len(matches) > limit else ""
+    return ToolOutputText(text=f"TODO summary for {relative_path}:\n{display}{more}")
 
 
 @function_tool(name_override="workflow.save_plan")
@@ -102,8 +98,10 @@ CURRICULUM_SERVER_PARAMS = MCPServerStdioParams(
 )
 
 
-async def main(verbose: bool = False) -> None:
-    hooks = build_verbose_hooks(verbose)
+@asynccontextmanager
+async def build_agent() -> AsyncIterator[Agent[WorkflowState]]:
+    """Yield the workflow coordinator while the curriculum MCP server is running."""
+
     async with MCPServerStdio(
         params=CURRICULUM_SERVER_PARAMS,
         cache_tools_list=True,
@@ -114,10 +112,13 @@ async def main(verbose: bool = False) -> None:
             handoff_description="Gathers repository signals and curriculum facts.",
             instructions=(
                 "Investigate the repository to find open TODOs and relevant workshop context. "
-                "Use the shell tool for quick file inspection and curriculum.fetch_stage_summary via MCP "
+                "Start with one workflow.capture_todos call on '.', which records every marker in the repo. "
+                "Use the shell tools for quick file inspection (batch independent commands with bash.run_many; "
+                "search file contents with repo.grep) "
+                "and curriculum.fetch_stage_summary via MCP "
                 "to enrich your notes. After the tools run, summarise findings for the planner."
             ),
-            tools=[capture_todos, run_bash_command],
+            tools=[capture_todos, run_bash_command, run_many_bash_commands, grep_repository],
             mcp_servers=[curriculum_server],
             model=model,
             model_settings=ModelSettings(temperature=0.2),
@@ -135,7 +136,7 @@ async def main(verbose: bool = False) -> None:
             model_settings=ModelSettings(temperature=0.3),
         )
 
-        coordinator = Agent(
+        yield Agent(
             name="Workflow Coordinator",
             instructions=(
                 "Coordinate the multi-agent workflow in order:\n"
@@ -144,10 +145,14 @@ async def main(verbose: bool = False) -> None:
                 "Finally, synthesize a JSON object with keys research and plan summarising the shared context."
             ),
             handoffs=[research_agent, planner_agent],
-            model=model,
+            model=prioritized(model, Priority.INTERACTIVE),
             model_settings=ModelSettings(temperature=0.05),
         )
 
+
+async def main(verbose: bool = False, stream: bool = False) -> None:
+    hooks = build_verbose_hooks(verbose)
+    async with build_agent() as coordinator:
         prompt = (
             "We need a Stage 3 workflow that prepares learners for multi-agent collaboration. "
             "Follow the coordination plan."
@@ -155,7 +160,7 @@ async def main(verbose: bool = False) -> None:
 
         state = WorkflowState()
         print("> Running multi-agent workflow...\n")
-        result = await Runner.run(coordinator, prompt, context=state, hooks=hooks)
+        result = await run_agent(coordinator, prompt, context=state, hooks=hooks, stream=stream)
 
         print("=== Final Coordinator Output ===")
         print(result.final_output)
@@ -172,4 +177,4 @@ async def main(verbose: bool = False) -> None:
 
 if __name__ == "__main__":
     args = parse_common_args(__doc__)
-    asyncio.run(main(verbose=args.verbose))
\ No newline at end of file
+    asyncio.run(main(verbose=args.verbose, stream=args.stream))
\ No newline at end of file
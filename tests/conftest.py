@@ -0,0 +1,18 @@
+from __future__ import annotations
+
+import pytest
+
+from utils import workspace_path
+from utils.file_cache import file_cache
+from utils.workspace import WorkspaceService
+
+
+@pytest.fixture
+def workspace(tmp_path, monkeypatch):
+    """Point the process-wide workspace service at an empty, unwatched ``tmp_path``."""
+
+    service = WorkspaceService(tmp_path, watch="off")
+    monkeypatch.setattr(workspace_path, "_service", service)
+    file_cache.invalidate()
+    yield service
+    file_cache.invalidate()
@@ -0,0 +1,138 @@
+from __future__ import annotations
+
+import shlex
+from types import SimpleNamespace
+
+import pytest
+
+from utils.tools import bash
+from utils.tools.bash import _cacheable, _is_read_only, _ResultCache, _walks_tree
+
+
+def _args(command: str) -> list[str]:
+    return shlex.split(command)
+
+
+@pytest.fixture
+def workspace(tmp_path, monkeypatch):
+    monkeypatch.setattr(bash, "WORKSPACE_ROOT", tmp_path)
+    (tmp_path / "notes.txt").write_text("one\n", encoding="utf-8")
+    return tmp_path
+
+
+def _completed(stdout: str) -> bash._Completed:
+    return bash._Completed(returncode=0, stdout=stdout, stderr="")
+
+
+def test_hit_while_generation_and_operands_are_unchanged(workspace):
+    cache = _ResultCache()
+    args = _args("cat notes.txt")
+    cache.put(args, 100, 1, cache.fingerprints(args), _completed("one"))
+
+    assert cache.get(args, 100, 1, cache.fingerprints(args)).stdout == "one"
+    assert cache.stats.hits == 1
+
+
+def test_generation_change_invalidates(workspace):
+    cache = _ResultCache()
+    args = _args("cat notes.txt")
+    cache.put(args, 100, 1, cache.fingerprints(args), _completed("one"))
+
+    assert cache.get(args, 100, 2, cache.fingerprints(args)) is None
+    assert cache.stats.invalidations == 1
+
+
+def test_operand_change_invalidates(workspace):
+    cache = _ResultCache()
+    args = _args("cat notes.txt")
+    cache.put(args, 100, 1, cache.fingerprints(args), _completed("one"))
+    (workspace / "notes.txt").write_text("one\ntwo\n", encoding="utf-8")
+
+    assert cache.get(args, 100, 1, cache.fingerprints(args)) is None
+
+
+def test_creating_a_missing_operand_invalidates(workspace):
+    cache = _ResultCache()
+    args = _args("cat later.txt")
+    cache.put(args, 100, 1, cache.fingerprints(args), _completed(""))
+    (workspace / "later.txt").write_text("now\n", encoding="utf-8")
+
+    assert cache.get(args, 100, 1, cache.fingerprints(args)) is None
+
+
+def test_output_limit_is_part_of_the_key(workspace):
+    cache = _ResultCache()
+    args = _args("cat notes.txt")
+    cache.put(args, 100, 1, cache.fingerprints(args), _completed("one"))
+
+    assert cache.get(args, 50, 1, cache.fingerprints(args)) is None
+
+
+def test_least_recently_used_entry_is_evicted(workspace):
+    cache = _ResultCache(max_entries=2)
+    for name in ("a", "b", "c"):
+        args = _args(f"cat {name}")
+        cache.put(args, 100, 1, cache.fingerprints(args), _completed(name))
+
+    first = _args("cat a")
+    assert cache.get(first, 100, 1, cache.fingerprints(first)) is None
+
+
+@pytest.mark.parametrize(
+    "command",
+    ["ls -la", "cat notes.txt", "find . -name '*.py'", "sed -n 1,5p f", "grep -rn foo ."],
+)
+def test_read_only_commands(command):
+    assert _is_read_only(_args(command))
+
+
+@pytest.mark.parametrize(
+    "command",
+    [
+        "find . -delete",
+        "find . -exec rm {} ;",
+        "find . -fprint out",
+        "sed -i s/a/b/ f",
+        "sed s/a/b/w out f",
+        "sed -f script.sed f",
+        "cat a > b",
+        "grep a | tee",
+        "cp a b",
+        "touch f",
+    ],
+)
+def test_writing_commands_are_not_read_only(command):
+    assert not _is_read_only(_args(command))
+
+
+@pytest.mark.parametrize(
+    ("command", "walks"),
+    [
+        ("find . -name x", True),
+        ("grep -rn foo .", True),
+        ("grep -R foo .", True),
+        ("grep --recursive foo .", True),
+        ("grep -d recurse foo .", True),
+        ("ls -R", True),
+        ("ls -la stages", False),
+        ("grep -n foo notes.txt", False),
+        ("cat notes.txt", False),
+    ],
+)
+def test_walks_tree(command, walks):
+    assert _walks_tree(_args(command)) is walks
+
+
+@pytest.mark.parametrize("mode", ["poll", "off"])
+def test_recursive_commands_are_not_cached_without_inotify(monkeypatch, mode):
+    monkeypatch.setattr(bash, "get_workspace", lambda: SimpleNamespace(mode=mode))
+
+    assert not _cacheable(_args("grep -rn foo ."))
+    assert not _cacheable(_args("find . -name x"))
+    assert _cacheable(_args("cat notes.txt"))
+
+
+def test_recursive_commands_are_cached_under_inotify(monkeypatch):
+    monkeypatch.setattr(bash, "get_workspace", lambda: SimpleNamespace(mode="inotify"))
+
+    assert _cacheable(_args("grep -rn foo ."))
@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+from agents import Agent
+from agents.usage import Usage
+
+from utils import batch
+from utils.batch import finished_ids, read_records, run_batch
+
+
+def _lines(path):
+    return [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines() if line.strip()]
+
+
+def test_finished_ids_last_line_wins_and_skips_torn_lines(tmp_path):
+    output = tmp_path / "results.jsonl"
+    output.write_text(
+        '{"id": "a", "status": "ok"}\n'
+        '{"id": "b", "status": "ok"}\n'
+        '{"id": "b", "status": "error"}\n'
+        '{"id": "c", "status": "error"}\n'
+        '{"id": "c", "status": "ok"}\n'
+        '{"id": 7, "status": "ok"}\n'
+        '{"id": "d", "stat',
+        encoding="utf-8",
+    )
+    assert finished_ids(output) == {"a", "c", "7"}
+    assert finished_ids(tmp_path / "missing.jsonl") == set()
+
+
+def test_read_records_defaults_ids_and_flags_bad_lines(tmp_path):
+    source = tmp_path / "prompts.jsonl"
+    source.write_text(
+        '{"prompt": "first"}\n'
+        "\n"
+        '{"id": "x", "prompt": "second", "context": {"k": 1}}\n'
+        "not json\n"
+        "[1, 2]\n"
+        '{"id": "empty", "prompt": ""}\n',
+        encoding="utf-8",
+    )
+    records = list(read_records(source))
+    assert [(record.id, record.prompt, record.context) for record in records[:2]] == [
+        ("1", "first", None),
+        ("x", "second", {"k": 1}),
+    ]
+    assert [record.id for record in records[2:]] == ["4", "5", "empty"]
+    assert all(record.error for record in records[2:])
+
+
+@pytest.fixture
+def fake_runs(monkeypatch):
+    prompts: list[str] = []
+
+    async def run_agent(agent, prompt, **kwargs):
+        prompts.append(prompt)
+        if prompt.startswith("fail"):
+            raise RuntimeError("model unavailable")
+        return SimpleNamespace(
+            final_output=prompt.upper(),
+            context_wrapper=SimpleNamespace(
+                usage=Usage(requests=1, input_tokens=3, output_tokens=2, total_tokens=5)
+            ),
+        )
+
+    monkeypatch.setattr(batch, "run_agent", run_agent)
+    return prompts
+
+
+def test_resume_skips_finished_ids_and_reruns_failures(tmp_path, fake_runs):
+    source = tmp_path / "prompts.jsonl"
+    output = tmp_path / "out" / "results.jsonl"
+    source.write_text(
+        "".join(
+            json.dumps({"id": key, "prompt": prompt}) + "\n"
+            for key, prompt in [("a", "one"), ("b", "fail two"), ("c", "three")]
+        ),
+        encoding="utf-8",
+    )
+
+    def factory():
+        return Agent(name="echo")
+
+    first = asyncio.run(run_batch(factory, source, output, concurrency=2))
+    assert (first.succeeded, first.failed, first.skipped) == (2, 1, 0)
+    by_id = {result["id"]: result for result in _lines(output)}
+    assert by_id["a"]["final_output"] == "ONE"
+    assert by_id["a"]["usage"]["total_tokens"] == 5
+    assert by_id["b"]["error"] == "RuntimeError: model unavailable"
+
+    # An interrupted run leaves a torn line; the fixed prompt now succeeds.
+    with output.open("a", encoding="utf-8") as handle:
+        handle.write('{"id": "c", "sta')
+    source.write_text(source.read_text(encoding="utf-8").replace("fail two", "two"), encoding="utf-8")
+    fake_runs.clear()
+
+    second = asyncio.run(run_batch(factory, source, output, concurrency=2))
+    assert (second.succeeded, second.failed, second.skipped) == (1, 0, 2)
+    assert fake_runs == ["two"]
+    assert finished_ids(output) == {"a", "b", "c"}
+    lines = output.read_text(encoding="utf-8").splitlines()
+    assert lines[-2] == '{"id": "c", "sta'
+    assert json.loads(lines[-1])["id"] == "b"
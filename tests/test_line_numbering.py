@@ -0,0 +1,123 @@
+from __future__ import annotations
+
+import asyncio
+import json
+
+import pytest
+from agents.tool_context import ToolContext
+
+from utils.file_cache import FileContentCache, file_cache
+from utils.line_index import LineIndex, split_lines
+from utils.tools import read_file
+from utils.tools.write_file import Hunk, apply_hunks
+
+# A lone \r, a CRLF and no final newline: every path must see these 5 lines.
+MIXED = b"one\rstill one\ntwo\r\nthree\n\nfour"
+MIXED_LINES = ["one\rstill one", "two", "three", "", "four"]
+
+def _read(path: str, **args) -> str:
+    context = ToolContext(context=None, tool_name="read.file", tool_call_id="call", tool_arguments="")
+    result = asyncio.run(
+        read_file.read_text_file.on_invoke_tool(context, json.dumps({"path": path, **args}))
+    )
+    return result.text
+
+
+def test_split_lines_only_breaks_on_newline():
+    assert split_lines(MIXED.decode()) == MIXED_LINES
+    assert split_lines("a\n") == ["a"]
+    assert split_lines("\n") == [""]
+
+
+def test_line_index_matches_split_lines(tmp_path):
+    target = tmp_path / "mixed.txt"
+    target.write_bytes(MIXED)
+    index = LineIndex.build(target)
+
+    assert index.line_count == len(MIXED_LINES)
+    assert index.read_lines(1, index.line_count) == MIXED_LINES
+    assert index.read_lines(2, 3) == MIXED_LINES[1:3]
+
+
+@pytest.mark.parametrize("cached_max_bytes", [1024 * 1024, 0], ids=["cached", "indexed"])
+def test_read_file_counts_lines_the_same_on_both_paths(workspace, monkeypatch, cached_max_bytes):
+    monkeypatch.setattr(read_file, "CACHED_READ_MAX_BYTES", cached_max_bytes)
+    (workspace.root / "mixed.txt").write_bytes(MIXED)
+
+    text = _read("mixed.txt", start_line=1, end_line=len(MIXED_LINES) + 1)
+
+    assert text == f"File only has {len(MIXED_LINES)} lines; requested {len(MIXED_LINES) + 1}."
+
+
+def test_read_file_rejects_paths_outside_the_workspace(workspace):
+    assert "Path escape blocked" in _read("../outside.txt")
+
+
+def test_apply_hunks_uses_the_same_line_numbers(workspace):
+    target = workspace.root / "mixed.txt"
+    target.write_bytes(MIXED)
+
+    total = apply_hunks(target, [Hunk(start_line=2, end_line=2, content="TWO\n")])
+
+    assert total == len(MIXED_LINES)
+    assert target.read_bytes() == b"one\rstill one\nTWO\nthree\n\nfour"
+
+
+def test_apply_hunks_numbers_refer_to_the_original_file(workspace):
+    target = workspace.root / "lines.txt"
+    target.write_text("1\n2\n3\n4\n", encoding="utf-8")
+
+    apply_hunks(
+        target,
+        [
+            Hunk(start_line=4, end_line=4, content="four\n"),
+            Hunk(start_line=1, end_line=2, content="one\nextra\ntwo\n"),
+        ],
+    )
+
+    assert target.read_text(encoding="utf-8") == "one\nextra\ntwo\n3\nfour\n"
+
+
+@pytest.mark.parametrize(
+    ("hunks", "message"),
+    [
+        ([Hunk(start_line=2, end_line=1, content="")], "Invalid range 2-1."),
+        (
+            [Hunk(start_line=1, end_line=2, content=""), Hunk(start_line=2, end_line=2, content="")],
+            "overlaps",
+        ),
+        ([Hunk(start_line=3, end_line=5, content="")], "File currently has 2 lines."),
+    ],
+)
+def test_apply_hunks_rejects_bad_ranges_and_leaves_the_file(workspace, hunks, message):
+    target = workspace.root / "short.txt"
+    target.write_text("a\nb\n", encoding="utf-8")
+
+    with pytest.raises(ValueError, match=message):
+        apply_hunks(target, hunks)
+
+    assert target.read_text(encoding="utf-8") == "a\nb\n"
+    assert [path.name for path in workspace.root.iterdir()] == ["short.txt"]
+
+
+def test_file_cache_translates_newlines_only_when_asked(tmp_path):
+    target = tmp_path / "mixed.txt"
+    target.write_bytes(MIXED)
+    cache = FileContentCache()
+
+    assert cache.read_text(target, newline="") == MIXED.decode()
+    assert cache.read_text(target) == target.read_text(encoding="utf-8")
+    assert cache.read_text(target, newline="") == MIXED.decode()
+    assert cache.stats.hits == 2
+
+
+def test_apply_hunks_refreshes_the_content_cache_in_place(workspace):
+    target = workspace.root / "cached.txt"
+    target.write_text("a\nb\n", encoding="utf-8")
+    file_cache.read_text(target)
+    hits = file_cache.stats.hits
+
+    apply_hunks(target, [Hunk(start_line=2, end_line=2, content="B\n")])
+
+    assert file_cache.read_text(target) == "a\nB\n"
+    assert file_cache.stats.hits == hits + 1
@@ -0,0 +1,141 @@
+from __future__ import annotations
+
+import asyncio
+from types import SimpleNamespace
+from typing import Any
+
+import pytest
+from agents import Agent, RunConfig, Runner, function_tool
+from agents.items import ModelResponse
+from agents.mcp import MCPServer
+from agents.models.interface import Model
+from agents.usage import Usage
+from mcp.types import CallToolResult, TextContent
+from mcp.types import Tool as MCPTool
+from openai.types.responses import ResponseFunctionToolCall, ResponseOutputMessage, ResponseOutputText
+
+from utils.hooks import run_scope
+from utils.metrics import MetricsRunHooks
+
+
+class _ScriptedModel(Model):
+    """Call each of ``calls`` (tool name, JSON arguments) in its own turn, then answer."""
+
+    def __init__(self, calls: list[tuple[str, str]]) -> None:
+        self.calls = list(calls)
+
+    async def get_response(self, *args: Any, **kwargs: Any) -> ModelResponse:
+        if self.calls:
+            name, arguments = self.calls.pop(0)
+            output: list[Any] = [
+                ResponseFunctionToolCall(
+                    type="function_call", name=name, arguments=arguments, call_id=f"call-{name}-{len(self.calls)}"
+                )
+            ]
+        else:
+            output = [
+                ResponseOutputMessage(
+                    id="msg",
+                    type="message",
+                    role="assistant",
+                    status="completed",
+                    content=[ResponseOutputText(type="output_text", text="done", annotations=[])],
+                )
+            ]
+        return ModelResponse(output=output, usage=Usage(requests=1), response_id=None)
+
+    def stream_response(self, *args: Any, **kwargs: Any):
+        raise NotImplementedError
+
+
+class _FakeMCPServer(MCPServer):
+    def __init__(self, raise_error: bool = False) -> None:
+        super().__init__()
+        self.raise_error = raise_error
+
+    @property
+    def name(self) -> str:
+        return "fake"
+
+    async def connect(self) -> None:
+        pass
+
+    async def cleanup(self) -> None:
+        pass
+
+    async def list_tools(self, run_context=None, agent=None) -> list[MCPTool]:
+        return [MCPTool(name="lookup", inputSchema={"type": "object", "properties": {"key": {"type": "string"}}})]
+
+    async def call_tool(self, tool_name: str, arguments: dict[str, Any] | None) -> CallToolResult:
+        if self.raise_error:
+            raise ConnectionError("server went away")
+        key = (arguments or {}).get("key")
+        if key == "missing":
+            return CallToolResult(content=[TextContent(type="text", text="Unknown key")], isError=True)
+        return CallToolResult(content=[TextContent(type="text", text=f"value of {key}")])
+
+    async def list_prompts(self):
+        return SimpleNamespace(prompts=[])
+
+    async def get_prompt(self, name, arguments=None):
+        raise NotImplementedError
+
+
+@function_tool
+def divide(a: int, b: int) -> float:
+    """Divide a by b."""
+
+    return a / b
+
+
+async def _run(agent: Agent, hooks: MetricsRunHooks) -> None:
+    # The stages disable tracing; tool spans are then no-ops.
+    with run_scope(hooks):
+        await Runner.run(agent, "go", hooks=hooks, run_config=RunConfig(tracing_disabled=True))
+
+
+def test_function_tool_failures_counted_without_failure_function():
+    hooks = MetricsRunHooks()
+    model = _ScriptedModel([("divide", '{"a": 1, "b": 0}'), ("divide", '{"a": 4, "b": 2}')])
+    asyncio.run(_run(Agent(name="calc", model=model, tools=[divide]), hooks))
+    assert hooks.tool_calls.value("divide", "error") == 1
+    assert hooks.tool_calls.value("divide", "ok") == 1
+
+
+def test_concurrent_tool_calls_are_counted_separately():
+    hooks = MetricsRunHooks()
+
+    class _Parallel(_ScriptedModel):
+        async def get_response(self, *args: Any, **kwargs: Any) -> ModelResponse:
+            if not self.calls:
+                return await super().get_response()
+            self.calls = []
+            output = [
+                ResponseFunctionToolCall(type="function_call", name="divide", arguments=arguments, call_id=call_id)
+                for call_id, arguments in (("bad", '{"a": 1, "b": 0}'), ("good", '{"a": 1, "b": 1}'))
+            ]
+            return ModelResponse(output=output, usage=Usage(requests=1), response_id=None)
+
+    asyncio.run(_run(Agent(name="calc", model=_Parallel([("x", "")]), tools=[divide]), hooks))
+    assert hooks.tool_calls.value("divide", "error") == 1
+    assert hooks.tool_calls.value("divide", "ok") == 1
+
+
+def test_mcp_results_flagged_as_errors_are_counted():
+    hooks = MetricsRunHooks()
+    model = _ScriptedModel([("lookup", '{"key": "missing"}'), ("lookup", '{"key": "stage0"}')])
+    agent = Agent(name="mentor", model=model, mcp_servers=[_FakeMCPServer()])
+    asyncio.run(_run(agent, hooks))
+    assert hooks.tool_calls.value("lookup", "error") == 1
+    assert hooks.tool_calls.value("lookup", "ok") == 1
+
+
+def test_tool_call_that_ends_the_run_is_counted():
+    hooks = MetricsRunHooks()
+    model = _ScriptedModel([("lookup", '{"key": "stage0"}')])
+    agent = Agent(name="mentor", model=model, mcp_servers=[_FakeMCPServer(raise_error=True)])
+    with pytest.raises(Exception):
+        asyncio.run(_run(agent, hooks))
+    assert hooks.tool_calls.value("lookup", "error") == 1
+    assert hooks.run_errors.total() == 1
+    assert hooks.runs_in_progress.value() == 0
@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+import pickle
+import re
+
+import pytest
+
+from utils.trigram_index import TrigramIndex, plan_query
+
+
+class _Exploit:
+    def __reduce__(self):
+        return (exec, ("raise SystemExit('unpickled')",))
+
+
+@pytest.fixture
+def repo(tmp_path):
+    root = tmp_path / "repo"
+    root.mkdir()
+    (root / "a.py").write_text("def fetch_weather():\n    return 'sunny'\n")
+    (root / "b.py").write_text("print('hello')\n")
+    (root / "big.txt").write_text("fetch_weather\n" * 10)
+    return root
+
+
+def _search(index, pattern):
+    return list(index.search(re.compile(pattern, re.MULTILINE), plan_query(pattern)))
+
+
+def test_saved_index_round_trips(repo, tmp_path):
+    cache = tmp_path / "index.bin"
+    first = TrigramIndex(repo, cache)
+    first.refresh()
+    first.save()
+
+    loaded = TrigramIndex(repo, cache)
+    assert loaded.file_count == 3
+    assert loaded.refresh().changed is False
+    assert _search(loaded, "fetch_weather") == _search(first, "fetch_weather")
+    assert loaded.candidates(plan_query("hello")) == ["b.py"]
+
+
+def test_saved_index_for_another_root_is_ignored(repo, tmp_path):
+    cache = tmp_path / "index.bin"
+    index = TrigramIndex(repo, cache)
+    index.refresh()
+    index.save()
+    assert TrigramIndex(tmp_path, cache).file_count == 0
+
+
+@pytest.mark.parametrize(
+    "payload",
+    [
+        pickle.dumps(_Exploit()),
+        b'{"version": 2}\n',
+        b"not json\n\x00\x01",
+    ],
+)
+def test_unreadable_index_is_rebuilt_without_unpickling(repo, tmp_path, payload):
+    cache = tmp_path / "index.bin"
+    cache.write_bytes(payload)
+    index = TrigramIndex(repo, cache)
+    assert index.file_count == 0
+    index.refresh()
+    assert [path for path, _number, _line in _search(index, "sunny")] == ["a.py"]
+
+
+def test_out_of_range_postings_are_rejected(repo, tmp_path):
+    cache = tmp_path / "index.bin"
+    index = TrigramIndex(repo, cache)
+    index.refresh()
+    index.save()
+    header, _, blob = cache.read_bytes().partition(b"\n")
+    cache.write_bytes(header + b"\n" + b"\xff" * len(blob))
+    assert TrigramIndex(repo, cache).file_count == 0
@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+import pytest
+
+from utils.workspace import WorkspaceService
+
+
+@pytest.fixture
+def tree(tmp_path):
+    root = tmp_path / "root"
+    outside = tmp_path / "outside"
+    root.mkdir()
+    outside.mkdir()
+    (root / "inside.txt").write_text("inside\n")
+    (outside / "secret.txt").write_text("secret\n")
+    return root, outside
+
+
+def _swap_for_symlink(path, target):
+    path.unlink()
+    path.symlink_to(target)
+
+
+def test_resolve_relative_and_absolute(tree):
+    root, _ = tree
+    service = WorkspaceService(root, watch="off")
+    assert service.resolve("inside.txt") == root / "inside.txt"
+    assert service.resolve(root / "inside.txt") == root / "inside.txt"
+    assert service.resolve(".") == root
+
+
+@pytest.mark.parametrize("path", ["../outside/secret.txt", "/etc/passwd"])
+def test_resolve_blocks_escape(tree, path):
+    root, _ = tree
+    with pytest.raises(ValueError, match="Path escape blocked"):
+        WorkspaceService(root, watch="off").resolve(path)
+
+
+def test_resolve_blocks_symlink_escape(tree):
+    root, outside = tree
+    (root / "link.txt").symlink_to(outside / "secret.txt")
+    with pytest.raises(ValueError, match="Path escape blocked"):
+        WorkspaceService(root, watch="off").resolve("link.txt")
+
+
+def test_unwatched_resolve_rechecks_swapped_symlink(tree):
+    root, outside = tree
+    service = WorkspaceService(root, watch="off")
+    assert service.resolve("inside.txt") == root / "inside.txt"
+    _swap_for_symlink(root / "inside.txt", outside / "secret.txt")
+    with pytest.raises(ValueError, match="Path escape blocked"):
+        service.resolve("inside.txt")
+
+
+def test_watched_resolve_memo_dropped_on_change(tree):
+    root, outside = tree
+    service = WorkspaceService(root, watch="off")
+    service.mode = "inotify"  # memoize without starting a real watcher
+    assert service.resolve("inside.txt") == root / "inside.txt"
+    _swap_for_symlink(root / "inside.txt", outside / "secret.txt")
+    assert service.resolve("inside.txt") == root / "inside.txt"
+    service.notify_changed([root / "inside.txt"])
+    with pytest.raises(ValueError, match="Path escape blocked"):
+        service.resolve("inside.txt")
@@ -0,0 +1,299 @@
+"""
+Run a stage agent over a JSONL file of prompts, concurrently.
+
+Run with:
+    python -m utils.batch stages.stage1.demo:build_agent prompts.jsonl -o results.jsonl
+    python -m utils.batch stages.stage3.demo:build_agent prompts.jsonl -o results.jsonl \\
+        --context stages.stage3.demo:WorkflowState
+
+Each input line is ``{"id": ..., "prompt": ..., "context": {...}}``; ``id``
+defaults to the line number and ``context`` is optional. The factory is a
+``module:callable`` returning an agent, or an async context manager yielding
+one (for agents that own MCP servers); it is entered once for the whole batch.
+With ``--context``, each record's context object is built as
+``Factory(**record["context"])``, otherwise the dict is passed as is.
+
+One result line is appended per prompt as soon as it finishes, with the final
+output, context, token usage, latency and any error. Re-running with the same
+output file skips IDs that already finished successfully (failed ones run
+again; the last line for an ID wins). Input is read lazily through a queue
+as deep as the concurrency limit, so memory stays flat however long the input
+is; only the finished IDs are kept.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import importlib
+import json
+import os
+import sys
+import time
+from contextlib import AsyncExitStack
+from dataclasses import asdict, dataclass, is_dataclass
+from pathlib import Path
+from typing import Any, Callable, Iterator
+
+from agents import Agent
+
+from utils.cli import build_verbose_hooks, parse_common_args
+from utils.hooks import RunHooks
+from utils.streaming import run_agent
+
+DEFAULT_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "4"))
+
+_DONE = object()
+
+
+@dataclass
+class BatchRecord:
+    id: str
+    prompt: Any = None
+    context: Any = None
+    error: str | None = None
+
+
+@dataclass
+class BatchSummary:
+    succeeded: int = 0
+    failed: int = 0
+    skipped: int = 0
+    elapsed: float = 0.0
+
+    def line(self) -> str:
+        return (
+            f"{self.succeeded} succeeded, {self.failed} failed, "
+            f"{self.skipped} skipped (already done) in {self.elapsed:.1f}s"
+        )
+
+
+def load_object(spec: str) -> Any:
+    """Import ``module:attribute`` (e.g. ``stages.stage1.demo:build_agent``)."""
+
+    module_name, _, attribute = spec.partition(":")
+    if not module_name or not attribute:
+        raise ValueError(f"Expected module:attribute, got {spec!r}.")
+    target: Any = importlib.import_module(module_name)
+    for part in attribute.split("."):
+        target = getattr(target, part)
+    return target
+
+
+def finished_ids(output: Path) -> set[str]:
+    """IDs whose latest result line in ``output`` succeeded."""
+
+    done: set[str] = set()
+    if not output.exists():
+        return done
+    with output.open(encoding="utf-8") as handle:
+        for line in handle:
+            try:
+                result = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # Torn last line from an interrupted run.
+            if result.get("status") == "ok":
+                done.add(str(result.get("id")))
+            else:
+                done.discard(str(result.get("id")))
+    return done
+
+
+def read_records(path: Path) -> Iterator[BatchRecord]:
+    """Yield one record per non-blank line; malformed lines carry an ``error``."""
+
+    with path.open(encoding="utf-8") as handle:
+        for number, line in enumerate(handle, 1):
+            if not line.strip():
+                continue
+            try:
+                data = json.loads(line)
+            except json.JSONDecodeError as exc:
+                yield BatchRecord(id=str(number), error=f"Invalid JSON on line {number}: {exc}")
+                continue
+            if not isinstance(data, dict):
+                yield BatchRecord(id=str(number), error=f"Line {number} is not a JSON object.")
+                continue
+            record_id = str(data.get("id", number))
+            if data.get("prompt") in (None, "", []):
+                yield BatchRecord(id=record_id, error=f"Line {number} has no prompt.")
+                continue
+            yield BatchRecord(id=record_id, prompt=data["prompt"], context=data.get("context"))
+
+
+def _jsonable(value: Any) -> Any:
+    if value is None or isinstance(value, (str, int, float, bool, list, dict)):
+        return value
+    if is_dataclass(value) and not isinstance(value, type):
+        return asdict(value)
+    if hasattr(value, "model_dump"):
+        return value.model_dump(mode="json")
+    return str(value)
+
+
+async def enter_agent(factory: Callable[[], Any], stack: AsyncExitStack) -> Agent[Any]:
+    """Call ``factory`` and, for context-manager factories, enter it on ``stack``."""
+
+    built = factory()
+    if hasattr(built, "__aenter__"):
+        built = await stack.enter_async_context(built)
+    elif asyncio.iscoroutine(built):
+        built = await built
+    if not isinstance(built, Agent):
+        raise TypeError(f"Agent factory returned {type(built).__name__}, not an Agent.")
+    return built
+
+
+async def run_batch(
+    factory: Callable[[], Any],
+    input_path: str | Path,
+    output_path: str | Path,
+    *,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    context_factory: Callable[..., Any] | None = None,
+    hooks: RunHooks | None = None,
+    timeout: float | None = None,
+    max_turns: int | None = None,
+    progress: Callable[[str], None] | None = None,
+) -> BatchSummary:
+    """Run every pending record of ``input_path``, appending results to ``output_path``."""
+
+    if concurrency < 1:
+        raise ValueError("concurrency must be at least 1.")
+    input_path, output_path = Path(input_path), Path(output_path)
+    done = finished_ids(output_path)
+    summary = BatchSummary()
+    started = time.perf_counter()
+    run_kwargs: dict[str, Any] = {"hooks": hooks}
+    if max_turns is not None:
+        run_kwargs["max_turns"] = max_turns
+
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    if output_path.exists() and output_path.stat().st_size:
+        with output_path.open("rb") as handle:
+            handle.seek(-1, os.SEEK_END)
+            torn = handle.read(1) != b"\n"
+    else:
+        torn = False
+
+    async with AsyncExitStack() as stack:
+        agent = await enter_agent(factory, stack)
+        output = stack.enter_context(output_path.open("a", encoding="utf-8", buffering=1))
+        if torn:
+            output.write("\n")
+        queue: asyncio.Queue[Any] = asyncio.Queue(maxsize=concurrency)
+
+        def write(result: dict[str, Any]) -> None:
+            output.write(json.dumps(result, ensure_ascii=False, default=str) + "\n")
+            if result["status"] == "ok":
+                summary.succeeded += 1
+            else:
+                summary.failed += 1
+            if progress:
+                progress(
+                    f"[batch] {result['id']}: {result['status']} in {result['latency_s']:.1f}s "
+                    f"({summary.succeeded} ok, {summary.failed} failed)"
+                )
+
+        async def run_one(record: BatchRecord) -> dict[str, Any]:
+            result: dict[str, Any] = {"id": record.id, "status": "error", "latency_s": 0.0}
+            if record.error:
+                result["error"] = record.error
+                return result
+            begin = time.perf_counter()
+            context = record.context
+            try:
+                if context_factory is not None:
+                    context = context_factory(**(record.context or {}))
+                run = await asyncio.wait_for(
+                    run_agent(agent, record.prompt, context=context, **run_kwargs), timeout
+                )
+            except asyncio.TimeoutError:
+                result["error"] = f"Timed out after {timeout}s."
+            except Exception as exc:
+                result["error"] = f"{type(exc).__name__}: {exc}"
+            else:
+                usage = run.context_wrapper.usage
+                result.update(
+                    status="ok",
+                    final_output=_jsonable(run.final_output),
+                    usage={
+                        "requests": usage.requests,
+                        "input_tokens": usage.input_tokens,
+                        "output_tokens": usage.output_tokens,
+                        "total_tokens": usage.total_tokens,
+                    },
+                )
+                if context is not None:
+                    result["context"] = _jsonable(context)
+            result["latency_s"] = round(time.perf_counter() - begin, 3)
+            return result
+
+        async def worker() -> None:
+            while True:
+                record = await queue.get()
+                if record is _DONE:
+                    return
+                write(await run_one(record))
+
+        async def feed() -> None:
+            for record in read_records(input_path):
+                if record.id in done:
+                    summary.skipped += 1
+                    continue
+                await queue.put(record)
+            for _ in range(concurrency):
+                await queue.put(_DONE)
+
+        await asyncio.gather(feed(), *(worker() for _ in range(concurrency)))
+
+    summary.elapsed = time.perf_counter() - started
+    return summary
+
+
+def _configure(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("factory", help="Agent factory as module:callable, e.g. stages.stage1.demo:build_agent.")
+    parser.add_argument("input", help="JSONL file with one {id, prompt, context} object per line.")
+    parser.add_argument("-o", "--output", required=True, help="JSONL file results are appended to.")
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=DEFAULT_CONCURRENCY,
+        help=f"Prompts in flight at once (default {DEFAULT_CONCURRENCY}, env BATCH_CONCURRENCY).",
+    )
+    parser.add_argument(
+        "--context",
+        metavar="FACTORY",
+        help="module:callable building each record's run context from its context dict.",
+    )
+    parser.add_argument("--timeout", type=float, help="Per-prompt time limit in seconds.")
+    parser.add_argument("--max-turns", type=int, help="Per-prompt turn limit (SDK default otherwise).")
+
+
+def main() -> None:
+    args = parse_common_args("Run a stage agent over a JSONL file of prompts.", _configure)
+    try:
+        factory = load_object(args.factory)
+        context_factory = load_object(args.context) if args.context else None
+    except (ImportError, AttributeError, ValueError) as exc:
+        sys.exit(f"Cannot load factory: {exc}")
+    if not Path(args.input).is_file():
+        sys.exit(f"No input file at {args.input}")
+    summary = asyncio.run(
+        run_batch(
+            factory,
+            args.input,
+            args.output,
+            concurrency=args.concurrency,
+            context_factory=context_factory,
+            hooks=build_verbose_hooks(args.verbose),
+            timeout=args.timeout,
+            max_turns=args.max_turns,
+            progress=lambda line: print(line, file=sys.stderr),
+        )
+    )
+    print(summary.line(), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,451 @@
+"""
+Record/replay cassettes at the Model layer.
+
+Recording wraps the shared model and appends one compact JSON line per model
+call (request key, output items, token usage) plus every tool result that
+shows up in the next request's input. Replaying serves those responses from
+memory without contacting Ollama while the real tools still run, so a replayed
+workflow measures only the SDK plumbing, hooks and tools. Paths ending in
+``.gz`` are gzip-compressed.
+"""
+
+from __future__ import annotations
+
+import gzip
+import json
+import time
+from collections import defaultdict, deque
+from collections.abc import AsyncIterator
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import IO, Any
+
+from agents import Model, ModelSettings, ModelTracing
+from agents.agent_output import AgentOutputSchemaBase
+from agents.handoffs import Handoff
+from agents.items import ModelResponse, TResponseInputItem
+from agents.tool import Tool
+from agents.usage import Usage
+from openai.types.responses import ResponseCompletedEvent
+from openai.types.responses.response_prompt_param import ResponsePromptParam
+
+from .model_cache import build_cache_key, completed_event, dump_output, load_output
+
+CASSETTE_VERSION = 1
+
+
+class CassetteMismatch(RuntimeError):
+    """Raised when a replayed run asks for a model call the cassette cannot serve."""
+
+
+def _open(path: Path, mode: str) -> IO[str]:
+    if path.suffix == ".gz":
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return path.open(mode, encoding="utf-8")
+
+
+def _usage_dict(usage: Usage) -> dict[str, int]:
+    return {
+        "input_tokens": usage.input_tokens,
+        "output_tokens": usage.output_tokens,
+        "total_tokens": usage.total_tokens,
+    }
+
+
+def _tool_results(input: str | list[TResponseInputItem]) -> list[dict[str, Any]]:
+    """Pair each ``function_call_output`` in ``input`` with its originating call."""
+
+    if isinstance(input, str):
+        return []
+    calls = {
+        item.get("call_id"): item
+        for item in input
+        if isinstance(item, dict) and item.get("type") == "function_call"
+    }
+    results: list[dict[str, Any]] = []
+    for item in input:
+        if not isinstance(item, dict) or item.get("type") != "function_call_output":
+            continue
+        call = calls.get(item.get("call_id"), {})
+        results.append(
+            {
+                "call_id": item.get("call_id"),
+                "name": call.get("name"),
+                "arguments": call.get("arguments"),
+                "output": item.get("output"),
+            }
+        )
+    return results
+
+
+def _key(
+    model_name: str,
+    system_instructions: str | None,
+    input: str | list[TResponseInputItem],
+    model_settings: ModelSettings,
+    tools: list[Tool],
+    output_schema: AgentOutputSchemaBase | None,
+    handoffs: list[Handoff],
+    previous_response_id: str | None,
+    conversation_id: str | None,
+    prompt: ResponsePromptParam | None,
+) -> str:
+    return build_cache_key(
+        system_instructions,
+        input,
+        model_settings,
+        tools,
+        output_schema,
+        handoffs,
+        model_name=model_name,
+        previous_response_id=previous_response_id,
+        conversation_id=conversation_id,
+        prompt=prompt,
+    )
+
+
+class CassetteWriter:
+    """Append-only cassette file; each entry is flushed as soon as it is written."""
+
+    def __init__(self, path: Path, model_name: str) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self.entries = 0
+        self._seen_calls: set[str] = set()
+        self._fh = _open(path, "w")
+        self._write(
+            {
+                "kind": "meta",
+                "version": CASSETTE_VERSION,
+                "model": model_name,
+                "created": time.time(),
+            }
+        )
+
+    def _write(self, entry: dict[str, Any]) -> None:
+        self._fh.write(json.dumps(entry, separators=(",", ":"), ensure_ascii=False) + "\n")
+        self._fh.flush()
+
+    def record_tools(self, input: str | list[TResponseInputItem]) -> None:
+        for result in _tool_results(input):
+            if result["call_id"] in self._seen_calls:
+                continue
+            self._seen_calls.add(result["call_id"])
+            self._write({"kind": "tool", **result})
+
+    def record_model(self, key: str, response_output: list[Any], usage: Usage) -> None:
+        self.entries += 1
+        self._write(
+            {
+                "kind": "model",
+                "key": key,
+                "output": dump_output(response_output),
+                "usage": _usage_dict(usage),
+            }
+        )
+
+    def close(self) -> None:
+        self._fh.close()
+
+
+@dataclass
+class Cassette:
+    model_name: str = ""
+    model_calls: list[dict[str, Any]] = field(default_factory=list)
+    tool_results: dict[str, dict[str, Any]] = field(default_factory=dict)
+
+    @classmethod
+    def load(cls, path: Path) -> Cassette:
+        cassette = cls()
+        with _open(path, "r") as fh:
+            for line in fh:
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                kind = entry.get("kind")
+                if kind == "meta":
+                    if entry.get("version") != CASSETTE_VERSION:
+                        raise ValueError(
+                            f"Unsupported cassette version {entry.get('version')} in {path}."
+                        )
+                    cassette.model_name = entry.get("model", "")
+                elif kind == "model":
+                    cassette.model_calls.append(entry)
+                elif kind == "tool":
+                    cassette.tool_results[entry["call_id"]] = entry
+        return cassette
+
+
+class RecordingModel(Model):
+    """Pass calls through to ``inner`` and append each exchange to a cassette."""
+
+    def __init__(self, inner: Model, writer: CassetteWriter) -> None:
+        self.inner = inner
+        self.writer = writer
+        self.model = getattr(inner, "model", inner.__class__.__name__)
+
+    def __getattr__(self, name: str) -> Any:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return getattr(self.inner, name)
+
+    async def get_response(
+        self,
+        system_instructions: str | None,
+        input: str | list[TResponseInputItem],
+        model_settings: ModelSettings,
+        tools: list[Tool],
+        output_schema: AgentOutputSchemaBase | None,
+        handoffs: list[Handoff],
+        tracing: ModelTracing,
+        *,
+        previous_response_id: str | None = None,
+        conversation_id: str | None = None,
+        prompt: ResponsePromptParam | None = None,
+    ) -> ModelResponse:
+        key = _key(
+            str(self.model),
+            system_instructions,
+            input,
+            model_settings,
+            tools,
+            output_schema,
+            handoffs,
+            previous_response_id,
+            conversation_id,
+            prompt,
+        )
+        self.writer.record_tools(input)
+        response = await self.inner.get_response(
+            system_instructions,
+            input,
+            model_settings,
+            tools,
+            output_schema,
+            handoffs,
+            tracing,
+            previous_response_id=previous_response_id,
+            conversation_id=conversation_id,
+            prompt=prompt,
+        )
+        self.writer.record_model(key, response.output, response.usage)
+        return response
+
+    async def stream_response(
+        self,
+        system_instructions: str | None,
+        input: str | list[TResponseInputItem],
+        model_settings: ModelSettings,
+        tools: list[Tool],
+        output_schema: AgentOutputSchemaBase | None,
+        handoffs: list[Handoff],
+        tracing: ModelTracing,
+        *,
+        previous_response_id: str | None = None,
+        conversation_id: str | None = None,
+        prompt: ResponsePromptParam | None = None,
+    ) -> AsyncIterator[Any]:
+        key = _key(
+            str(self.model),
+            system_instructions,
+            input,
+            model_settings,
+            tools,
+            output_schema,
+            handoffs,
+            previous_response_id,
+            conversation_id,
+            prompt,
+        )
+        self.writer.record_tools(input)
+        async for event in self.inner.stream_response(
+            system_instructions,
+            input,
+            model_settings,
+            tools,
+            output_schema,
+            handoffs,
+            tracing,
+            previous_response_id=previous_response_id,
+            conversation_id=conversation_id,
+            prompt=prompt,
+        ):
+            if isinstance(event, ResponseCompletedEvent):
+                usage = event.response.usage
+                self.writer.record_model(
+                    key,
+                    event.response.output,
+                    Usage(
+                        requests=1,
+                        input_tokens=usage.input_tokens if usage else 0,
+                        output_tokens=usage.output_tokens if usage else 0,
+                        total_tokens=usage.total_tokens if usage else 0,
+                    ),
+                )
+            yield event
+
+    def report(self) -> str:
+        return f"[cassette] recorded {self.writer.entries} model call(s) to {self.writer.path}"
+
+
+class ReplayModel(Model):
+    """
+    Serve model calls from a cassette without any network access.
+
+    Calls are matched on the same normalized request key as the response
+    cache. A key that is not in the cassette (e.g. a tool output changed)
+    raises ``CassetteMismatch``. With ``lenient=True`` the call recorded
+    after the previously served one is used instead and counted as a key
+    miss. Tool results that differ from the recording are counted either way.
+    """
+
+    def __init__(self, cassette: Cassette, lenient: bool = False) -> None:
+        self.cassette = cassette
+        self.lenient = lenient
+        # Keys were computed against the recorded model's name.
+        self.model = cassette.model_name
+        self.calls = 0
+        self.key_misses = 0
+        self.tool_divergences = 0
+        self._by_key: dict[str, deque[int]] = defaultdict(deque)
+        for index, entry in enumerate(cassette.model_calls):
+            self._by_key[entry["key"]].append(index)
+        self._cursor = 0
+        self._checked_calls: set[str] = set()
+
+    def _check_tools(self, input: str | list[TResponseInputItem]) -> None:
+        for result in _tool_results(input):
+            call_id = result["call_id"]
+            if call_id in self._checked_calls:
+                continue
+            self._checked_calls.add(call_id)
+            recorded = self.cassette.tool_results.get(call_id)
+            if recorded is not None and recorded.get("output") != result["output"]:
+                self.tool_divergences += 1
+
+    def _next(self, key: str) -> dict[str, Any]:
+        if not self.cassette.model_calls:
+            raise CassetteMismatch("Cassette has no recorded model calls.")
+        self.calls += 1
+        candidates = self._by_key.get(key)
+        if candidates:
+            # Rotate so identical requests walk their recorded answers in order
+            # and a cassette can be replayed any number of times per process.
+            index = candidates.popleft()
+            candidates.append(index)
+        else:
+            self.key_misses += 1
+            if not self.lenient:
+                raise CassetteMismatch(
+                    f"Model call {self.calls} (key {key[:12]}) is not in the cassette; "
+                    "the run diverged from the recording. Re-record it, or replay "
+                    "leniently to substitute the next recorded call."
+                )
+            index = self._cursor % len(self.cassette.model_calls)
+        self._cursor = index + 1
+        return self.cassette.model_calls[index]
+
+    def _serve(
+        self,
+        system_instructions: str | None,
+        input: str | list[TResponseInputItem],
+        model_settings: ModelSettings,
+        tools: list[Tool],
+        output_schema: AgentOutputSchemaBase | None,
+        handoffs: list[Handoff],
+        previous_response_id: str | None,
+        conversation_id: str | None,
+        prompt: ResponsePromptParam | None,
+    ) -> tuple[list[Any], Usage]:
+        self._check_tools(input)
+        entry = self._next(
+            _key(
+                str(self.model),
+                system_instructions,
+                input,
+                model_settings,
+                tools,
+                output_schema,
+                handoffs,
+                previous_response_id,
+                conversation_id,
+                prompt,
+            )
+        )
+        recorded_usage = entry.get("usage", {})
+        usage = Usage(
+            requests=1,
+            input_tokens=recorded_usage.get("input_tokens", 0),
+            output_tokens=recorded_usage.get("output_tokens", 0),
+            total_tokens=recorded_usage.get("total_tokens", 0),
+        )
+        return load_output(entry["output"]), usage
+
+    async def get_response(
+        self,
+        system_instructions: str | None,
+        input: str | list[TResponseInputItem],
+        model_settings: ModelSettings,
+        tools: list[Tool],
+        output_schema: AgentOutputSchemaBase | None,
+        handoffs: list[Handoff],
+        tracing: ModelTracing,
+        *,
+        previous_response_id: str | None = None,
+        conversation_id: str | None = None,
+        prompt: ResponsePromptParam | None = None,
+    ) -> ModelResponse:
+        output, usage = self._serve(
+            system_instructions,
+            input,
+            model_settings,
+            tools,
+            output_schema,
+            handoffs,
+            previous_response_id,
+            conversation_id,
+            prompt,
+        )
+        return ModelResponse(output=output, usage=usage, response_id=None)
+
+    async def stream_response(
+        self,
+        system_instructions: str | None,
+        input: str | list[TResponseInputItem],
+        model_settings: ModelSettings,
+        tools: list[Tool],
+        output_schema: AgentOutputSchemaBase | None,
+        handoffs: list[Handoff],
+        tracing: ModelTracing,
+        *,
+        previous_response_id: str | None = None,
+        conversation_id: str | None = None,
+        prompt: ResponsePromptParam | None = None,
+    ) -> AsyncIterator[Any]:
+        output, usage = self._serve(
+            system_instructions,
+            input,
+            model_settings,
+            tools,
+            output_schema,
+            handoffs,
+            previous_response_id,
+            conversation_id,
+            prompt,
+        )
+        yield completed_event(output, str(self.model), usage, response_id="__replay__")
+
+    def report(self) -> str:
+        return (
+            f"[cassette] replayed {self.calls} model call(s): "
+            f"{self.key_misses} key miss(es), {self.tool_divergences} tool divergence(s)"
+        )
+
+
+__all__ = [
+    "Cassette",
+    "CassetteMismatch",
+    "CassetteWriter",
+    "RecordingModel",
+    "ReplayModel",
+]
@@ -1,9 +1,21 @@
 from __future__ import annotations
 
 import argparse
-from typing import Callable
+from typing import TYPE_CHECKING, Callable
 
-from .verbose import build_verbose_hooks
+if TYPE_CHECKING:
+    from .hooks import RunHooks
+
+
+def build_verbose_hooks(enabled: bool) -> RunHooks | None:
+    """
+    Re-export of ``utils.verbose.build_verbose_hooks`` that defers importing
+    the Agents SDK until hooks are actually requested, so ``--help`` stays fast.
+    """
+
+    from .verbose import build_verbose_hooks as _build_verbose_hooks
+
+    return _build_verbose_hooks(enabled)
 
 
 def parse_common_args(
@@ -12,7 +24,12 @@ def parse_common_args(
 ) -> argparse.Namespace:
     """
     Parse shared CLI flags used by runnable scripts.
-    Adds a ``--verbose`` flag that streams agent lifecycle events.
+    Adds a ``--verbose`` flag that streams agent lifecycle events, a
+    ``--stream`` flag that renders model output incrementally,
+    ``--record-cassette``/``--replay-cassette``/``--replay-cassette-lenient``
+    for offline reruns, ``--trace`` to export span timings, ``--metrics-port`` to serve
+    Prometheus-style run metrics and ``--profile-cpu``/``--profile-mem``
+    for profiles attributed to agents and tools.
     """
 
     parser = argparse.ArgumentParser(description=description)
@@ -21,9 +38,77 @@ def parse_common_args(
         action="store_true",
         help="Stream agent lifecycle events (tools, handoffs, and LLM calls).",
     )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Render tokens, tool calls and handoffs as they arrive and report per-call latency.",
+    )
+    cassette = parser.add_mutually_exclusive_group()
+    cassette.add_argument(
+        "--record-cassette",
+        metavar="PATH",
+        help="Record every model call and tool result to a cassette file.",
+    )
+    cassette.add_argument(
+        "--replay-cassette",
+        metavar="PATH",
+        help="Replay model calls from a cassette instead of contacting Ollama; fail on any unrecorded call.",
+    )
+    cassette.add_argument(
+        "--replay-cassette-lenient",
+        metavar="PATH",
+        help="Like --replay-cassette, but serve the next recorded call when a request is not in the cassette.",
+    )
+    parser.add_argument(
+        "--trace",
+        metavar="PATH",
+        help="Write span timings to PATH (.jsonl for JSON lines, else Chrome trace JSON for Perfetto).",
+    )
+    parser.add_argument(
+        "--metrics-port",
+        metavar="PORT",
+        type=int,
+        help="Serve LLM, tool and handoff metrics at http://127.0.0.1:PORT/metrics.",
+    )
+    parser.add_argument(
+        "--profile-cpu",
+        metavar="PATH",
+        help="Sample CPU stacks per agent and tool; write a report to PATH (.folded for flame graphs).",
+    )
+    parser.add_argument(
+        "--profile-mem",
+        metavar="PATH",
+        help="Snapshot tracemalloc at every agent, LLM and tool boundary; write a report to PATH.",
+    )
     if configure:
         configure(parser)
-    return parser.parse_args()
+    args = parser.parse_args()
+    if args.record_cassette or args.replay_cassette or args.replay_cassette_lenient:
+        from .ollama_adaptor import use_cassette
+
+        if args.record_cassette:
+            use_cassette("record", args.record_cassette)
+        elif args.replay_cassette:
+            use_cassette("replay", args.replay_cassette)
+        else:
+            use_cassette("replay-lenient", args.replay_cassette_lenient)
+    if args.trace:
+        from .tracing import enable_tracing
+
+        enable_tracing(args.trace)
+    if args.metrics_port is not None:
+        from .metrics import enable_metrics
+
+        enable_metrics(args.metrics_port)
+    if args.profile_cpu:
+        from .profiling import enable_cpu_profiling
+
+        enable_cpu_profiling(args.profile_cpu)
+    if args.profile_mem:
+        from .profiling import enable_memory_profiling
+
+        enable_memory_profiling(args.profile_mem)
+    return args
 
 
 __all__ = ["parse_common_args", "build_verbose_hooks"]
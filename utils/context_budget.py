@@ -0,0 +1,148 @@
+from __future__ import annotations
+
+import json
+from dataclasses import dataclass
+from typing import Any, Callable
+
+from agents.items import TResponseInputItem
+from agents.run import CallModelData, ModelInputData
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token for English and code)."""
+
+    return (len(text) + 3) // 4
+
+
+def _item_text(item: TResponseInputItem) -> str:
+    if isinstance(item, dict):
+        return json.dumps(item, ensure_ascii=False, default=str)
+    return str(item)
+
+
+def _output_text(output: Any) -> str:
+    """Flatten a ``function_call_output`` payload (string or content list) to text."""
+
+    if isinstance(output, str):
+        return output
+    if isinstance(output, list):
+        return "\n".join(
+            str(part.get("text", "")) if isinstance(part, dict) else str(part) for part in output
+        )
+    return str(output)
+
+
+@dataclass
+class CompactionStats:
+    calls: int = 0
+    compacted_calls: int = 0
+    outputs_compacted: int = 0
+    tokens_before: int = 0
+    tokens_after: int = 0
+
+    @property
+    def tokens_saved(self) -> int:
+        return self.tokens_before - self.tokens_after
+
+
+class HistoryManager:
+    """
+    ``RunConfig.call_model_input_filter`` that keeps each agent's prompt under
+    a token budget.
+
+    Only the copy of the history sent to the model is changed; the run keeps
+    the full tool outputs. Once an agent's prompt crosses its budget, the
+    oldest tool outputs (all but the ``keep_recent`` newest) are replaced by a
+    short extract noting how much was dropped. If that is not enough they are
+    reduced to a one-line placeholder. Compaction is deterministic, so
+    compacted prompts still hit the response cache and cassettes.
+    """
+
+    def __init__(
+        self,
+        budgets: dict[str, int] | None = None,
+        default_budget: int | None = None,
+        keep_recent: int = 2,
+        summary_chars: int = 240,
+        estimate: Callable[[str], int] = estimate_tokens,
+    ) -> None:
+        self.budgets = budgets or {}
+        self.default_budget = default_budget
+        self.keep_recent = keep_recent
+        self.summary_chars = summary_chars
+        self._estimate = estimate
+        self.stats: dict[str, CompactionStats] = {}
+
+    def _budget_for(self, agent_name: str) -> int | None:
+        return self.budgets.get(agent_name, self.default_budget)
+
+    def _count(self, instructions: str | None, items: list[TResponseInputItem]) -> int:
+        total = self._estimate(instructions or "")
+        return total + sum(self._estimate(_item_text(item)) for item in items)
+
+    def _summarize(self, name: str, text: str) -> str:
+        extract = text[: self.summary_chars].rstrip()
+        dropped = len(text) - len(extract)
+        return f"{extract}\n[compacted: {dropped} more chars of earlier {name} output omitted]"
+
+    def __call__(self, data: CallModelData[Any]) -> ModelInputData:
+        model_data = data.model_data
+        agent_name = getattr(data.agent, "name", "agent")
+        budget = self._budget_for(agent_name)
+        if budget is None:
+            return model_data
+
+        stats = self.stats.setdefault(agent_name, CompactionStats())
+        stats.calls += 1
+        items = list(model_data.input)
+        before = self._count(model_data.instructions, items)
+        stats.tokens_before += before
+        if before <= budget:
+            stats.tokens_after += before
+            return model_data
+
+        call_names = {
+            item.get("call_id"): item.get("name", "tool")
+            for item in items
+            if isinstance(item, dict) and item.get("type") == "function_call"
+        }
+        output_positions = [
+            index
+            for index, item in enumerate(items)
+            if isinstance(item, dict) and item.get("type") == "function_call_output"
+        ]
+        stale = output_positions[: max(len(output_positions) - self.keep_recent, 0)]
+
+        total = before
+        trimmed: set[int] = set()
+        for shrink in (self._summarize, lambda name, text: f"[{name} output omitted]"):
+            for index in stale:
+                if total <= budget:
+                    break
+                item = items[index]
+                text = _output_text(item.get("output"))
+                replacement = shrink(call_names.get(item.get("call_id"), "tool"), text)
+                if len(replacement) >= len(text):
+                    continue
+                old_tokens = self._estimate(_item_text(item))
+                items[index] = {**item, "output": replacement}
+                total += self._estimate(_item_text(items[index])) - old_tokens
+                trimmed.add(index)
+
+        stats.compacted_calls += 1
+        stats.outputs_compacted += len(trimmed)
+        stats.tokens_after += total
+        return ModelInputData(input=items, instructions=model_data.instructions)
+
+    def report(self) -> str:
+        lines = ["=== Context Compaction ==="]
+        for agent_name, stats in self.stats.items():
+            lines.append(
+                f"{agent_name}: {stats.compacted_calls}/{stats.calls} call(s) compacted, "
+                f"{stats.outputs_compacted} tool output(s) trimmed, "
+                f"~{stats.tokens_saved} tokens saved"
+            )
+        return "\n".join(lines)
+
+
+__all__ = ["CompactionStats", "HistoryManager", "estimate_tokens"]
@@ -0,0 +1,136 @@
+from __future__ import annotations
+
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+
+from utils.line_index import FileVersion, file_version
+from utils.workspace_path import bump_workspace_generation
+
+DEFAULT_MAX_BYTES = int(float(os.getenv("FILE_CACHE_MAX_MB", "64")) * 1024 * 1024)
+
+
+def _universal_newlines(text: str) -> str:
+    # Matches what Path.read_text() returns for the same bytes.
+    return text.replace("\r\n", "\n").replace("\r", "\n")
+
+
+@dataclass
+class FileCacheStats:
+    hits: int = 0
+    misses: int = 0
+    writes: int = 0
+    evictions: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+class FileContentCache:
+    """
+    Process-wide cache of decoded file contents shared by the workspace tools.
+
+    Every read re-stats the file and only reuses the cached text while its
+    mtime, size and inode are unchanged, so edits made outside the tools are
+    picked up. Writes through ``write_text`` refresh the entry in place.
+    Entries hold the decoded text as stored on disk; newlines are translated
+    per read, as ``newline`` asks.
+    Entries are evicted least-recently-used once their total size passes
+    ``max_bytes``; files bigger than a quarter of the budget are not cached.
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES) -> None:
+        self.max_bytes = max_bytes
+        self.stats = FileCacheStats()
+        self._entries: OrderedDict[Path, tuple[FileVersion, str, int]] = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    def _store(self, path: Path, version: FileVersion, text: str) -> None:
+        size = version[1]
+        with self._lock:
+            self._discard(path)
+            if size > self.max_bytes // 4:
+                return
+            self._entries[path] = (version, text, size)
+            self._size += size
+            while self._size > self.max_bytes:
+                _, (_, _, evicted) = self._entries.popitem(last=False)
+                self._size -= evicted
+                self.stats.evictions += 1
+
+    def _discard(self, path: Path) -> None:
+        entry = self._entries.pop(path, None)
+        if entry is not None:
+            self._size -= entry[2]
+
+    def read_text(self, path: Path, encoding: str = "utf-8", newline: str | None = None) -> str:
+        """
+        Drop-in for ``path.read_text(encoding)`` that serves unchanged files
+        from memory. ``newline=""`` returns the text untranslated, the way
+        ``LineIndex`` and ``apply_hunks`` see it.
+        """
+
+        path = Path(path)
+        version = file_version(path.stat())
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None and entry[0] == version:
+                self._entries.move_to_end(path)
+                self.stats.hits += 1
+                text = entry[1]
+            else:
+                text = None
+                self.stats.misses += 1
+        if text is None:
+            with path.open("rb") as handle:
+                data = handle.read()
+                version = file_version(os.fstat(handle.fileno()))
+            text = data.decode(encoding)
+            self._store(path, version, text)
+        return text if newline == "" else _universal_newlines(text)
+
+    def write_text(self, path: Path, text: str, encoding: str = "utf-8") -> None:
+        """Write ``text`` to disk and keep it as the cached content of ``path``."""
+
+        path = Path(path)
+        try:
+            path.write_text(text, encoding=encoding)
+        except BaseException:
+            with self._lock:
+                self._discard(path)
+            raise
+        finally:
+            # Even a failed write may have truncated the file.
+            bump_workspace_generation(path)
+        self.stats.writes += 1
+        self._store(path, file_version(path.stat()), text)
+
+    def update(self, path: Path, text: str) -> None:
+        """Keep ``text`` as the cached content of ``path``, just written by the caller."""
+
+        path = Path(path)
+        self.stats.writes += 1
+        self._store(path, file_version(path.stat()), text)
+
+    def invalidate(self, path: Path | None = None) -> None:
+        with self._lock:
+            if path is None:
+                self._entries.clear()
+                self._size = 0
+            else:
+                self._discard(Path(path))
+
+
+file_cache = FileContentCache()
+
+
+__all__ = ["FileCacheStats", "FileContentCache", "file_cache"]
@@ -0,0 +1,229 @@
+from __future__ import annotations
+
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any
+
+from agents import Agent
+from agents.items import ModelResponse
+from agents.lifecycle import RunHooksBase
+from agents.run_context import RunContextWrapper
+from agents.tool import Tool
+from agents.tracing import SpanError, get_current_span
+from agents.util import _error_tracing
+
+RunHooks = RunHooksBase[Any, Agent[Any]]
+
+# Hooks enabled process-wide by CLI flags (e.g. --trace) and attached to every run.
+_installed: list[RunHooks] = []
+
+
+class RunScope:
+    """
+    Identity of one ``utils.streaming.run_agent`` call.
+
+    Hooks key per-run state on it (through ``run_key``) instead of ``id()`` of
+    SDK objects, which can be recycled once a run is gone. Hooks that keep
+    such state define ``on_run_finished(run, error)``; it is called after
+    every run, including failed and cancelled ones, so nothing is left behind.
+    """
+
+    __slots__ = ()
+
+
+_current_run: ContextVar[RunScope | None] = ContextVar("current_run", default=None)
+
+
+def run_key(context: RunContextWrapper[Any]) -> object:
+    """
+    Key for the run ``context`` belongs to: its ``RunScope`` inside
+    ``run_scope``, else the run's ``Usage`` object (shared by a run's context
+    and its per-tool ``ToolContext`` copies).
+    """
+
+    return _current_run.get() or id(context.usage)
+
+
+def _notify_run_finished(hooks: RunHooks | None, run: RunScope, error: BaseException | None) -> None:
+    if isinstance(hooks, CompositeRunHooks):
+        for inner in hooks.hooks:
+            _notify_run_finished(inner, run, error)
+        return
+    finished = getattr(hooks, "on_run_finished", None)
+    if finished is not None:
+        finished(run, error)
+
+
+@contextmanager
+def run_scope(hooks: RunHooks | None) -> Iterator[RunScope]:
+    """
+    Run the body as one ``RunScope``. On exit, normal or not, ``hooks`` (and
+    every hooks object inside a ``CompositeRunHooks``) get ``on_run_finished``
+    with the exception that ended the run, if any.
+    """
+
+    run = RunScope()
+    token = _current_run.set(run)
+    error: BaseException | None = None
+    try:
+        yield run
+    except BaseException as exc:
+        error = exc
+        raise
+    finally:
+        _current_run.reset(token)
+        _notify_run_finished(hooks, run, error)
+
+
+# Set in the task running a tool call when the call failed without raising:
+# (the call's function span, error text). Tasks started later from that task,
+# such as the SDK's on_tool_end hooks, inherit it.
+_tool_failure: ContextVar[tuple[object, str] | None] = ContextVar("tool_failure", default=None)
+
+
+def _note_tool_failure(error: str) -> None:
+    _tool_failure.set((get_current_span(), error))
+
+
+def _install_error_probe() -> None:
+    # A function tool that raises is turned into a message for the model by its
+    # failure_error_function; the SDK then attaches the error to the tool's
+    # function span, which is the one signal left (spans are no-ops but still
+    # current when tracing is disabled).
+    attach = _error_tracing.attach_error_to_current_span
+    if getattr(attach, "probes_tool_failures", False):
+        return
+
+    def attach_error_to_current_span(error: SpanError) -> None:
+        if error.get("message") == "Error running tool (non-fatal)":
+            _note_tool_failure(str((error.get("data") or {}).get("error", "")))
+        attach(error)
+
+    attach_error_to_current_span.probes_tool_failures = True  # type: ignore[attr-defined]
+    _error_tracing.attach_error_to_current_span = attach_error_to_current_span
+
+
+def _probe_mcp_server(server: Any) -> None:
+    # MCP servers report a failed call as a result flagged isError, which the
+    # SDK hands to the model like any other output.
+    call_tool = server.call_tool
+    if getattr(call_tool, "probes_tool_failures", False):
+        return
+
+    async def probed_call_tool(*args: Any, **kwargs: Any) -> Any:
+        result = await call_tool(*args, **kwargs)
+        if getattr(result, "isError", False):
+            _note_tool_failure(" ".join(getattr(item, "text", "") for item in result.content))
+        return result
+
+    probed_call_tool.probes_tool_failures = True  # type: ignore[attr-defined]
+    server.call_tool = probed_call_tool
+
+
+def watch_tool_failures(agent: Agent[Any]) -> None:
+    """
+    Make tool calls of ``agent`` report failures to ``tool_failure``: function
+    tools whose exception became a message for the model, and MCP calls whose
+    result is flagged as an error. Call it from ``on_tool_start``; tools that
+    raise out of the run are left to ``on_run_finished``.
+    """
+
+    _install_error_probe()
+    for server in getattr(agent, "mcp_servers", None) or ():
+        _probe_mcp_server(server)
+
+
+def tool_failure() -> str | None:
+    """From ``on_tool_end``: the error of the tool call that just ended, or None if it succeeded."""
+
+    failure = _tool_failure.get()
+    if failure is None or failure[0] is not get_current_span():
+        return None
+    return failure[1]
+
+
+class CompositeRunHooks(RunHooks):
+    """
+    Forward every lifecycle event to several hooks objects, in order.
+
+    ``Runner.run`` accepts a single ``hooks`` argument; this lets verbose
+    logging, tracing and metrics observe the same run.
+    """
+
+    def __init__(self, *hooks: RunHooks) -> None:
+        self.hooks = list(hooks)
+
+    async def on_agent_start(self, context: RunContextWrapper[Any], agent: Agent[Any]) -> None:
+        for hooks in self.hooks:
+            await hooks.on_agent_start(context, agent)
+
+    async def on_agent_end(
+        self, context: RunContextWrapper[Any], agent: Agent[Any], output: Any
+    ) -> None:
+        for hooks in self.hooks:
+            await hooks.on_agent_end(context, agent, output)
+
+    async def on_handoff(
+        self, context: RunContextWrapper[Any], from_agent: Agent[Any], to_agent: Agent[Any]
+    ) -> None:
+        for hooks in self.hooks:
+            await hooks.on_handoff(context, from_agent, to_agent)
+
+    async def on_tool_start(
+        self, context: RunContextWrapper[Any], agent: Agent[Any], tool: Tool
+    ) -> None:
+        for hooks in self.hooks:
+            await hooks.on_tool_start(context, agent, tool)
+
+    async def on_tool_end(
+        self, context: RunContextWrapper[Any], agent: Agent[Any], tool: Tool, result: Any
+    ) -> None:
+        for hooks in self.hooks:
+            await hooks.on_tool_end(context, agent, tool, result)
+
+    async def on_llm_start(
+        self,
+        context: RunContextWrapper[Any],
+        agent: Agent[Any],
+        system_prompt: str | None,
+        input_items: list[Any],
+    ) -> None:
+        for hooks in self.hooks:
+            await hooks.on_llm_start(context, agent, system_prompt, input_items)
+
+    async def on_llm_end(
+        self, context: RunContextWrapper[Any], agent: Agent[Any], response: ModelResponse
+    ) -> None:
+        for hooks in self.hooks:
+            await hooks.on_llm_end(context, agent, response)
+
+
+def install_run_hooks(hooks: RunHooks) -> None:
+    """Attach ``hooks`` to every run whose hooks come from ``combine_hooks``."""
+
+    _installed.append(hooks)
+
+
+def combine_hooks(*hooks: RunHooks | None) -> RunHooks | None:
+    """Merge ``hooks`` and the installed hooks into one object (None when there are none)."""
+
+    selected = [item for item in (*hooks, *_installed) if item is not None]
+    if not selected:
+        return None
+    if len(selected) == 1:
+        return selected[0]
+    return CompositeRunHooks(*selected)
+
+
+__all__ = [
+    "CompositeRunHooks",
+    "RunHooks",
+    "RunScope",
+    "combine_hooks",
+    "install_run_hooks",
+    "run_key",
+    "run_scope",
+    "tool_failure",
+    "watch_tool_failures",
+]
@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+import mmap
+import os
+import threading
+from array import array
+from bisect import bisect_right
+from collections import OrderedDict
+from itertools import accumulate, count
+from pathlib import Path
+
+_CHUNK_BYTES = 8 * 1024 * 1024
+_MAX_CACHED_INDEXES = 64
+
+FileVersion = tuple[int, int, int]
+
+
+def file_version(info: os.stat_result) -> FileVersion:
+    return (info.st_mtime_ns, info.st_size, info.st_ino)
+
+
+def split_lines(text: str) -> list[str]:
+    """
+    Split ``text`` into lines the way ``LineIndex`` counts them: on ``\\n``
+    only, without a phantom empty line after a trailing newline, and with a
+    trailing ``\\r`` dropped from each line.
+    """
+
+    lines = text.split("\n")
+    if lines[-1] == "":
+        lines.pop()
+    return [line[:-1] if line.endswith("\r") else line for line in lines]
+
+
+class LineIndex:
+    """
+    Byte offsets of every line start in one version of a file.
+
+    ``starts[i]`` is where line ``i + 1`` begins and ``starts[-1]`` is the end
+    of the last line, so any line range maps to a single contiguous byte span
+    that is read through ``mmap`` without touching the rest of the file.
+    Lines are split on ``\\n``; a trailing ``\\r`` is dropped when reading.
+    """
+
+    def __init__(self, path: Path, version: FileVersion, starts: array) -> None:
+        self.path = path
+        self.version = version
+        self.starts = starts
+
+    @classmethod
+    def build(cls, path: Path) -> LineIndex:
+        with path.open("rb") as handle:
+            version = file_version(os.fstat(handle.fileno()))
+            starts = array("Q", [0])
+            position = 0
+            while chunk := handle.read(_CHUNK_BYTES):
+                lengths = accumulate(map(len, chunk.split(b"\n")[:-1]))
+                # End of the n-th line in this chunk: its bytes so far plus n newlines.
+                starts.extend(map(int.__add__, lengths, count(position + 1)))
+                position += len(chunk)
+        if position > starts[-1]:
+            starts.append(position)
+        return cls(path, version, starts)
+
+    @property
+    def line_count(self) -> int:
+        return len(self.starts) - 1
+
+    @property
+    def size(self) -> int:
+        return self.starts[-1]
+
+    def read_lines(self, start: int, end: int, max_bytes: int | None = None) -> list[str]:
+        """
+        Return lines ``start..end`` (1-based, inclusive) decoded as UTF-8.
+
+        With ``max_bytes`` the range is cut after the first line that crosses
+        that many bytes, for callers that truncate their output anyway.
+        """
+
+        if start < 1 or end < start or end > self.line_count:
+            msg = f"Invalid range {start}-{end} for {self.line_count} lines."
+            raise ValueError(msg)
+        low = self.starts[start - 1]
+        if max_bytes is not None:
+            end = min(end, max(start, bisect_right(self.starts, low + max_bytes)))
+        high = self.starts[end]
+        with self.path.open("rb") as handle, mmap.mmap(
+            handle.fileno(), 0, access=mmap.ACCESS_READ
+        ) as mapped:
+            if len(mapped) < high:
+                msg = f"{self.path} changed while it was being read."
+                raise OSError(msg)
+            data = mapped[low:high]
+        return split_lines(data.decode("utf-8", errors="replace"))
+
+
+_indexes: OrderedDict[Path, LineIndex] = OrderedDict()
+_lock = threading.Lock()
+
+
+def get_line_index(path: Path) -> LineIndex:
+    """Return the cached index for ``path``, rebuilding it when mtime/size/inode change."""
+
+    version = file_version(os.stat(path))
+    with _lock:
+        index = _indexes.get(path)
+        if index is not None and index.version == version:
+            _indexes.move_to_end(path)
+            return index
+    index = LineIndex.build(path)
+    with _lock:
+        _indexes[path] = index
+        _indexes.move_to_end(path)
+        while len(_indexes) > _MAX_CACHED_INDEXES:
+            _indexes.popitem(last=False)
+    return index
+
+
+__all__ = ["LineIndex", "file_version", "get_line_index", "split_lines"]
@@ -0,0 +1,185 @@
+"""
+Background line emitter that keeps terminal writes off the event loop.
+
+``LogEmitter.emit`` only enqueues; a daemon thread drains the bounded queue
+and writes lines to the sink in batches (one write and flush per batch), so
+a slow terminal or a full pipe no longer stalls every agent sharing the
+loop. When the queue is full, the ``drop`` policy discards the line and
+counts it, while ``block`` waits for space (lossless, with backpressure);
+async callers use ``emit_async``, which waits in a worker thread so the
+event loop keeps running.
+The most recent lines, dropped or not, stay in a ring buffer for
+post-mortems.
+
+``VERBOSE_LOG_POLICY`` (``drop``/``block``, default ``drop``) and
+``VERBOSE_LOG_QUEUE`` (default 10000 lines) configure the shared emitter
+used by ``--verbose``.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import atexit
+import os
+import queue
+import sys
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Callable, Literal
+
+Policy = Literal["drop", "block"]
+
+DEFAULT_POLICY: Policy = "block" if os.getenv("VERBOSE_LOG_POLICY") == "block" else "drop"
+DEFAULT_QUEUE_SIZE = int(os.getenv("VERBOSE_LOG_QUEUE", "10000"))
+BATCH_LINES = 256
+RING_LINES = 1000
+
+_STOP = object()
+
+
+@dataclass
+class EmitterStats:
+    emitted: int = 0
+    written: int = 0
+    dropped: int = 0
+    batches: int = 0
+
+
+def _write_stdout(text: str) -> None:
+    sys.stdout.write(text)
+    sys.stdout.flush()
+
+
+class LogEmitter:
+    """Bounded, batching, thread-backed line writer."""
+
+    def __init__(
+        self,
+        sink: Callable[[str], None] = _write_stdout,
+        max_queue: int = DEFAULT_QUEUE_SIZE,
+        policy: Policy = DEFAULT_POLICY,
+        batch_lines: int = BATCH_LINES,
+        ring_lines: int = RING_LINES,
+    ) -> None:
+        if policy not in ("drop", "block"):
+            raise ValueError(f"Unknown policy {policy!r}; use 'drop' or 'block'.")
+        self.policy = policy
+        self.stats = EmitterStats()
+        self._sink = sink
+        self._batch_lines = batch_lines
+        self._queue: queue.Queue[object] = queue.Queue(maxsize=max_queue)
+        self._ring: deque[str] = deque(maxlen=ring_lines)
+        self._closed = False
+        self._thread = threading.Thread(target=self._drain, name="log-emitter", daemon=True)
+        self._thread.start()
+
+    def emit(self, line: str) -> None:
+        """
+        Queue ``line`` for writing; never blocks under the ``drop`` policy.
+        Under ``block`` it waits for space, so call ``emit_async`` on a loop.
+        """
+
+        self.stats.emitted += 1
+        self._ring.append(line)
+        if self._closed:
+            self.stats.dropped += 1
+            return
+        if self.policy == "block":
+            self._queue.put(line)
+            return
+        try:
+            self._queue.put_nowait(line)
+        except queue.Full:
+            self.stats.dropped += 1
+
+    async def emit_async(self, line: str) -> None:
+        """``emit`` for coroutines: a full ``block`` queue is waited on off the loop."""
+
+        if self.policy != "block" or self._closed:
+            self.emit(line)
+            return
+        self.stats.emitted += 1
+        self._ring.append(line)
+        try:
+            self._queue.put_nowait(line)
+        except queue.Full:
+            await asyncio.to_thread(self._queue.put, line)
+
+    def recent(self, count: int | None = None) -> list[str]:
+        """The last ``count`` lines handed to ``emit`` (all of the ring by default)."""
+
+        lines = list(self._ring)
+        return lines if count is None else lines[-count:]
+
+    def _drain(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self._batch_lines:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = _STOP in batch
+            lines = [item for item in batch if item is not _STOP]
+            try:
+                if lines:
+                    self._sink("".join(f"{line}\n" for line in lines))
+                    self.stats.written += len(lines)
+                    self.stats.batches += 1
+            except Exception:
+                # A broken sink (e.g. closed pipe) must not kill the agents.
+                self.stats.dropped += len(lines)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+            if stop:
+                return
+
+    def flush(self, timeout: float | None = 5.0) -> bool:
+        """Wait until every queued line has been written; False on timeout."""
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if not self._thread.is_alive():
+                return False
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.005)
+        return True
+
+    def close(self, timeout: float = 5.0) -> None:
+        """Write what is queued, stop the thread and report dropped lines."""
+
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            pass
+        self._thread.join(timeout)
+        if self.stats.dropped:
+            sys.stderr.write(
+                f"[verbose] dropped {self.stats.dropped} of {self.stats.emitted} log line(s); "
+                "set VERBOSE_LOG_POLICY=block to keep them all\n"
+            )
+
+
+_default: LogEmitter | None = None
+_default_lock = threading.Lock()
+
+
+def default_emitter() -> LogEmitter:
+    """Process-wide emitter writing to stdout, closed (and drained) at exit."""
+
+    global _default
+    with _default_lock:
+        if _default is None:
+            _default = LogEmitter()
+            atexit.register(_default.close)
+        return _default
+
+
+__all__ = ["EmitterStats", "LogEmitter", "default_emitter"]
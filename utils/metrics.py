@@ -0,0 +1,413 @@
+"""
+Prometheus-style metrics for agent runs, served on a local ``/metrics`` page.
+
+``MetricsRunHooks`` counts LLM calls, tokens, tool calls (by tool name and
+ok/error status), handoffs, turns per run and failed runs and LLM calls,
+with latency histograms for LLM and tool calls. Updating a metric is a dict lookup plus an add under a
+lock, cheap enough to leave on in long-lived workers. Backend request and
+failure counts from the pooled Ollama model are read at scrape time.
+
+Start it with ``--metrics-port 9464`` on any stage (or ``enable_metrics``)
+and scrape ``http://127.0.0.1:9464/metrics``. The page uses the Prometheus
+text format (0.0.4) and needs no client library.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import sys
+import threading
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from time import perf_counter
+from typing import Any, Callable, Iterable
+
+from agents import Agent
+from agents.items import ModelResponse
+from agents.lifecycle import RunHooksBase
+from agents.run_context import RunContextWrapper
+from agents.tool import Tool
+
+from utils.hooks import RunScope, install_run_hooks, run_key, tool_failure, watch_tool_failures
+
+LLM_LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+TOOL_LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0)
+TURN_BUCKETS = (1, 2, 3, 5, 8, 13, 21, 34)
+
+Labels = tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: Labels, values: Labels, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labels: Labels = ()) -> None:
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self._lock = threading.Lock()
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return lines
+
+    def _samples(self) -> list[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labels: Labels = ()) -> None:
+        super().__init__(name, help_text, labels)
+        self._values: dict[Labels, float] = {}
+
+    def inc(self, *label_values: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def set(self, *label_values: str, value: float) -> None:
+        """Mirror a total that is kept elsewhere (or, for gauges, a level)."""
+
+        with self._lock:
+            self._values[label_values] = value
+
+    def value(self, *label_values: str) -> float:
+        return self._values.get(label_values, 0)
+
+    def total(self, **match: str) -> float:
+        """Sum over every label set, or those whose labels equal ``match``."""
+
+        positions = [(self.labels.index(name), value) for name, value in match.items()]
+        with self._lock:
+            return sum(
+                value
+                for values, value in self._values.items()
+                if all(values[index] == wanted for index, wanted in positions)
+            )
+
+    def _samples(self) -> list[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [
+            f"{self.name}{_format_labels(self.labels, values)} {_number(value)}"
+            for values, value in items
+        ]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self, name: str, help_text: str, labels: Labels = (), buckets: Iterable[float] = ()
+    ) -> None:
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: per-bucket (non-cumulative) counts, then sum and count.
+        self._series: dict[Labels, list[float]] = {}
+
+    def observe(self, value: float, *label_values: str) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0.0] * (len(self.buckets) + 3)
+            series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def count(self, *label_values: str) -> int:
+        series = self._series.get(label_values)
+        return int(series[-1]) if series else 0
+
+    def total(self) -> tuple[int, float]:
+        """Observation count and sum over every label set."""
+
+        with self._lock:
+            return (
+                int(sum(series[-1] for series in self._series.values())),
+                sum(series[-2] for series in self._series.values()),
+            )
+
+    def _samples(self) -> list[str]:
+        with self._lock:
+            items = sorted((values, list(series)) for values, series in self._series.items())
+        lines = []
+        for values, series in items:
+            cumulative = 0.0
+            for bound, count in zip((*self.buckets, float("inf")), series):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else _number(bound)
+                labels = _format_labels(self.labels, values, f'le="{le}"')
+                lines.append(f"{self.name}_bucket{labels} {_number(cumulative)}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, values)} {_number(series[-2])}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, values)} {_number(series[-1])}")
+        return lines
+
+
+class MetricsRegistry:
+    """Ordered set of metrics plus callbacks that refresh gauges at scrape time."""
+
+    def __init__(self) -> None:
+        self._metrics: list[_Metric] = []
+        self._collectors: list[Callable[[], None]] = []
+
+    def register(self, metric: _Metric) -> Any:
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, collect: Callable[[], None]) -> None:
+        self._collectors.append(collect)
+
+    def render(self) -> str:
+        for collect in self._collectors:
+            collect()
+        lines: list[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+def _agent_name(agent: Agent[Any]) -> str:
+    return getattr(agent, "name", agent.__class__.__name__)
+
+
+def _tool_name(tool: Tool) -> str:
+    return getattr(tool, "name", tool.__class__.__name__)
+
+
+class MetricsRunHooks(RunHooksBase[Any, Agent[Any]]):
+    """
+    Collect run metrics into ``registry``.
+
+    Like ``TracingRunHooks``, runs are keyed by ``run_key`` and tool calls by
+    ``tool_call_id``, so one instance serves concurrent runs. A tool call
+    counts as an error when it raised or an MCP server flagged its result
+    (see ``utils.hooks.watch_tool_failures``); a run, an in-flight LLM call
+    or an in-flight tool call counts as one when ``run_agent`` ends by an
+    exception or cancellation.
+    """
+
+    def __init__(self, registry: MetricsRegistry | None = None) -> None:
+        self.registry = registry = registry or MetricsRegistry()
+        self.llm_requests = registry.register(
+            Counter("agent_llm_requests_total", "Completed LLM calls.", ("agent",))
+        )
+        self.llm_latency = registry.register(
+            Histogram(
+                "agent_llm_latency_seconds", "LLM call latency.", ("agent",), LLM_LATENCY_BUCKETS
+            )
+        )
+        self.prompt_tokens = registry.register(
+            Counter("agent_llm_prompt_tokens_total", "Prompt (input) tokens.", ("agent",))
+        )
+        self.completion_tokens = registry.register(
+            Counter("agent_llm_completion_tokens_total", "Completion (output) tokens.", ("agent",))
+        )
+        self.tool_calls = registry.register(
+            Counter("agent_tool_calls_total", "Tool calls by outcome.", ("tool", "status"))
+        )
+        self.tool_latency = registry.register(
+            Histogram(
+                "agent_tool_latency_seconds", "Tool call latency.", ("tool",), TOOL_LATENCY_BUCKETS
+            )
+        )
+        self.handoffs = registry.register(
+            Counter("agent_handoffs_total", "Handoffs between agents.", ("from_agent", "to_agent"))
+        )
+        self.llm_errors = registry.register(
+            Counter("agent_llm_call_errors_total", "LLM calls cut short by a run error.", ("agent", "error"))
+        )
+        self.runs = registry.register(Counter("agent_runs_total", "Runs that produced a final output."))
+        self.run_errors = registry.register(
+            Counter("agent_run_errors_total", "Runs that raised or were cancelled.", ("error",))
+        )
+        self.runs_in_progress = registry.register(
+            Gauge("agent_runs_in_progress", "Runs started and not yet finished.")
+        )
+        self.run_turns = registry.register(
+            Histogram("agent_run_turns", "LLM turns per finished run.", (), TURN_BUCKETS)
+        )
+        self.backend_requests = registry.register(
+            Counter("agent_backend_requests_total", "Model requests finished per backend.", ("backend",))
+        )
+        self.backend_failures = registry.register(
+            Counter("agent_backend_failures_total", "Model requests that failed per backend.", ("backend",))
+        )
+        self.backend_outstanding = registry.register(
+            Gauge("agent_backend_outstanding", "Model requests in flight per backend.", ("backend",))
+        )
+        registry.add_collector(self._collect_backends)
+        self._llm_started: dict[object, tuple[float, str]] = {}
+        self._tool_started: dict[str, tuple[float, object, str]] = {}
+        self._turns: dict[object, int] = {}
+        self._lock = threading.Lock()
+
+    def _collect_backends(self) -> None:
+        adaptor = sys.modules.get("utils.ollama_adaptor")
+        stats = adaptor.pool_stats() if adaptor is not None else None
+        for backend in stats or ():
+            url = backend["base_url"]
+            self.backend_requests.set(url, value=backend["requests"])
+            self.backend_failures.set(url, value=backend["failures"])
+            self.backend_outstanding.set(url, value=backend["outstanding"])
+
+    async def on_agent_start(self, context: RunContextWrapper[Any], agent: Agent[Any]) -> None:
+        key = run_key(context)
+        with self._lock:
+            if key in self._turns:
+                return
+            self._turns[key] = 0
+        self.runs_in_progress.inc()
+
+    async def on_agent_end(
+        self, context: RunContextWrapper[Any], agent: Agent[Any], output: Any
+    ) -> None:
+        with self._lock:
+            turns = self._turns.pop(run_key(context), None)
+        if turns is None:
+            return
+        self.runs_in_progress.inc(amount=-1)
+        self.runs.inc()
+        self.run_turns.observe(turns)
+
+    def on_run_finished(self, run: RunScope, error: BaseException | None) -> None:
+        with self._lock:
+            turns = self._turns.pop(run, None)
+            llm = self._llm_started.pop(run, None)
+            tools = [
+                (call_id, started)
+                for call_id, started in self._tool_started.items()
+                if started[1] is run
+            ]
+            for call_id, _started in tools:
+                del self._tool_started[call_id]
+        if turns is not None:
+            # on_agent_end never ran: the run failed or was cancelled.
+            self.runs_in_progress.inc(amount=-1)
+        if error is None:
+            return
+        reason = "cancelled" if isinstance(error, asyncio.CancelledError) else type(error).__name__
+        self.run_errors.inc(reason)
+        if llm is not None:
+            self.llm_errors.inc(llm[1], reason)
+        # Tool calls that never reached on_tool_end raised out of the run
+        # (an MCP server that went away, say) or were cut short with it.
+        for _call_id, (started, _key, name) in tools:
+            self.tool_calls.inc(name, "error")
+            self.tool_latency.observe(perf_counter() - started, name)
+
+    async def on_handoff(
+        self, context: RunContextWrapper[Any], from_agent: Agent[Any], to_agent: Agent[Any]
+    ) -> None:
+        self.handoffs.inc(_agent_name(from_agent), _agent_name(to_agent))
+
+    async def on_llm_start(
+        self,
+        context: RunContextWrapper[Any],
+        agent: Agent[Any],
+        system_prompt: str | None,
+        input_items: list[Any],
+    ) -> None:
+        with self._lock:
+            self._llm_started[run_key(context)] = (perf_counter(), _agent_name(agent))
+
+    async def on_llm_end(
+        self, context: RunContextWrapper[Any], agent: Agent[Any], response: ModelResponse
+    ) -> None:
+        key = run_key(context)
+        with self._lock:
+            started = self._llm_started.pop(key, None)
+            if key in self._turns:
+                self._turns[key] += 1
+        name = _agent_name(agent)
+        self.llm_requests.inc(name)
+        if started is not None:
+            self.llm_latency.observe(perf_counter() - started[0], name)
+        self.prompt_tokens.inc(name, amount=response.usage.input_tokens)
+        self.completion_tokens.inc(name, amount=response.usage.output_tokens)
+
+    async def on_tool_start(
+        self, context: RunContextWrapper[Any], agent: Agent[Any], tool: Tool
+    ) -> None:
+        watch_tool_failures(agent)
+        call_id = getattr(context, "tool_call_id", None) or str(id(context))
+        with self._lock:
+            self._tool_started[call_id] = (perf_counter(), run_key(context), _tool_name(tool))
+
+    async def on_tool_end(
+        self, context: RunContextWrapper[Any], agent: Agent[Any], tool: Tool, result: Any
+    ) -> None:
+        call_id = getattr(context, "tool_call_id", None) or str(id(context))
+        with self._lock:
+            started = self._tool_started.pop(call_id, None)
+        name = _tool_name(tool)
+        self.tool_calls.inc(name, "ok" if tool_failure() is None else "error")
+        if started is not None:
+            self.tool_latency.observe(perf_counter() - started[0], name)
+
+
+def serve_metrics(
+    registry: MetricsRegistry, host: str = "127.0.0.1", port: int = 9464
+) -> ThreadingHTTPServer:
+    """Serve ``registry`` on ``http://host:port/metrics`` from a daemon thread."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self) -> None:  # noqa: N802 - http.server naming
+            if self.path.split("?", 1)[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = registry.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format: str, *args: Any) -> None:
+            pass  # Scrapes every few seconds would drown the agent output.
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    return server
+
+
+def enable_metrics(port: int, host: str = "127.0.0.1") -> MetricsRunHooks:
+    """Attach metrics hooks to every run and serve them on ``/metrics``."""
+
+    hooks = MetricsRunHooks()
+    install_run_hooks(hooks)
+    server = serve_metrics(hooks.registry, host, port)
+    print(f"Serving metrics on http://{host}:{server.server_address[1]}/metrics", file=sys.stderr)
+    return hooks
+
+
+__all__ = [
+    "Counter",
+    "Gauge",
+    "Histogram",
+    "MetricsRegistry",
+    "MetricsRunHooks",
+    "enable_metrics",
+    "serve_metrics",
+]
@@ -0,0 +1,427 @@
+from __future__ import annotations
+
+import asyncio
+import dataclasses
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections.abc import AsyncIterator
+from pathlib import Path
+from typing import Any
+
+from agents import Model, ModelSettings, ModelTracing
+from agents.agent_output import AgentOutputSchemaBase
+from agents.handoffs import Handoff
+from agents.items import ModelResponse, TResponseInputItem, TResponseOutputItem
+from agents.tool import FunctionTool, Tool
+from agents.usage import Usage
+from openai.types.responses import Response, ResponseCompletedEvent, ResponseUsage
+from openai.types.responses.response_usage import InputTokensDetails, OutputTokensDetails
+from openai.types.responses.response_prompt_param import ResponsePromptParam
+from pydantic import BaseModel, TypeAdapter
+
+logger = logging.getLogger(__name__)
+
+_OUTPUT_ITEMS = TypeAdapter(list[TResponseOutputItem])
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json", exclude_unset=True)
+    if dataclasses.is_dataclass(value) and not isinstance(value, type):
+        return dataclasses.asdict(value)
+    return repr(value)
+
+
+def _tool_fingerprint(tool: Tool) -> dict[str, Any]:
+    if isinstance(tool, FunctionTool):
+        return {
+            "name": tool.name,
+            "description": tool.description,
+            "parameters": tool.params_json_schema,
+        }
+    return {"name": getattr(tool, "name", tool.__class__.__name__)}
+
+
+def build_cache_key(
+    system_instructions: str | None,
+    input: str | list[TResponseInputItem],
+    model_settings: ModelSettings,
+    tools: list[Tool],
+    output_schema: AgentOutputSchemaBase | None,
+    handoffs: list[Handoff],
+    *,
+    model_name: str,
+    previous_response_id: str | None = None,
+    conversation_id: str | None = None,
+    prompt: ResponsePromptParam | None = None,
+) -> str:
+    """
+    Hash the normalized request into a stable cache key.
+    """
+
+    payload = {
+        "model": model_name,
+        "system": system_instructions,
+        "input": input,
+        "settings": model_settings.to_json_dict(),
+        "tools": [_tool_fingerprint(tool) for tool in tools],
+        "output_schema": (
+            output_schema.json_schema()
+            if output_schema is not None and not output_schema.is_plain_text()
+            else None
+        ),
+        "handoffs": [
+            {
+                "name": handoff.tool_name,
+                "description": handoff.tool_description,
+                "parameters": handoff.input_json_schema,
+            }
+            for handoff in handoffs
+        ],
+        "previous_response_id": previous_response_id,
+        "conversation_id": conversation_id,
+        "prompt": prompt,
+    }
+    encoded = json.dumps(
+        payload, sort_keys=True, ensure_ascii=False, default=_json_default
+    )
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+@dataclasses.dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    stores: int = 0
+    evictions: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+class ResponseStore:
+    """
+    SQLite-backed key/value store with size-bounded LRU eviction.
+
+    Hits only record their access time in memory; the touches are written in
+    one batch once ``touch_batch`` accumulate, before any eviction, and on
+    ``flush()``. Calls block on disk I/O, so async code goes through
+    ``asyncio.to_thread``.
+    """
+
+    def __init__(
+        self, path: Path, max_bytes: int = 64 * 1024 * 1024, touch_batch: int = 64
+    ) -> None:
+        self.path = path
+        self.max_bytes = max_bytes
+        self.touch_batch = touch_batch
+        self.stats = CacheStats()
+        self._lock = threading.Lock()
+        self._touched: dict[str, float] = {}
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY,"
+            " value TEXT NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " last_used REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS responses_last_used ON responses(last_used)"
+        )
+        self._conn.commit()
+
+    def get(self, key: str) -> str | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.stats.misses += 1
+                return None
+            self._touched[key] = time.time()
+            if len(self._touched) >= self.touch_batch:
+                self._write_touches()
+                self._conn.commit()
+            self.stats.hits += 1
+            return row[0]
+
+    def put(self, key: str, value: str) -> None:
+        size = len(value.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, size, last_used)"
+                " VALUES (?, ?, ?, ?)",
+                (key, value, size, time.time()),
+            )
+            self.stats.stores += 1
+            self._touched.pop(key, None)
+            self._write_touches()
+            self._evict()
+            self._conn.commit()
+
+    def flush(self) -> None:
+        """Write pending access times."""
+
+        with self._lock:
+            if self._touched:
+                self._write_touches()
+                self._conn.commit()
+
+    def _write_touches(self) -> None:
+        if not self._touched:
+            return
+        self._conn.executemany(
+            "UPDATE responses SET last_used = ? WHERE key = ?",
+            [(used, key) for key, used in self._touched.items()],
+        )
+        self._touched.clear()
+
+    def _evict(self) -> None:
+        (total,) = self._conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM responses"
+        ).fetchone()
+        if total <= self.max_bytes:
+            return
+        rows = self._conn.execute(
+            "SELECT key, size FROM responses ORDER BY last_used ASC"
+        ).fetchall()
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            total -= size
+            self.stats.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._touched.clear()
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+
+
+def dump_output(output: list[TResponseOutputItem]) -> list[dict[str, Any]]:
+    """JSON-ready form of a response's output items."""
+
+    return [item.model_dump(mode="json", exclude_unset=True) for item in output]
+
+
+def load_output(items: list[dict[str, Any]]) -> list[TResponseOutputItem]:
+    return _OUTPUT_ITEMS.validate_python(items)
+
+
+def completed_event(
+    output: list[TResponseOutputItem],
+    model_name: str,
+    usage: Usage | None = None,
+    response_id: str = "__cached__",
+) -> ResponseCompletedEvent:
+    """
+    Wrap stored output in a single ``response.completed`` event; the runner
+    builds the turn result from it just like a live stream.
+    """
+
+    response_usage = None
+    if usage is not None:
+        response_usage = ResponseUsage(
+            input_tokens=usage.input_tokens,
+            output_tokens=usage.output_tokens,
+            total_tokens=usage.total_tokens,
+            input_tokens_details=InputTokensDetails(cached_tokens=0),
+            output_tokens_details=OutputTokensDetails(reasoning_tokens=0),
+        )
+    return ResponseCompletedEvent(
+        type="response.completed",
+        sequence_number=0,
+        response=Response(
+            id=response_id,
+            created_at=time.time(),
+            model=model_name,
+            object="response",
+            output=output,
+            tool_choice="auto",
+            tools=[],
+            parallel_tool_calls=False,
+            usage=response_usage,
+        ),
+    )
+
+
+def _dump_response(output: list[TResponseOutputItem]) -> str:
+    return json.dumps(dump_output(output), ensure_ascii=False)
+
+
+def _load_response(value: str) -> list[TResponseOutputItem]:
+    return _OUTPUT_ITEMS.validate_json(value)
+
+
+class CachingModel(Model):
+    """
+    Model wrapper that serves repeated requests from a persistent store.
+
+    Cache hits skip the wrapped model entirely and report zero token usage.
+    Agents that need fresh sampling opt out by using the wrapped model
+    directly (``utils.ollama_adaptor.uncached_model``).
+    """
+
+    def __init__(self, inner: Model, store: ResponseStore) -> None:
+        self.inner = inner
+        self.store = store
+        self.model = getattr(inner, "model", inner.__class__.__name__)
+
+    @property
+    def uncached(self) -> Model:
+        """The wrapped model, for agents that must always hit the backend."""
+
+        return self.inner
+
+    @property
+    def cache_stats(self) -> CacheStats:
+        return self.store.stats
+
+    def _key(
+        self,
+        system_instructions: str | None,
+        input: str | list[TResponseInputItem],
+        model_settings: ModelSettings,
+        tools: list[Tool],
+        output_schema: AgentOutputSchemaBase | None,
+        handoffs: list[Handoff],
+        previous_response_id: str | None,
+        conversation_id: str | None,
+        prompt: ResponsePromptParam | None,
+    ) -> str:
+        return build_cache_key(
+            system_instructions,
+            input,
+            model_settings,
+            tools,
+            output_schema,
+            handoffs,
+            model_name=str(self.model),
+            previous_response_id=previous_response_id,
+            conversation_id=conversation_id,
+            prompt=prompt,
+        )
+
+    async def _lookup(self, key: str) -> list[TResponseOutputItem] | None:
+        cached = await asyncio.to_thread(self.store.get, key)
+        if cached is None:
+            return None
+        try:
+            return _load_response(cached)
+        except Exception:
+            logger.warning("Discarding unreadable cache entry %s", key)
+            return None
+
+    async def get_response(
+        self,
+        system_instructions: str | None,
+        input: str | list[TResponseInputItem],
+        model_settings: ModelSettings,
+        tools: list[Tool],
+        output_schema: AgentOutputSchemaBase | None,
+        handoffs: list[Handoff],
+        tracing: ModelTracing,
+        *,
+        previous_response_id: str | None = None,
+        conversation_id: str | None = None,
+        prompt: ResponsePromptParam | None = None,
+    ) -> ModelResponse:
+        key = self._key(
+            system_instructions,
+            input,
+            model_settings,
+            tools,
+            output_schema,
+            handoffs,
+            previous_response_id,
+            conversation_id,
+            prompt,
+        )
+        output = await self._lookup(key)
+        if output is not None:
+            return ModelResponse(output=output, usage=Usage(), response_id=None)
+
+        response = await self.inner.get_response(
+            system_instructions,
+            input,
+            model_settings,
+            tools,
+            output_schema,
+            handoffs,
+            tracing,
+            previous_response_id=previous_response_id,
+            conversation_id=conversation_id,
+            prompt=prompt,
+        )
+        await asyncio.to_thread(self.store.put, key, _dump_response(response.output))
+        return response
+
+    async def stream_response(
+        self,
+        system_instructions: str | None,
+        input: str | list[TResponseInputItem],
+        model_settings: ModelSettings,
+        tools: list[Tool],
+        output_schema: AgentOutputSchemaBase | None,
+        handoffs: list[Handoff],
+        tracing: ModelTracing,
+        *,
+        previous_response_id: str | None = None,
+        conversation_id: str | None = None,
+        prompt: ResponsePromptParam | None = None,
+    ) -> AsyncIterator[Any]:
+        key = self._key(
+            system_instructions,
+            input,
+            model_settings,
+            tools,
+            output_schema,
+            handoffs,
+            previous_response_id,
+            conversation_id,
+            prompt,
+        )
+        output = await self._lookup(key)
+        if output is not None:
+            yield completed_event(output, str(self.model))
+            return
+
+        async for event in self.inner.stream_response(
+            system_instructions,
+            input,
+            model_settings,
+            tools,
+            output_schema,
+            handoffs,
+            tracing,
+            previous_response_id=previous_response_id,
+            conversation_id=conversation_id,
+            prompt=prompt,
+        ):
+            if isinstance(event, ResponseCompletedEvent):
+                await asyncio.to_thread(
+                    self.store.put, key, _dump_response(event.response.output)
+                )
+            yield event
+
+
+__all__ = [
+    "CacheStats",
+    "CachingModel",
+    "ResponseStore",
+    "build_cache_key",
+    "completed_event",
+    "dump_output",
+    "load_output",
+]
@@ -1,32 +1,399 @@
+import atexit
 import logging
 import os
+import sys
+import time
+from collections.abc import AsyncIterator
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable
 
+import httpx
 from agents import (
+    Model,
     OpenAIChatCompletionsModel,
     set_default_openai_client,
     set_tracing_disabled,
 )
-from openai import AsyncOpenAI
+from openai import APIConnectionError, AsyncOpenAI
+
+from .scheduler import RequestScheduler
 
 logger = logging.getLogger(__name__)
 
 
 OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL", "http://ollama:11434/v1")
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "ollama")
+# Comma-separated list of Ollama hosts; falls back to the single OPENAI_BASE_URL.
+OPENAI_BASE_URLS = [
+    url.strip()
+    for url in os.getenv("OPENAI_BASE_URLS", OPENAI_BASE_URL).split(",")
+    if url.strip()
+]
+MODEL_NAME = "qwen3-coder:30b"
+
+POOL_MAX_CONNECTIONS = int(os.getenv("OLLAMA_POOL_MAX_CONNECTIONS", "64"))
+POOL_MAX_KEEPALIVE = int(os.getenv("OLLAMA_POOL_MAX_KEEPALIVE", "32"))
+POOL_KEEPALIVE_EXPIRY = float(os.getenv("OLLAMA_POOL_KEEPALIVE_EXPIRY", "120"))
+CONNECT_TIMEOUT = float(os.getenv("OLLAMA_CONNECT_TIMEOUT", "5"))
+REQUEST_TIMEOUT = float(os.getenv("OLLAMA_REQUEST_TIMEOUT", "600"))
+
+BACKEND_MAX_FAILURES = int(os.getenv("OLLAMA_BACKEND_MAX_FAILURES", "3"))
+BACKEND_SLOW_SECONDS = float(os.getenv("OLLAMA_BACKEND_SLOW_SECONDS", "180"))
+BACKEND_COOLDOWN_SECONDS = float(os.getenv("OLLAMA_BACKEND_COOLDOWN_SECONDS", "30"))
+LATENCY_EWMA_ALPHA = 0.3
+# Concurrent requests admitted per backend; the rest wait in the scheduler queue.
+BACKEND_MAX_IN_FLIGHT = int(os.getenv("OLLAMA_MAX_IN_FLIGHT", "4"))
 
+# Off by default: most agents sample with temperature > 0, where replaying one
+# stored answer changes their behaviour.
+RESPONSE_CACHE_ENABLED = os.getenv("OLLAMA_RESPONSE_CACHE", "0") == "1"
+RESPONSE_CACHE_PATH = Path(
+    os.getenv(
+        "OLLAMA_RESPONSE_CACHE_PATH",
+        Path(__file__).resolve().parent.parent / ".cache" / "model_responses.sqlite3",
+    )
+)
+RESPONSE_CACHE_MAX_MB = float(os.getenv("OLLAMA_RESPONSE_CACHE_MAX_MB", "64"))
 
-def get_openai_client():
+
+def get_openai_client(base_url: str = OPENAI_BASE_URL) -> AsyncOpenAI:
+    """
+    Build an AsyncOpenAI client with a keep-alive connection pool sized for
+    many concurrent agent runs against one backend.
+    """
+
+    http_client = httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=POOL_MAX_CONNECTIONS,
+            max_keepalive_connections=POOL_MAX_KEEPALIVE,
+            keepalive_expiry=POOL_KEEPALIVE_EXPIRY,
+        ),
+        timeout=httpx.Timeout(REQUEST_TIMEOUT, connect=CONNECT_TIMEOUT),
+    )
     return AsyncOpenAI(
-        base_url=OPENAI_BASE_URL,
+        base_url=base_url,
         api_key=OPENAI_API_KEY,
+        http_client=http_client,
     )
 
 
-client = get_openai_client()
-set_default_openai_client(client)
+@dataclass
+class Backend:
+    """One Ollama host plus the bookkeeping used for balancing and health."""
+
+    base_url: str
+    client: AsyncOpenAI
+    model: OpenAIChatCompletionsModel
+    max_in_flight: int = BACKEND_MAX_IN_FLIGHT
+    outstanding: int = 0
+    consecutive_failures: int = 0
+    latency_ewma: float | None = None
+    ejected_until: float = 0.0
+    requests: int = 0
+    failures: int = 0
+
+    def is_healthy(self, now: float) -> bool:
+        return now >= self.ejected_until
+
+    def record_success(self, latency: float) -> None:
+        self.requests += 1
+        self.consecutive_failures = 0
+        if self.latency_ewma is None:
+            self.latency_ewma = latency
+        else:
+            self.latency_ewma += LATENCY_EWMA_ALPHA * (latency - self.latency_ewma)
+        if self.latency_ewma > BACKEND_SLOW_SECONDS:
+            self._eject(f"average latency {self.latency_ewma:.1f}s")
+            # Start fresh when the host is re-admitted after the cooldown.
+            self.latency_ewma = None
+
+    def record_failure(self, exc: BaseException) -> None:
+        self.requests += 1
+        self.failures += 1
+        self.consecutive_failures += 1
+        if self.consecutive_failures >= BACKEND_MAX_FAILURES:
+            self._eject(f"{self.consecutive_failures} consecutive failures ({exc!r})")
+            self.consecutive_failures = 0
+
+    def _eject(self, reason: str) -> None:
+        self.ejected_until = time.monotonic() + BACKEND_COOLDOWN_SECONDS
+        logger.warning(
+            "Ejecting backend %s for %.0fs: %s",
+            self.base_url,
+            BACKEND_COOLDOWN_SECONDS,
+            reason,
+        )
+
+
+class PooledChatCompletionsModel(Model):
+    """
+    Spread chat-completions calls across several backends.
+
+    Each request goes to the healthy backend with the fewest outstanding
+    requests (ties broken by average latency), provided it is below its
+    ``max_in_flight`` limit; otherwise the request waits in a priority queue
+    (see ``utils.scheduler``). Hosts that keep failing or run too slowly are
+    ejected for a cooldown window; if every host is ejected the one closest to
+    re-admission is used rather than failing outright. Connection failures are
+    retried once on each remaining backend.
+    """
+
+    def __init__(self, backends: list[Backend], model_name: str = MODEL_NAME) -> None:
+        if not backends:
+            raise ValueError("PooledChatCompletionsModel needs at least one backend.")
+        self.model = model_name
+        self.backends = backends
+        self.scheduler: RequestScheduler[Backend] = RequestScheduler(
+            grant=self._reserve, abandon=self._unreserve
+        )
+
+    def _reserve(self, exclude: frozenset[str]) -> Backend | None:
+        candidates = [b for b in self.backends if b.base_url not in exclude]
+        now = time.monotonic()
+        healthy = [b for b in candidates if b.is_healthy(now)]
+        pool = healthy or candidates
+        free = [b for b in pool if b.outstanding < b.max_in_flight]
+        if not free:
+            return None
+        if healthy:
+            backend = min(free, key=lambda b: (b.outstanding, b.latency_ewma or 0.0))
+        else:
+            backend = min(free, key=lambda b: b.ejected_until)
+        backend.outstanding += 1
+        return backend
+
+    def _unreserve(self, backend: Backend) -> None:
+        backend.outstanding -= 1
+
+    def _release(self, backend: Backend) -> None:
+        self._unreserve(backend)
+        self.scheduler.release()
+
+    async def get_response(self, *args: Any, **kwargs: Any):
+        tried: frozenset[str] = frozenset()
+        while True:
+            backend = await self.scheduler.acquire(exclude=tried)
+            tried |= {backend.base_url}
+            started = time.monotonic()
+            try:
+                response = await backend.model.get_response(*args, **kwargs)
+            except APIConnectionError as exc:
+                backend.record_failure(exc)
+                if len(tried) == len(self.backends):
+                    raise
+                logger.info("Retrying on another backend after %s failed", backend.base_url)
+                continue
+            except Exception as exc:
+                backend.record_failure(exc)
+                raise
+            finally:
+                self._release(backend)
+            backend.record_success(time.monotonic() - started)
+            return response
+
+    async def stream_response(self, *args: Any, **kwargs: Any) -> AsyncIterator[Any]:
+        backend = await self.scheduler.acquire()
+        started = time.monotonic()
+        try:
+            async for event in backend.model.stream_response(*args, **kwargs):
+                yield event
+        except Exception as exc:
+            backend.record_failure(exc)
+            raise
+        else:
+            backend.record_success(time.monotonic() - started)
+        finally:
+            self._release(backend)
+
+    def stats(self) -> list[dict[str, Any]]:
+        """Snapshot of per-backend load and health for logging/metrics."""
+
+        now = time.monotonic()
+        return [
+            {
+                "base_url": b.base_url,
+                "outstanding": b.outstanding,
+                "latency_ewma": b.latency_ewma,
+                "healthy": b.is_healthy(now),
+                "requests": b.requests,
+                "failures": b.failures,
+            }
+            for b in self.backends
+        ]
+
+    def scheduler_stats(self) -> dict[str, float]:
+        """Queue depth and wait-time snapshot from the request scheduler."""
+
+        return self.scheduler.stats.snapshot()
+
+
+def build_backends(base_urls: list[str] = OPENAI_BASE_URLS) -> list[Backend]:
+    backends: list[Backend] = []
+    for base_url in base_urls:
+        backend_client = get_openai_client(base_url)
+        backends.append(
+            Backend(
+                base_url=base_url,
+                client=backend_client,
+                model=OpenAIChatCompletionsModel(model=MODEL_NAME, openai_client=backend_client),
+            )
+        )
+    return backends
+
+
+class LazyModel(Model):
+    """
+    Placeholder that builds the real model on first use.
+
+    Importing this module stays cheap: HTTP clients, connection pools and the
+    response cache are only created when an agent first calls the model.
+    Other attribute access is forwarded to the built model.
+    """
+
+    def __init__(self, factory: Callable[[], Model]) -> None:
+        self._factory = factory
+        self._resolved: Model | None = None
+
+    def resolve(self) -> Model:
+        if self._resolved is None:
+            self._resolved = self._factory()
+        return self._resolved
+
+    def __getattr__(self, name: str) -> Any:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return getattr(self.resolve(), name)
+
+    async def get_response(self, *args: Any, **kwargs: Any):
+        return await self.resolve().get_response(*args, **kwargs)
+
+    async def stream_response(self, *args: Any, **kwargs: Any) -> AsyncIterator[Any]:
+        async for event in self.resolve().stream_response(*args, **kwargs):
+            yield event
+
+
+_backends: list[Backend] | None = None
+
+
+def get_backends() -> list[Backend]:
+    """Build the backend pool once and register it as the SDK default client."""
+
+    global _backends
+    if _backends is None:
+        _backends = build_backends()
+        set_default_openai_client(_backends[0].client)
+    return _backends
+
+
+_pooled: PooledChatCompletionsModel | None = None
+_cassette_model: Model | None = None
+
+
+def _parse_cassette(value: str) -> tuple[str, Path] | None:
+    mode, _, path = value.partition(":")
+    if not value:
+        return None
+    if mode not in ("record", "replay", "replay-lenient") or not path:
+        raise ValueError(
+            "AGENT_CASSETTE must be 'record:<path>', 'replay:<path>' or "
+            f"'replay-lenient:<path>', got {value!r}."
+        )
+    return mode, Path(path)
+
+
+# "record:<path>", "replay:<path>" or "replay-lenient:<path>"; the CLI flags
+# call use_cassette() instead.
+_cassette = _parse_cassette(os.getenv("AGENT_CASSETTE", ""))
+
+
+def use_cassette(mode: str, path: str | Path) -> None:
+    """
+    Record every model call to ``path`` or replay them from it instead of
+    contacting Ollama. ``"replay"`` fails on the first request the cassette
+    does not hold; ``"replay-lenient"`` serves the next recorded call instead.
+    Must be called before the first model call.
+    """
+
+    global _cassette
+    if model._resolved is not None or uncached_model._resolved is not None:
+        raise RuntimeError("Configure the cassette before the first model call.")
+    _cassette = _parse_cassette(f"{mode}:{path}")
+
+
+def _pooled_model() -> PooledChatCompletionsModel:
+    global _pooled
+    if _pooled is None:
+        _pooled = PooledChatCompletionsModel(get_backends())
+    return _pooled
+
+
+def pool_stats() -> list[dict[str, Any]] | None:
+    """Per-backend stats of the pooled model, or None if it was never built."""
+
+    return _pooled.stats() if _pooled is not None else None
+
+
+def _with_cassette(build: Callable[[], Model]) -> Model:
+    """Apply the configured cassette mode around a freshly built model."""
+
+    global _cassette_model
+    if _cassette is None:
+        return build()
+    mode, path = _cassette
+    from .cassette import Cassette, CassetteWriter, RecordingModel, ReplayModel
+
+    if mode.startswith("replay"):
+        if _cassette_model is None:
+            _cassette_model = ReplayModel(
+                Cassette.load(path), lenient=mode == "replay-lenient"
+            )
+            atexit.register(lambda: print(_cassette_model.report(), file=sys.stderr))
+        return _cassette_model
+
+    if _cassette_model is None:
+        writer = CassetteWriter(path, MODEL_NAME)
+        _cassette_model = RecordingModel(build(), writer)
+        atexit.register(writer.close)
+        atexit.register(lambda: print(_cassette_model.report(), file=sys.stderr))
+        return _cassette_model
+    # The cached and uncached views share one cassette file.
+    return RecordingModel(build(), _cassette_model.writer)
+
+
+def _build_uncached_model() -> Model:
+    return _with_cassette(_pooled_model)
+
+
+def _build_model() -> Model:
+    def build() -> Model:
+        pooled = _pooled_model()
+        if not RESPONSE_CACHE_ENABLED:
+            return pooled
+        from .model_cache import CachingModel, ResponseStore
+
+        store = ResponseStore(
+            RESPONSE_CACHE_PATH,
+            max_bytes=int(RESPONSE_CACHE_MAX_MB * 1024 * 1024),
+        )
+        atexit.register(store.flush)
+        return CachingModel(pooled, store)
+
+    return _with_cassette(build)
+
+
+# Runner.run opens its trace before the first model call, so tracing has to be
+# switched off up front; the flag itself costs nothing.
 set_tracing_disabled(True)
 
-model = OpenAIChatCompletionsModel(
-    model="qwen3-coder:30b",
-    openai_client=client,
-)
+# Agents that need fresh sampling on every run use ``uncached_model``.
+uncached_model = LazyModel(_build_uncached_model)
+model = LazyModel(_build_model)
+
+
+def __getattr__(name: str) -> Any:
+    if name == "backends":
+        return get_backends()
+    if name == "client":
+        return get_backends()[0].client
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
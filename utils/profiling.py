@@ -0,0 +1,494 @@
+"""
+CPU and memory profiling for agent runs, attributed to agents and tools.
+
+``--profile-cpu PATH`` starts a sampling profiler: a daemon thread reads
+every thread's stack every few milliseconds with ``sys._current_frames``, so
+nothing is installed in the event loop's hot path (unlike ``cProfile``,
+whose per-call tracing also misattributes time across ``await``). Threads
+whose CPU clock did not move since the previous sample are idle and skipped.
+Samples from the loop thread are attributed to the asyncio task that is
+running: the hooks label each run's task with its agent (``agent › llm``
+during model calls) and each tool call's task with ``agent › tool``. The SDK
+calls hooks from child tasks created by ``asyncio.gather``, so a task
+factory records each task's parent to find the task a hook belongs to.
+Samples from worker threads (``asyncio.to_thread``) are grouped per thread.
+A ``.folded`` path writes collapsed stacks for flame graph tools
+(speedscope, ``flamegraph.pl``); any other path writes a text report.
+
+``--profile-mem PATH`` turns on ``tracemalloc`` and snapshots the heap at
+every agent, LLM and tool hook boundary. The report lists, per agent and tool,
+the memory a span left allocated and the source lines responsible, plus the
+peak and the largest allocation sites at exit. Spans that overlap (parallel
+tool calls, concurrent runs) see each other's allocations, so attribution is
+exact only for sequential work. Taking a snapshot blocks the event loop for
+roughly 0.1-0.5 s on a large heap, and the loop also waits once more than
+``MAX_PENDING_SNAPSHOTS`` are queued for the background thread that groups
+and diffs them, so expect runs to be several times slower under this flag.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import atexit
+import queue
+import sys
+import threading
+import time
+import tracemalloc
+import weakref
+from collections import Counter
+from pathlib import Path
+from types import CodeType, FrameType
+from typing import Any, Iterable
+
+from agents import Agent
+from agents.items import ModelResponse
+from agents.lifecycle import RunHooksBase
+from agents.run_context import RunContextWrapper
+from agents.tool import Tool
+
+from utils.hooks import install_run_hooks
+
+SAMPLE_INTERVAL = 0.005
+MAX_STACK_DEPTH = 128
+TOP_LABELS = 8
+TOP_FUNCTIONS = 12
+TOP_SITES = 10
+# Per snapshot comparison, only the largest changes are kept.
+SITES_PER_SPAN = 50
+# Raw snapshots waiting to be diffed; each can take tens of megabytes.
+MAX_PENDING_SNAPSHOTS = 4
+
+_SEPARATOR = " › "
+
+
+def _agent_name(agent: Agent[Any]) -> str:
+    return getattr(agent, "name", agent.__class__.__name__)
+
+
+def _tool_name(tool: Tool) -> str:
+    return getattr(tool, "name", tool.__class__.__name__)
+
+
+def _short_path(filename: str) -> str:
+    index = filename.rfind("site-packages/")
+    if index >= 0:
+        return filename[index + len("site-packages/") :]
+    try:
+        return str(Path(filename).relative_to(Path.cwd()))
+    except ValueError:
+        return filename
+
+
+def _function(code: CodeType) -> str:
+    return f"{code.co_name} ({_short_path(code.co_filename)}:{code.co_firstlineno})"
+
+
+def _size(value: float) -> str:
+    for unit in ("B", "KiB", "MiB"):
+        if abs(value) < 1024:
+            return f"{value:.0f} {unit}" if unit == "B" else f"{value:.1f} {unit}"
+        value /= 1024
+    return f"{value:.1f} GiB"
+
+
+class CpuProfilingHooks(RunHooksBase[Any, Agent[Any]]):
+    """Sample all threads and attribute loop samples to the labelled task."""
+
+    def __init__(self, interval: float = SAMPLE_INTERVAL) -> None:
+        self.interval = interval
+        self.samples: Counter[tuple[str, tuple[CodeType, ...]]] = Counter()
+        self.sample_count = 0
+        self._labels: weakref.WeakKeyDictionary[asyncio.Task[Any], str] = weakref.WeakKeyDictionary()
+        self._parents: weakref.WeakKeyDictionary[asyncio.Task[Any], asyncio.Task[Any]] = (
+            weakref.WeakKeyDictionary()
+        )
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._loop_thread: int | None = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample_forever, name="cpu-profiler", daemon=True)
+        self._started = 0.0
+        self._elapsed = 0.0
+
+    def start(self) -> None:
+        self._started = time.perf_counter()
+        self._thread.start()
+
+    def stop(self) -> None:
+        if self._stop.is_set():
+            return
+        self._stop.set()
+        self._thread.join()
+        self._elapsed = time.perf_counter() - self._started
+
+    def _task_factory(self, previous: Any) -> Any:
+        def factory(loop: asyncio.AbstractEventLoop, coro: Any, **kwargs: Any) -> asyncio.Future[Any]:
+            parent = asyncio.current_task(loop)
+            if previous is not None:
+                task = previous(loop, coro, **kwargs)
+            else:
+                task = asyncio.Task(coro, loop=loop, **kwargs)
+            if parent is not None:
+                self._parents[task] = parent
+            return task
+
+        return factory
+
+    def _owner(self) -> asyncio.Task[Any] | None:
+        """The task a hook call belongs to (hooks run in ``gather`` children)."""
+
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self._loop = loop
+            self._loop_thread = threading.get_ident()
+            loop.set_task_factory(self._task_factory(loop.get_task_factory()))
+        task = asyncio.current_task()
+        if task is None:
+            return None
+        return self._parents.get(task, task)
+
+    def _label_owner(self, label: str | None) -> None:
+        owner = self._owner()
+        if owner is None:
+            return
+        if label is None:
+            self._labels.pop(owner, None)
+        else:
+            self._labels[owner] = label
+
+    def _task_label(self, task: asyncio.Task[Any] | None) -> str:
+        if task is None:
+            return "(event loop)"
+        for _ in range(32):
+            label = self._labels.get(task)
+            if label is not None:
+                return label
+            task = self._parents.get(task)
+            if task is None:
+                break
+        return "(unattributed task)"
+
+    def _sample_forever(self) -> None:
+        own = threading.get_ident()
+        cpu_seen: dict[int, float] = {}
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own or not self._on_cpu(ident, cpu_seen):
+                    continue
+                if ident == self._loop_thread and self._loop is not None:
+                    try:
+                        label = self._task_label(asyncio.current_task(self._loop))
+                    except RuntimeError:
+                        label = "(event loop)"
+                else:
+                    label = f"(thread {names.get(ident, ident)})"
+                self.samples[(label, self._stack(frame))] += 1
+                self.sample_count += 1
+
+    @staticmethod
+    def _on_cpu(ident: int, cpu_seen: dict[int, float]) -> bool:
+        """Whether the thread used CPU since the last sample (always True off Unix)."""
+
+        try:
+            used = time.clock_gettime(time.pthread_getcpuclockid(ident))
+        except (AttributeError, OSError):
+            return True
+        previous = cpu_seen.get(ident)
+        cpu_seen[ident] = used
+        return previous is not None and used > previous
+
+    @staticmethod
+    def _stack(frame: FrameType | None) -> tuple[CodeType, ...]:
+        codes = []
+        while frame is not None and len(codes) < MAX_STACK_DEPTH:
+            codes.append(frame.f_code)
+            frame = frame.f_back
+        codes.reverse()
+        return tuple(codes)
+
+    async def on_agent_start(self, context: RunContextWrapper[Any], agent: Agent[Any]) -> None:
+        self._label_owner(_agent_name(agent))
+
+    async def on_agent_end(
+        self, context: RunContextWrapper[Any], agent: Agent[Any], output: Any
+    ) -> None:
+        self._label_owner(None)
+
+    async def on_llm_start(
+        self,
+        context: RunContextWrapper[Any],
+        agent: Agent[Any],
+        system_prompt: str | None,
+        input_items: list[Any],
+    ) -> None:
+        self._label_owner(f"{_agent_name(agent)}{_SEPARATOR}llm")
+
+    async def on_llm_end(
+        self, context: RunContextWrapper[Any], agent: Agent[Any], response: ModelResponse
+    ) -> None:
+        self._label_owner(_agent_name(agent))
+
+    async def on_tool_start(
+        self, context: RunContextWrapper[Any], agent: Agent[Any], tool: Tool
+    ) -> None:
+        self._label_owner(f"{_agent_name(agent)}{_SEPARATOR}{_tool_name(tool)}")
+
+    async def on_tool_end(
+        self, context: RunContextWrapper[Any], agent: Agent[Any], tool: Tool, result: Any
+    ) -> None:
+        self._label_owner(None)
+
+    def folded_lines(self) -> list[str]:
+        lines = []
+        for (label, stack), count in sorted(self.samples.items(), key=lambda item: -item[1]):
+            frames = ";".join(_function(code).replace(";", ",") for code in stack)
+            lines.append(f"{label.replace(';', ',')};{frames} {count}")
+        return lines
+
+    def report(self) -> str:
+        total = self.sample_count or 1
+        by_label: Counter[str] = Counter()
+        for (label, _), count in self.samples.items():
+            by_label[label] += count
+        lines = [
+            f"CPU profile: {self.sample_count} on-CPU samples, every {self.interval * 1000:.1f} ms "
+            f"over {self._elapsed:.1f} s (all threads)",
+            "",
+            "Samples by agent / tool:",
+            "   share  samples  label",
+        ]
+        for label, count in by_label.most_common():
+            lines.append(f"  {count / total:6.1%}  {count:7d}  {label}")
+        for label, _ in by_label.most_common(TOP_LABELS):
+            lines.extend(["", f"Top functions in {label} (self / inclusive samples):"])
+            lines.extend(self._top_functions(label))
+        return "\n".join(lines) + "\n"
+
+    def _top_functions(self, label: str) -> list[str]:
+        own: Counter[CodeType] = Counter()
+        inclusive: Counter[CodeType] = Counter()
+        for (sample_label, stack), count in self.samples.items():
+            if sample_label != label or not stack:
+                continue
+            own[stack[-1]] += count
+            for code in set(stack):
+                inclusive[code] += count
+        hottest = sorted(inclusive, key=lambda code: (-own[code], -inclusive[code]))
+        return [
+            f"  {own[code]:6d} {inclusive[code]:6d}  {_function(code)}"
+            for code in hottest[:TOP_FUNCTIONS]
+        ]
+
+    def write(self, path: str | Path) -> Path:
+        """Write collapsed stacks (``.folded``) or the text report to ``path``."""
+
+        self.stop()
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        if path.suffix == ".folded":
+            text = "".join(line + "\n" for line in self.folded_lines())
+        else:
+            text = self.report()
+        path.write_text(text, encoding="utf-8")
+        return path
+
+
+class MemoryProfilingHooks(RunHooksBase[Any, Agent[Any]]):
+    """
+    Diff ``tracemalloc`` snapshots taken at every hook boundary.
+
+    The loop only takes the raw snapshot; a worker thread groups it by source
+    line, drops the profiler's own frames and diffs each finished span.
+    """
+
+    def __init__(self) -> None:
+        self.boundaries = 0
+        self.spans: Counter[str] = Counter()
+        self.net: Counter[str] = Counter()
+        self.sites: dict[str, Counter[str]] = {}
+        # Open span key -> (label, number of the snapshot that opened it).
+        self._open: dict[Any, tuple[str, int]] = {}
+        self._pending: queue.Queue[tuple[int, tracemalloc.Snapshot, list[tuple[str, int]], bool]] = (
+            queue.Queue(MAX_PENDING_SNAPSHOTS)
+        )
+        # Worker state: per-line sizes of snapshots that still open a span.
+        self._sizes: dict[int, dict[tuple[str, int], int]] = {}
+        self._excluded = {
+            tracemalloc.__file__,
+            __file__,
+            "<frozen importlib._bootstrap>",
+            "<frozen importlib._bootstrap_external>",
+            "<unknown>",
+        }
+        self._thread = threading.Thread(target=self._diff_forever, name="memory-profiler", daemon=True)
+
+    def start(self) -> None:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        self._thread.start()
+
+    def _boundary(
+        self, close: Iterable[Any] = (), open_as: tuple[Any, str] | None = None
+    ) -> None:
+        ending = [key for key in close if key in self._open]
+        if not ending and open_as is None:
+            return
+        self.boundaries += 1
+        number = self.boundaries
+        closing = [self._open.pop(key) for key in ending]
+        if open_as is not None:
+            key, label = open_as
+            self._open[key] = (label, number)
+        # Blocks only when the worker is MAX_PENDING_SNAPSHOTS behind.
+        self._pending.put((number, tracemalloc.take_snapshot(), closing, open_as is not None))
+
+    def _diff_forever(self) -> None:
+        while True:
+            number, snapshot, closing, opens = self._pending.get()
+            try:
+                sizes = self._line_sizes(snapshot)
+                del snapshot
+                for label, started in closing:
+                    self._record(label, self._sizes.pop(started, {}), sizes)
+                if opens:
+                    self._sizes[number] = sizes
+            except Exception as exc:  # Keep draining, or report() would wait forever.
+                print(f"Memory profiler dropped snapshot {number}: {exc!r}", file=sys.stderr)
+            finally:
+                self._pending.task_done()
+
+    def _line_sizes(self, snapshot: tracemalloc.Snapshot) -> dict[tuple[str, int], int]:
+        sizes = {}
+        for stat in snapshot.statistics("lineno"):
+            frame = stat.traceback[0]
+            if frame.filename not in self._excluded:
+                sizes[(frame.filename, frame.lineno)] = stat.size
+        return sizes
+
+    def _record(
+        self, label: str, before: dict[tuple[str, int], int], after: dict[tuple[str, int], int]
+    ) -> None:
+        diffs = [(line, after.get(line, 0) - before.get(line, 0)) for line in before.keys() | after.keys()]
+        self.spans[label] += 1
+        self.net[label] += sum(diff for _, diff in diffs)
+        sites = self.sites.setdefault(label, Counter())
+        for (filename, lineno), diff in sorted(diffs, key=lambda item: -abs(item[1]))[:SITES_PER_SPAN]:
+            if diff:
+                sites[f"{_short_path(filename)}:{lineno}"] += diff
+
+    async def on_agent_start(self, context: RunContextWrapper[Any], agent: Agent[Any]) -> None:
+        run = id(context.usage)
+        self._boundary(close=[("agent", run)], open_as=(("agent", run), _agent_name(agent)))
+
+    async def on_agent_end(
+        self, context: RunContextWrapper[Any], agent: Agent[Any], output: Any
+    ) -> None:
+        self._boundary(close=[("agent", id(context.usage))])
+
+    async def on_handoff(
+        self, context: RunContextWrapper[Any], from_agent: Agent[Any], to_agent: Agent[Any]
+    ) -> None:
+        self._boundary(close=[("agent", id(context.usage))])
+
+    async def on_llm_start(
+        self,
+        context: RunContextWrapper[Any],
+        agent: Agent[Any],
+        system_prompt: str | None,
+        input_items: list[Any],
+    ) -> None:
+        key = ("llm", id(context.usage))
+        self._boundary(open_as=(key, f"{_agent_name(agent)}{_SEPARATOR}llm"))
+
+    async def on_llm_end(
+        self, context: RunContextWrapper[Any], agent: Agent[Any], response: ModelResponse
+    ) -> None:
+        self._boundary(close=[("llm", id(context.usage))])
+
+    async def on_tool_start(
+        self, context: RunContextWrapper[Any], agent: Agent[Any], tool: Tool
+    ) -> None:
+        key = ("tool", getattr(context, "tool_call_id", None) or id(context))
+        self._boundary(open_as=(key, f"{_agent_name(agent)}{_SEPARATOR}{_tool_name(tool)}"))
+
+    async def on_tool_end(
+        self, context: RunContextWrapper[Any], agent: Agent[Any], tool: Tool, result: Any
+    ) -> None:
+        self._boundary(close=[("tool", getattr(context, "tool_call_id", None) or id(context))])
+
+    def report(self) -> str:
+        if self._thread.is_alive():
+            self._pending.join()
+        current, peak = tracemalloc.get_traced_memory()
+        lines = [
+            f"Memory profile: {self.boundaries} snapshot(s); traced memory {_size(current)} "
+            f"now, {_size(peak)} peak",
+            "",
+            "Memory left allocated by each span, per agent / tool:",
+            "   spans          net  label",
+        ]
+        for label, net in sorted(self.net.items(), key=lambda item: -item[1]):
+            lines.append(f"  {self.spans[label]:6d} {_size(net):>12}  {label}")
+        for label, net in sorted(self.net.items(), key=lambda item: -item[1])[:TOP_LABELS]:
+            sites = self.sites.get(label)
+            if not sites:
+                continue
+            lines.extend(["", f"Top allocation sites in {label}:"])
+            for site, size in sorted(sites.items(), key=lambda item: -item[1])[:TOP_SITES]:
+                lines.append(f"  {_size(size):>12}  {site}")
+        if tracemalloc.is_tracing():
+            lines.extend(["", "Largest live allocation sites at exit:"])
+            stats = tracemalloc.take_snapshot().statistics("lineno")
+            live = [stat for stat in stats if stat.traceback[0].filename not in self._excluded]
+            for stat in live[:TOP_SITES]:
+                frame = stat.traceback[0]
+                lines.append(
+                    f"  {_size(stat.size):>12}  {stat.count:7d} blocks  "
+                    f"{_short_path(frame.filename)}:{frame.lineno}"
+                )
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: str | Path) -> Path:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(self.report(), encoding="utf-8")
+        return path
+
+
+def enable_cpu_profiling(path: str | Path, interval: float = SAMPLE_INTERVAL) -> CpuProfilingHooks:
+    """Sample the process until exit and write the profile to ``path``."""
+
+    hooks = CpuProfilingHooks(interval)
+    install_run_hooks(hooks)
+    hooks.start()
+
+    def write() -> None:
+        written = hooks.write(path)
+        print(f"CPU profile with {hooks.sample_count} sample(s) written to {written}")
+
+    atexit.register(write)
+    return hooks
+
+
+def enable_memory_profiling(path: str | Path) -> MemoryProfilingHooks:
+    """Trace allocations until exit and write the memory report to ``path``."""
+
+    hooks = MemoryProfilingHooks()
+    install_run_hooks(hooks)
+    hooks.start()
+
+    def write() -> None:
+        written = hooks.write(path)
+        print(f"Memory profile over {hooks.boundaries} snapshot(s) written to {written}")
+
+    atexit.register(write)
+    return hooks
+
+
+__all__ = [
+    "CpuProfilingHooks",
+    "MemoryProfilingHooks",
+    "enable_cpu_profiling",
+    "enable_memory_profiling",
+]
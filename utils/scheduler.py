@@ -0,0 +1,196 @@
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import heapq
+import itertools
+import statistics
+import time
+from collections import deque
+from collections.abc import AsyncIterator
+from dataclasses import dataclass, field
+from enum import IntEnum
+from typing import Any, Callable, Generic, TypeVar
+
+from agents import Model
+
+T = TypeVar("T")
+
+
+class Priority(IntEnum):
+    """Lower values are served first."""
+
+    INTERACTIVE = 0
+    NORMAL = 5
+    BULK = 10
+
+
+_current_priority: contextvars.ContextVar[int] = contextvars.ContextVar(
+    "llm_priority", default=Priority.NORMAL
+)
+
+
+def current_priority() -> int:
+    return _current_priority.get()
+
+
+@dataclass
+class SchedulerStats:
+    """Queue depth and wait-time counters for sizing the backend fleet."""
+
+    granted: int = 0
+    queued: int = 0
+    max_queued: int = 0
+    total_wait: float = 0.0
+    max_wait: float = 0.0
+    recent_waits: deque[float] = field(default_factory=lambda: deque(maxlen=1024))
+
+    def record_wait(self, waited: float) -> None:
+        self.granted += 1
+        self.total_wait += waited
+        self.max_wait = max(self.max_wait, waited)
+        self.recent_waits.append(waited)
+
+    def snapshot(self) -> dict[str, float]:
+        waits = sorted(self.recent_waits)
+        if len(waits) >= 2:
+            cuts = statistics.quantiles(waits, n=20, method="inclusive")
+            p50, p95 = cuts[9], cuts[18]
+        else:
+            p50 = p95 = waits[0] if waits else 0.0
+        return {
+            "granted": self.granted,
+            "queued": self.queued,
+            "max_queued": self.max_queued,
+            "mean_wait": self.total_wait / self.granted if self.granted else 0.0,
+            "p50_wait": p50,
+            "p95_wait": p95,
+            "max_wait": self.max_wait,
+        }
+
+
+class RequestScheduler(Generic[T]):
+    """
+    Priority queue in front of a pool of limited slots.
+
+    ``grant(exclude)`` reserves and returns a slot (e.g. a backend with spare
+    in-flight capacity) or ``None`` when everything is busy. Callers that
+    cannot be served immediately wait in priority order, which is the
+    backpressure: a flood of bulk requests queues up instead of reaching
+    Ollama, and interactive requests skip ahead of it. Call ``release()``
+    after freeing a slot so the next waiter is dispatched.
+    """
+
+    def __init__(
+        self,
+        grant: Callable[[frozenset[str]], T | None],
+        abandon: Callable[[T], None],
+    ) -> None:
+        self._grant = grant
+        self._abandon = abandon
+        self._waiters: list[tuple[int, int, frozenset[str], asyncio.Future[T]]] = []
+        self._sequence = itertools.count()
+        self.stats = SchedulerStats()
+
+    @property
+    def queue_depth(self) -> int:
+        return self.stats.queued
+
+    async def acquire(
+        self,
+        priority: int | None = None,
+        exclude: frozenset[str] = frozenset(),
+    ) -> T:
+        priority = current_priority() if priority is None else priority
+        if not self._waiters:
+            slot = self._grant(exclude)
+            if slot is not None:
+                self.stats.record_wait(0.0)
+                return slot
+
+        started = time.monotonic()
+        future: asyncio.Future[T] = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._sequence), exclude, future))
+        self.stats.queued += 1
+        self.stats.max_queued = max(self.stats.max_queued, self.stats.queued)
+        self._dispatch()
+        try:
+            slot = await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Granted in the same tick we were cancelled; hand the slot back.
+                self._abandon(future.result())
+                self._dispatch()
+            else:
+                self.stats.queued -= 1
+                future.cancel()
+            raise
+        self.stats.record_wait(time.monotonic() - started)
+        return slot
+
+    def release(self) -> None:
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        while self._waiters:
+            _, _, exclude, future = self._waiters[0]
+            if future.done():
+                heapq.heappop(self._waiters)
+                continue
+            slot = self._grant(exclude)
+            if slot is None:
+                return
+            heapq.heappop(self._waiters)
+            self.stats.queued -= 1
+            future.set_result(slot)
+
+
+class PrioritizedModel(Model):
+    """
+    View of a model whose calls are queued at ``priority``.
+
+    Use it for agents whose turns are latency-sensitive (coordinators) or
+    that should yield to everything else (bulk workers).
+    """
+
+    def __init__(self, inner: Model, priority: int) -> None:
+        self.inner = inner
+        self.priority = priority
+
+    def __getattr__(self, name: str) -> Any:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return getattr(self.inner, name)
+
+    async def get_response(self, *args: Any, **kwargs: Any):
+        token = _current_priority.set(self.priority)
+        try:
+            return await self.inner.get_response(*args, **kwargs)
+        finally:
+            _current_priority.reset(token)
+
+    async def stream_response(self, *args: Any, **kwargs: Any) -> AsyncIterator[Any]:
+        token = _current_priority.set(self.priority)
+        try:
+            async for event in self.inner.stream_response(*args, **kwargs):
+                yield event
+        finally:
+            try:
+                _current_priority.reset(token)
+            except ValueError:
+                # The generator was closed from another context (e.g. GC).
+                pass
+
+
+def prioritized(model: Model, priority: int) -> PrioritizedModel:
+    return PrioritizedModel(model, priority)
+
+
+__all__ = [
+    "Priority",
+    "PrioritizedModel",
+    "RequestScheduler",
+    "SchedulerStats",
+    "current_priority",
+    "prioritized",
+]
@@ -0,0 +1,205 @@
+from __future__ import annotations
+
+import statistics
+import sys
+import time
+from dataclasses import dataclass, field
+from textwrap import shorten
+from typing import Any, Callable
+
+from agents import Agent, Runner
+from agents.result import RunResult, RunResultStreaming
+from agents.stream_events import (
+    AgentUpdatedStreamEvent,
+    RawResponsesStreamEvent,
+    RunItemStreamEvent,
+)
+from openai.types.responses import (
+    ResponseCompletedEvent,
+    ResponseFunctionCallArgumentsDeltaEvent,
+    ResponseReasoningSummaryTextDeltaEvent,
+    ResponseReasoningTextDeltaEvent,
+    ResponseRefusalDeltaEvent,
+    ResponseTextDeltaEvent,
+)
+
+from utils.hooks import run_scope
+
+# Raw events that carry freshly generated tokens.
+TOKEN_EVENTS = (
+    ResponseTextDeltaEvent,
+    ResponseFunctionCallArgumentsDeltaEvent,
+    ResponseRefusalDeltaEvent,
+    ResponseReasoningTextDeltaEvent,
+    ResponseReasoningSummaryTextDeltaEvent,
+)
+
+
+def _compact(text: str, width: int = 96) -> str:
+    return shorten(text, width=width, placeholder="…")
+
+
+@dataclass
+class LLMCallMetrics:
+    """Latency profile of a single streamed model call."""
+
+    agent: str
+    started_at: float
+    first_token_at: float | None = None
+    finished_at: float | None = None
+    token_times: list[float] = field(default_factory=list)
+
+    @property
+    def time_to_first_token(self) -> float | None:
+        if self.first_token_at is None:
+            return None
+        return self.first_token_at - self.started_at
+
+    @property
+    def inter_token_latencies(self) -> list[float]:
+        return [b - a for a, b in zip(self.token_times, self.token_times[1:])]
+
+    @property
+    def mean_inter_token_latency(self) -> float | None:
+        gaps = self.inter_token_latencies
+        return statistics.fmean(gaps) if gaps else None
+
+    @property
+    def total_latency(self) -> float | None:
+        if self.finished_at is None:
+            return None
+        return self.finished_at - self.started_at
+
+    def summary(self) -> str:
+        def ms(value: float | None) -> str:
+            return f"{value * 1000:.0f}ms" if value is not None else "n/a"
+
+        return (
+            f"{self.agent}: ttft={ms(self.time_to_first_token)} "
+            f"itl={ms(self.mean_inter_token_latency)} "
+            f"total={ms(self.total_latency)} deltas={len(self.token_times)}"
+        )
+
+
+class StreamRenderer:
+    """
+    Render a streamed run incrementally and time every LLM call in it.
+
+    A call is considered started at the last run event before its first raw
+    model event (run start, previous response, tool output or handoff), which
+    is when the runner hands control back to the model.
+    """
+
+    def __init__(self, write: Callable[[str], None] | None = None) -> None:
+        self._write = write or self._write_stdout
+        self.calls: list[LLMCallMetrics] = []
+        self._current: LLMCallMetrics | None = None
+        self._agent_name = "agent"
+        self._mark = time.perf_counter()
+        self._mid_line = False
+
+    @staticmethod
+    def _write_stdout(text: str) -> None:
+        sys.stdout.write(text)
+        sys.stdout.flush()
+
+    def _line(self, text: str) -> None:
+        if self._mid_line:
+            self._write("\n")
+            self._mid_line = False
+        self._write(f"{text}\n")
+
+    def handle(self, event: Any) -> None:
+        now = time.perf_counter()
+        if isinstance(event, RawResponsesStreamEvent):
+            self._handle_raw(event.data, now)
+            return
+
+        self._mark = now
+        if isinstance(event, AgentUpdatedStreamEvent):
+            self._agent_name = getattr(event.new_agent, "name", "agent")
+            self._line(f"[stream][agent] {self._agent_name}")
+        elif isinstance(event, RunItemStreamEvent):
+            self._handle_item(event)
+
+    def _handle_raw(self, data: Any, now: float) -> None:
+        if self._current is None:
+            self._current = LLMCallMetrics(agent=self._agent_name, started_at=self._mark)
+            self.calls.append(self._current)
+        if isinstance(data, TOKEN_EVENTS):
+            if self._current.first_token_at is None:
+                self._current.first_token_at = now
+            self._current.token_times.append(now)
+            if isinstance(data, ResponseTextDeltaEvent):
+                self._write(data.delta)
+                self._mid_line = True
+        elif isinstance(data, ResponseCompletedEvent):
+            self._current.finished_at = now
+            self._current = None
+            self._mark = now
+
+    def _handle_item(self, event: RunItemStreamEvent) -> None:
+        item = event.item
+        if event.name == "tool_called":
+            raw = item.raw_item
+            name = getattr(raw, "name", None) or getattr(raw, "type", "tool")
+            arguments = getattr(raw, "arguments", "") or ""
+            self._line(f"[stream][tool] {name} args={_compact(arguments)}")
+        elif event.name == "tool_output":
+            self._line(f"[stream][tool] → {_compact(str(item.output))}")
+        elif event.name == "handoff_occured":
+            source = getattr(item.source_agent, "name", "?")
+            target = getattr(item.target_agent, "name", "?")
+            self._line(f"[stream][handoff] {source} → {target}")
+
+    def finish(self) -> None:
+        if self._mid_line:
+            self._write("\n")
+            self._mid_line = False
+
+    def report(self) -> str:
+        lines = ["=== LLM Call Latency ==="]
+        lines.extend(f"{idx}. {call.summary()}" for idx, call in enumerate(self.calls, 1))
+        return "\n".join(lines)
+
+
+async def stream_run(
+    starting_agent: Agent[Any],
+    input: Any,
+    renderer: StreamRenderer | None = None,
+    **run_kwargs: Any,
+) -> tuple[RunResultStreaming, StreamRenderer]:
+    """Run ``starting_agent`` with ``Runner.run_streamed``, rendering as events arrive."""
+
+    renderer = renderer or StreamRenderer()
+    result = Runner.run_streamed(starting_agent, input, **run_kwargs)
+    async for event in result.stream_events():
+        renderer.handle(event)
+    renderer.finish()
+    return result, renderer
+
+
+async def run_agent(
+    starting_agent: Agent[Any],
+    input: Any,
+    *,
+    stream: bool = False,
+    **run_kwargs: Any,
+) -> RunResult | RunResultStreaming:
+    """
+    Drop-in for ``Runner.run`` used by the demos: with ``stream=True`` the run
+    renders tokens, tool calls and handoffs live, then prints per-call latency.
+
+    The run executes in its own ``run_scope``, so hooks release their per-run
+    state even when it raises or is cancelled.
+    """
+
+    with run_scope(run_kwargs.get("hooks")):
+        if not stream:
+            return await Runner.run(starting_agent, input, **run_kwargs)
+        result, renderer = await stream_run(starting_agent, input, **run_kwargs)
+        print(renderer.report())
+        return result
+
+
+__all__ = ["LLMCallMetrics", "StreamRenderer", "run_agent", "stream_run"]
@@ -0,0 +1,442 @@
+"""
+Dependency-free OpenAI-compatible stub of ``/v1/chat/completions`` for load
+and scaling tests of the agent plumbing, independent of model speed.
+
+Run with: python -m utils.stub_server --port 18080 --token-latency 0.02
+Then point the stages at it: OPENAI_BASE_URL=http://127.0.0.1:18080/v1
+
+Replies come from an optional JSON script::
+
+    {
+      "agents": {
+        "Bash Repo Explorer": [
+          {"tool_calls": [{"name": "bash.run", "arguments": {"command": "ls"}}]},
+          {"content": "The repo has stages/ and utils/."}
+        ]
+      },
+      "default": [{"content": "Done."}]
+    }
+
+Keys under ``agents`` are matched as substrings of the system prompt. The
+step used for a request is the number of earlier assistant turns whose tool
+calls all name tools offered in that request, so each agent walks its own script
+regardless of concurrency or handoffs. Once a script runs out the last step is
+repeated if it is plain content, otherwise the ``--reply`` text is returned.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import itertools
+import json
+import random
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+_TOKEN_PATTERN = re.compile(r"\S+\s*|\s+")
+_ARGUMENT_CHUNK = 8
+
+
+@dataclass
+class StubConfig:
+    ttft: float = 0.05
+    token_latency: float = 0.01
+    reply: str = "This is a stub response from the local load-test server."
+    error_rate: float = 0.0
+    error_status: int = 500
+    timeout_rate: float = 0.0
+    hang_seconds: float = 30.0
+    script: dict[str, Any] = field(default_factory=dict)
+    seed: int | None = None
+
+
+@dataclass
+class StubStats:
+    requests: int = 0
+    streamed: int = 0
+    in_flight: int = 0
+    max_in_flight: int = 0
+    errors_injected: int = 0
+    timeouts_injected: int = 0
+
+    def as_dict(self) -> dict[str, int]:
+        return dict(self.__dict__)
+
+
+def load_script(path: Path) -> dict[str, Any]:
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def _tokenize(text: str) -> list[str]:
+    return _TOKEN_PATTERN.findall(text) or [""]
+
+
+def _estimate_tokens(payload: Any) -> int:
+    return max(1, len(json.dumps(payload, ensure_ascii=False)) // 4)
+
+
+class StubServer:
+    """Minimal HTTP/1.1 server speaking just enough of the chat-completions API."""
+
+    def __init__(self, config: StubConfig | None = None) -> None:
+        self.config = config or StubConfig()
+        self.stats = StubStats()
+        self._random = random.Random(self.config.seed)
+        self._ids = itertools.count(1)
+
+    # --- scripting -----------------------------------------------------
+
+    def _plan(self, body: dict[str, Any]) -> dict[str, Any]:
+        messages = body.get("messages", [])
+        system = next(
+            (str(m.get("content") or "") for m in messages if m.get("role") == "system"),
+            "",
+        )
+        steps = self.config.script.get("default", [])
+        for marker, agent_steps in self.config.script.get("agents", {}).items():
+            if marker in system:
+                steps = agent_steps
+                break
+
+        tool_names = {
+            tool.get("function", {}).get("name") for tool in body.get("tools") or []
+        }
+        index = sum(
+            1
+            for m in messages
+            if m.get("role") == "assistant"
+            and m.get("tool_calls")
+            and all(call["function"]["name"] in tool_names for call in m["tool_calls"])
+        )
+        if index < len(steps):
+            return steps[index]
+        if steps and "content" in steps[-1]:
+            return steps[-1]
+        return {"content": self.config.reply}
+
+    def _completion_parts(self, step: dict[str, Any]) -> tuple[str | None, list[dict[str, Any]]]:
+        tool_calls = [
+            {
+                "id": f"call_stub_{next(self._ids)}",
+                "type": "function",
+                "function": {
+                    "name": call["name"],
+                    "arguments": (
+                        call["arguments"]
+                        if isinstance(call.get("arguments"), str)
+                        else json.dumps(call.get("arguments", {}))
+                    ),
+                },
+            }
+            for call in step.get("tool_calls", [])
+        ]
+        return step.get("content"), tool_calls
+
+    # --- HTTP plumbing -------------------------------------------------
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> asyncio.base_events.Server:
+        return await asyncio.start_server(self._handle_connection, host, port)
+
+    async def _handle_connection(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, path, _ = request_line.decode("latin-1").split(" ", 2)
+                headers: dict[str, str] = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                length = int(headers.get("content-length", "0"))
+                body = await reader.readexactly(length) if length else b""
+                keep_alive = await self._route(method, path, body, writer)
+                if not keep_alive or headers.get("connection", "").lower() == "close":
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def _send_json(
+        self, writer: asyncio.StreamWriter, status: int, payload: Any
+    ) -> None:
+        data = json.dumps(payload).encode("utf-8")
+        head = (
+            f"HTTP/1.1 {status} {'OK' if status < 400 else 'Error'}\r\n"
+            "Content-Type: application/json\r\n"
+            f"Content-Length: {len(data)}\r\n"
+            "Connection: keep-alive\r\n\r\n"
+        )
+        writer.write(head.encode("latin-1") + data)
+        await writer.drain()
+
+    async def _route(
+        self, method: str, path: str, body: bytes, writer: asyncio.StreamWriter
+    ) -> bool:
+        path = path.split("?", 1)[0].rstrip("/")
+        if method == "GET" and path.endswith("/models"):
+            await self._send_json(writer, 200, {"object": "list", "data": [{"id": "stub", "object": "model"}]})
+            return True
+        if method == "GET" and path.endswith("/stats"):
+            await self._send_json(writer, 200, self.stats.as_dict())
+            return True
+        if method != "POST" or not path.endswith("/chat/completions"):
+            await self._send_json(writer, 404, {"error": {"message": f"Unknown route {path}"}})
+            return True
+
+        request = json.loads(body or b"{}")
+        self.stats.requests += 1
+        self.stats.in_flight += 1
+        self.stats.max_in_flight = max(self.stats.max_in_flight, self.stats.in_flight)
+        try:
+            roll = self._random.random()
+            if roll < self.config.timeout_rate:
+                self.stats.timeouts_injected += 1
+                await asyncio.sleep(self.config.hang_seconds)
+                return False
+            if roll < self.config.timeout_rate + self.config.error_rate:
+                self.stats.errors_injected += 1
+                await self._send_json(
+                    writer,
+                    self.config.error_status,
+                    {"error": {"message": "Injected stub failure", "type": "server_error"}},
+                )
+                return True
+            if request.get("stream"):
+                self.stats.streamed += 1
+                await self._stream_completion(request, writer)
+            else:
+                await self._complete(request, writer)
+            return True
+        finally:
+            self.stats.in_flight -= 1
+
+    # --- completions ---------------------------------------------------
+
+    def _usage(self, request: dict[str, Any], completion_tokens: int) -> dict[str, int]:
+        prompt_tokens = _estimate_tokens(request.get("messages", []))
+        return {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        }
+
+    async def _complete(self, request: dict[str, Any], writer: asyncio.StreamWriter) -> None:
+        content, tool_calls = self._completion_parts(self._plan(request))
+        tokens = len(_tokenize(content)) if content else 0
+        tokens += sum(
+            -(-len(call["function"]["arguments"]) // _ARGUMENT_CHUNK) for call in tool_calls
+        )
+        await asyncio.sleep(self.config.ttft + self.config.token_latency * max(tokens - 1, 0))
+        message: dict[str, Any] = {"role": "assistant", "content": content}
+        if tool_calls:
+            message["tool_calls"] = tool_calls
+        await self._send_json(
+            writer,
+            200,
+            {
+                "id": f"chatcmpl-stub-{next(self._ids)}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": request.get("model", "stub"),
+                "choices": [
+                    {
+                        "index": 0,
+                        "message": message,
+                        "finish_reason": "tool_calls" if tool_calls else "stop",
+                    }
+                ],
+                "usage": self._usage(request, tokens),
+            },
+        )
+
+    async def _stream_completion(
+        self, request: dict[str, Any], writer: asyncio.StreamWriter
+    ) -> None:
+        content, tool_calls = self._completion_parts(self._plan(request))
+        completion_id = f"chatcmpl-stub-{next(self._ids)}"
+        model_name = request.get("model", "stub")
+        created = int(time.time())
+
+        writer.write(
+            b"HTTP/1.1 200 OK\r\n"
+            b"Content-Type: text/event-stream\r\n"
+            b"Transfer-Encoding: chunked\r\n"
+            b"Connection: keep-alive\r\n\r\n"
+        )
+
+        async def send(payload: Any) -> None:
+            data = f"data: {payload if isinstance(payload, str) else json.dumps(payload)}\n\n"
+            encoded = data.encode("utf-8")
+            writer.write(f"{len(encoded):x}\r\n".encode("latin-1") + encoded + b"\r\n")
+            await writer.drain()
+
+        def chunk(delta: dict[str, Any], finish_reason: str | None = None) -> dict[str, Any]:
+            return {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model_name,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+            }
+
+        tokens = 0
+        await asyncio.sleep(self.config.ttft)
+        await send(chunk({"role": "assistant", "content": ""}))
+        if content:
+            for piece in _tokenize(content):
+                if tokens:
+                    await asyncio.sleep(self.config.token_latency)
+                await send(chunk({"content": piece}))
+                tokens += 1
+        for index, call in enumerate(tool_calls):
+            await send(
+                chunk(
+                    {
+                        "tool_calls": [
+                            {
+                                "index": index,
+                                "id": call["id"],
+                                "type": "function",
+                                "function": {"name": call["function"]["name"], "arguments": ""},
+                            }
+                        ]
+                    }
+                )
+            )
+            arguments = call["function"]["arguments"]
+            for offset in range(0, len(arguments), _ARGUMENT_CHUNK):
+                if tokens:
+                    await asyncio.sleep(self.config.token_latency)
+                fragment = arguments[offset : offset + _ARGUMENT_CHUNK]
+                await send(
+                    chunk({"tool_calls": [{"index": index, "function": {"arguments": fragment}}]})
+                )
+                tokens += 1
+        await send(chunk({}, "tool_calls" if tool_calls else "stop"))
+        await send(
+            {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model_name,
+                "choices": [],
+                "usage": self._usage(request, tokens),
+            }
+        )
+        await send("[DONE]")
+        writer.write(b"0\r\n\r\n")
+        await writer.drain()
+
+
+class StubHandle:
+    """A stub server running on its own event loop in a daemon thread."""
+
+    def __init__(self, server: StubServer, host: str, port: int) -> None:
+        self.server = server
+        self.host = host
+        self.port = port
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._ready = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}/v1"
+
+    def _run(self) -> None:
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        listener = self._loop.run_until_complete(self.server.start(self.host, self.port))
+        self.port = listener.sockets[0].getsockname()[1]
+        self._ready.set()
+        try:
+            self._loop.run_forever()
+        finally:
+            listener.close()
+            pending = asyncio.all_tasks(self._loop)
+            for task in pending:
+                task.cancel()
+            self._loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+            self._loop.close()
+
+    def start(self) -> StubHandle:
+        self._thread.start()
+        self._ready.wait()
+        return self
+
+    def stop(self) -> None:
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=5)
+
+
+def run_in_thread(
+    config: StubConfig | None = None, host: str = "127.0.0.1", port: int = 0
+) -> StubHandle:
+    """Start a stub in the background; ``port=0`` picks a free port."""
+
+    return StubHandle(StubServer(config), host, port).start()
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=18080)
+    parser.add_argument("--script", type=Path, help="JSON script of scripted replies per agent.")
+    parser.add_argument("--ttft", type=float, default=0.05, help="Seconds before the first token.")
+    parser.add_argument(
+        "--token-latency", type=float, default=0.01, help="Seconds between generated tokens."
+    )
+    parser.add_argument(
+        "--tokens-per-second",
+        type=float,
+        help="Alternative to --token-latency; sets it to 1/value.",
+    )
+    parser.add_argument("--reply", default=StubConfig.reply, help="Fallback assistant reply.")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests that fail.")
+    parser.add_argument("--error-status", type=int, default=500)
+    parser.add_argument(
+        "--timeout-rate", type=float, default=0.0, help="Fraction of requests that never answer."
+    )
+    parser.add_argument("--hang-seconds", type=float, default=30.0)
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args(argv)
+
+    config = StubConfig(
+        ttft=args.ttft,
+        token_latency=1 / args.tokens_per_second if args.tokens_per_second else args.token_latency,
+        reply=args.reply,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        timeout_rate=args.timeout_rate,
+        hang_seconds=args.hang_seconds,
+        script=load_script(args.script) if args.script else {},
+        seed=args.seed,
+    )
+
+    async def serve() -> None:
+        server = await StubServer(config).start(args.host, args.port)
+        print(f"Stub model server listening on http://{args.host}:{args.port}/v1")
+        async with server:
+            await server.serve_forever()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
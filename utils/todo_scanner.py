@@ -0,0 +1,228 @@
+"""
+Repository-wide TODO/FIXME scanner shared by the Stage 2 and Stage 3 tools.
+
+Files are matched as bytes (no decoding, and no per-line loop: the scan
+jumps between marker occurrences) in a process pool, a batch of files per
+task. Results are cached per file keyed on a BLAKE2 digest of its content.
+A file whose mtime/size/inode did not change is not read again, and a file
+that was rewritten with identical content reuses its cached matches.
+``iter_chunks`` yields results as batches finish; ``scan`` collects them
+in path/line order.
+
+``TODO_SCAN_WORKERS`` sets the pool size (default: CPU count). Scans of
+fewer than ``INLINE_SCAN_FILES`` changed files run in-process, since
+starting workers would cost more than the scan itself.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import multiprocessing
+import os
+import threading
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterator
+
+from utils.line_index import FileVersion, file_version
+from utils.workspace import IGNORED_DIRS
+from utils.workspace_path import WORKSPACE_ROOT
+
+MARKERS = (b"TODO", b"FIXME")
+WORKERS = int(os.getenv("TODO_SCAN_WORKERS", "0")) or os.cpu_count() or 1
+INLINE_SCAN_FILES = 64
+BATCH_FILES = 128
+# Long lines (minified files, JSON) are cut so one hit cannot flood a tool reply.
+MAX_LINE_CHARS = 200
+_SNIFF_BYTES = 8192
+
+Hit = tuple[int, str]
+
+
+@dataclass(frozen=True)
+class TodoMatch:
+    path: str
+    line: int
+    text: str
+
+
+def describe(match: TodoMatch, with_path: bool = False) -> str:
+    location = f"{match.path} L{match.line}" if with_path else f"L{match.line}"
+    return f"{location}: {match.text}"
+
+
+def scan_bytes(data: bytes, markers: tuple[bytes, ...] = MARKERS) -> tuple[Hit, ...]:
+    """Return ``(line_number, stripped_line)`` for every line containing a marker."""
+
+    starts: set[int] = set()
+    for marker in markers:
+        position = data.find(marker)
+        while position != -1:
+            start = data.rfind(b"\n", 0, position) + 1
+            starts.add(start)
+            end = data.find(b"\n", position)
+            if end == -1:
+                break
+            position = data.find(marker, end)
+    hits: list[Hit] = []
+    number, counted_to = 1, 0
+    for start in sorted(starts):
+        number += data.count(b"\n", counted_to, start)
+        counted_to = start
+        end = data.find(b"\n", start)
+        line = data[start : len(data) if end == -1 else end]
+        text = line.decode("utf-8", errors="replace").strip()
+        if len(text) > MAX_LINE_CHARS:
+            text = text[:MAX_LINE_CHARS] + "..."
+        hits.append((number, text))
+    return tuple(hits)
+
+
+def _scan_batch(paths: list[str]) -> list[tuple[str, FileVersion, str, tuple[Hit, ...]]]:
+    """Worker entry point: read, hash and scan each file of a batch."""
+
+    results = []
+    for path in paths:
+        try:
+            with open(path, "rb") as handle:
+                data = handle.read()
+                version = file_version(os.fstat(handle.fileno()))
+        except OSError:
+            continue
+        digest = hashlib.blake2b(data, digest_size=16).hexdigest()
+        hits = () if b"\0" in data[:_SNIFF_BYTES] else scan_bytes(data)
+        results.append((path, version, digest, hits))
+    return results
+
+
+class TodoScanner:
+    """
+    Incremental marker scanner for files under ``root``.
+
+    Thread-safe; the process pool is started on the first scan that needs it
+    and reused afterwards.
+    """
+
+    def __init__(self, root: Path = WORKSPACE_ROOT, workers: int = WORKERS) -> None:
+        self.root = root.resolve()
+        self.workers = workers
+        self._versions: dict[str, tuple[FileVersion, str]] = {}
+        self._hits: dict[str, tuple[Hit, ...]] = {}
+        self._lock = threading.Lock()
+        self._pool: ProcessPoolExecutor | None = None
+
+    def _executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                # spawn: forking a process that runs watcher/tool threads is unsafe.
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._pool
+
+    def close(self) -> None:
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+
+    def _files(self, target: Path) -> Iterator[tuple[str, os.stat_result]]:
+        if target.is_file():
+            yield str(target), target.stat()
+            return
+        stack = [str(target)]
+        while stack:
+            directory = stack.pop()
+            try:
+                with os.scandir(directory) as entries:
+                    for entry in entries:
+                        if entry.is_dir(follow_symlinks=False):
+                            if entry.name not in IGNORED_DIRS:
+                                stack.append(entry.path)
+                        elif entry.is_file(follow_symlinks=False):
+                            yield entry.path, entry.stat(follow_symlinks=False)
+            except OSError:
+                continue
+
+    def _matches(self, path: str, hits: tuple[Hit, ...]) -> list[TodoMatch]:
+        relative = os.path.relpath(path, self.root)
+        return [TodoMatch(relative, number, text) for number, text in hits]
+
+    def _record(self, results: list[tuple[str, FileVersion, str, tuple[Hit, ...]]]) -> list[TodoMatch]:
+        matches: list[TodoMatch] = []
+        with self._lock:
+            for path, version, digest, hits in results:
+                self._versions[path] = (version, digest)
+                self._hits[digest] = hits
+                matches.extend(self._matches(path, hits))
+        return matches
+
+    def iter_chunks(self, target: Path) -> Iterator[list[TodoMatch]]:
+        """
+        Yield matches under ``target`` (a file or directory) in chunks.
+
+        Unchanged files come first in one chunk, then one chunk per scanned batch
+        as it completes; chunks without matches are skipped.
+        """
+
+        cached: list[TodoMatch] = []
+        stale: list[str] = []
+        seen: set[str] = set()
+        with self._lock:
+            for path, info in self._files(target):
+                seen.add(path)
+                known = self._versions.get(path)
+                if known is not None and known[0] == file_version(info):
+                    cached.extend(self._matches(path, self._hits[known[1]]))
+                else:
+                    stale.append(path)
+        if cached:
+            yield cached
+
+        batches = [stale[i : i + BATCH_FILES] for i in range(0, len(stale), BATCH_FILES)]
+        if len(stale) < INLINE_SCAN_FILES or self.workers <= 1:
+            for batch in batches:
+                if matches := self._record(_scan_batch(batch)):
+                    yield matches
+        else:
+            pool = self._executor()
+            pending: set[Future] = {pool.submit(_scan_batch, batch) for batch in batches}
+            try:
+                while pending:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        if matches := self._record(future.result()):
+                            yield matches
+            finally:
+                for future in pending:
+                    future.cancel()
+        self._prune(target, seen)
+
+    def _prune(self, target: Path, seen: set[str]) -> None:
+        """Forget files under ``target`` that the last walk no longer found."""
+
+        prefix = os.path.join(str(target), "")
+        with self._lock:
+            gone = [
+                path
+                for path in self._versions
+                if path not in seen and (path == str(target) or path.startswith(prefix))
+            ]
+            for path in gone:
+                del self._versions[path]
+            if len(self._hits) > 2 * len(self._versions):
+                live = {digest for _, digest in self._versions.values()}
+                self._hits = {digest: hits for digest, hits in self._hits.items() if digest in live}
+
+    def scan(self, target: Path) -> list[TodoMatch]:
+        """All matches under ``target``, ordered by path and line."""
+
+        matches = [match for chunk in self.iter_chunks(target) for match in chunk]
+        return sorted(matches, key=lambda match: (match.path, match.line))
+
+
+todo_scanner = TodoScanner()
+
+
+__all__ = ["MARKERS", "TodoMatch", "TodoScanner", "describe", "scan_bytes", "todo_scanner"]
@@ -1,11 +1,43 @@
-"""Functional tools"""
+"""Functional tools, imported on first attribute access to keep startup cheap."""
 
-from .read_file import read_text_file
-from .write_file import write_text_file
-from .bash import run_bash_command
+from __future__ import annotations
+
+from importlib import import_module
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from .bash import run_bash_command, run_many_bash_commands
+    from .read_file import read_text_file
+    from .repo_grep import grep_repository
+    from .write_file import write_text_edits, write_text_file
+
+_TOOL_MODULES = {
+    "read_text_file": ".read_file",
+    "write_text_file": ".write_file",
+    "write_text_edits": ".write_file",
+    "run_bash_command": ".bash",
+    "run_many_bash_commands": ".bash",
+    "grep_repository": ".repo_grep",
+}
 
 __all__ = [
     "read_text_file",
     "write_text_file",
+    "write_text_edits",
     "run_bash_command",
-]
\ No newline at end of file
+    "run_many_bash_commands",
+    "grep_repository",
+]
+
+
+def __getattr__(name: str) -> Any:
+    module_name = _TOOL_MODULES.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | set(__all__))
@@ -1,13 +1,90 @@
 from __future__ import annotations
 
+import asyncio
+import codecs
+import logging
+import os
+import re
 import shlex
-import subprocess
-from pathlib import Path
+import signal
+import time
+import weakref
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable
 
 from agents import ToolOutputText, function_tool
+from agents.tool_context import ToolContext
+
+from utils.tools.fast_commands import run_in_process
+from utils.workspace_path import (
+    WORKSPACE_ROOT,
+    bump_workspace_generation,
+    get_workspace,
+    workspace_generation,
+)
 
-WORKSPACE_ROOT = Path("/workspace").resolve()
 ALLOWED_COMMANDS = {"ls", "pwd", "cat", "head", "tail", "stat", "wc", "find", "grep", "sed"}
+# Upper bound on concurrently running bash.run subprocesses across all agents.
+MAX_CONCURRENT_COMMANDS = int(os.getenv("BASH_MAX_CONCURRENT", "8"))
+# Serve common read-only commands in-process instead of fork/exec; set to 0 to disable.
+FAST_PATHS_ENABLED = os.getenv("BASH_FAST_PATHS", "1") != "0"
+# Reuse results of repeated read-only commands; set to 0 to disable.
+RESULT_CACHE_ENABLED = os.getenv("BASH_RESULT_CACHE", "1") != "0"
+RESULT_CACHE_MAX_ENTRIES = 256
+MAX_BATCH_COMMANDS = 8
+# stderr is kept on top of max_output_chars so errors survive a long stdout.
+STDERR_MARGIN_CHARS = 1000
+_READ_CHUNK = 64 * 1024
+
+logger = logging.getLogger(__name__)
+
+# One semaphore per event loop so repeated asyncio.run() calls each get their own.
+_limits: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore] = (
+    weakref.WeakKeyDictionary()
+)
+
+
+@dataclass
+class CommandReport:
+    """Cost of one ``bash.run`` call; shown by the verbose hooks, not the model."""
+
+    command: str
+    source: str
+    elapsed: float
+    returncode: int | None
+    kept_chars: int
+    discarded_bytes: int = 0
+    stopped_early: bool = False
+    cache_hit_rate: float | None = None
+
+    def summary(self) -> str:
+        parts = [f"{self.source} {self.elapsed * 1000:.1f}ms", f"{self.kept_chars} chars kept"]
+        if self.discarded_bytes:
+            parts.append(f"{self.discarded_bytes} bytes discarded")
+        if self.stopped_early:
+            parts.append("stopped early")
+        if self.cache_hit_rate is not None:
+            parts.append(f"cache hit rate {self.cache_hit_rate:.0%}")
+        return ", ".join(parts)
+
+
+# Reports keyed by tool_call_id until a hook collects them; oldest dropped first.
+_reports: OrderedDict[str, CommandReport] = OrderedDict()
+_MAX_PENDING_REPORTS = 256
+
+
+def _store_report(call_id: str | None, report: CommandReport) -> None:
+    logger.debug("bash.run %r: %s", report.command, report.summary())
+    if not call_id:
+        return
+    _reports[call_id] = report
+    while len(_reports) > _MAX_PENDING_REPORTS:
+        _reports.popitem(last=False)
+
+
+def pop_command_report(call_id: str | None) -> CommandReport | None:
+    return _reports.pop(call_id, None) if call_id else None
 
 
 def _build_command_args(command: str) -> list[str]:
@@ -34,38 +111,357 @@ def _build_command_args(command: str) -> list[str]:
     return parts
 
 
-@function_tool(name_override="bash.run")
-def run_bash_command(
-    command: str,
-    timeout_seconds: int = 5,
-    max_output_chars: int = 4000,
-) -> ToolOutputText:
+def _command_limit() -> asyncio.Semaphore:
+    loop = asyncio.get_running_loop()
+    limit = _limits.get(loop)
+    if limit is None:
+        limit = _limits[loop] = asyncio.Semaphore(MAX_CONCURRENT_COMMANDS)
+    return limit
+
+
+@dataclass
+class ResultCacheStats:
+    hits: int = 0
+    misses: int = 0
+    invalidations: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+Fingerprint = tuple[int, int, int] | None
+
+
+def _fingerprint(token: str) -> Fingerprint:
+    try:
+        info = os.stat(WORKSPACE_ROOT / token)
+    except (OSError, ValueError):
+        return None
+    return (info.st_mtime_ns, info.st_size, info.st_ino)
+
+
+# Commands whose results may be cached. Anything not on this list, or using
+# one of the writing forms below, is treated as a workspace write.
+_READ_ONLY_COMMANDS = frozenset({"ls", "pwd", "cat", "head", "tail", "stat", "wc", "grep", "find", "sed"})
+_FIND_WRITE_ACTIONS = frozenset(
+    {"-delete", "-exec", "-execdir", "-ok", "-okdir", "-fprint", "-fprint0", "-fprintf", "-fls"}
+)
+# Shell redirections and pipes; bash.run has no shell, but an argv carrying
+# them was meant to write somewhere.
+_REDIRECT = re.compile(r"\d*>>?.*|&>.*|\||\|&|;|&&")
+# sed commands and s/// flags that write files (w, W) or run commands (e).
+_SED_WRITE = re.compile(r"[wWe]")
+
+
+def _sed_scripts(args: list[str]) -> list[str]:
+    scripts: list[str] = []
+    operands: list[str] = []
+    tokens = iter(args[1:])
+    for token in tokens:
+        if token in ("-e", "--expression"):
+            scripts.append(next(tokens, ""))
+        elif token.startswith("--expression="):
+            scripts.append(token.partition("=")[2])
+        elif token in ("-f", "--file") or token.startswith("--file="):
+            return ["w"]  # Script from a file: cannot vet it.
+        elif not token.startswith("-"):
+            operands.append(token)
+    if not scripts and operands:
+        scripts.append(operands[0])
+    return scripts
+
+
+def _is_read_only(args: list[str]) -> bool:
+    """True only for commands known not to change the workspace."""
+
+    if args[0] not in _READ_ONLY_COMMANDS:
+        return False
+    if any(_REDIRECT.fullmatch(token) for token in args[1:]):
+        return False
+    if args[0] == "find":
+        return not any(token in _FIND_WRITE_ACTIONS for token in args[1:])
+    if args[0] == "sed":
+        in_place = any(
+            token == "--in-place"
+            or token.startswith("--in-place=")
+            or (token.startswith("-") and not token.startswith("--") and "i" in token[1:])
+            for token in args[1:]
+        )
+        return not in_place and not any(_SED_WRITE.search(script) for script in _sed_scripts(args))
+    return True
+
+
+def _walks_tree(args: list[str]) -> bool:
+    """True for commands whose output depends on a whole directory tree."""
+
+    if args[0] == "find":
+        return True
+    if args[0] not in ("grep", "ls"):
+        return False
+    recursive_flag = "r" if args[0] == "grep" else ""
+    for token in args[1:]:
+        if token in ("--recursive", "--dereference-recursive", "--directories=recurse"):
+            return True
+        if token.startswith("-") and not token.startswith("--"):
+            if "R" in token[1:] or (recursive_flag and recursive_flag in token[1:]):
+                return True
+    return args[0] == "grep" and any(
+        token == "-d" and following == "recurse" for token, following in zip(args, args[1:])
+    )
+
+
+def _cacheable(args: list[str]) -> bool:
+    """
+    Whether the result of read-only ``args`` may be reused. Tree-walking
+    commands are fingerprinted only by their operands, so edits deep inside
+    the tree show up only through the workspace generation; they are cached
+    only while an inotify watcher keeps it current (polling lags, ``off``
+    never moves on external edits).
     """
-    Execute a limited bash command (ls, pwd, cat, head, tail, stat, wc, find, grep, sed) inside the workspace.
 
-    Args:
-        command: Full command line, e.g. "ls stages".
-        timeout_seconds: Upper bound before the subprocess is terminated.
-        max_output_chars: Long outputs are truncated to this many characters.
+    if not RESULT_CACHE_ENABLED:
+        return False
+    return not _walks_tree(args) or get_workspace().mode == "inotify"
+
+
+class _ResultCache:
+    """
+    LRU of command results keyed on argv and the output limit.
+
+    An entry is reused only while the workspace generation (bumped by
+    ``write.file``) is unchanged and every operand, plus the working
+    directory, still has the same mtime/size/inode. Tokens that are not paths
+    fingerprint as missing, so creating such a file also invalidates.
+    Recursive commands are only stored under inotify (see ``_cacheable``).
+    """
+
+    def __init__(self, max_entries: int = RESULT_CACHE_MAX_ENTRIES) -> None:
+        self.max_entries = max_entries
+        self.stats = ResultCacheStats()
+        self._entries: OrderedDict[
+            tuple[tuple[str, ...], int], tuple[int, tuple[Fingerprint, ...], _Completed]
+        ] = OrderedDict()
+
+    @staticmethod
+    def fingerprints(args: list[str]) -> tuple[Fingerprint, ...]:
+        operands = [token for token in args[1:] if not token.startswith("-")]
+        return tuple(_fingerprint(token) for token in [".", *operands])
+
+    def get(
+        self,
+        args: list[str],
+        max_output_chars: int,
+        generation: int,
+        fingerprints: tuple[Fingerprint, ...],
+    ) -> _Completed | None:
+        key = (tuple(args), max_output_chars)
+        entry = self._entries.get(key)
+        if entry is not None:
+            cached_generation, cached_fingerprints, completed = entry
+            if cached_generation == generation and cached_fingerprints == fingerprints:
+                self._entries.move_to_end(key)
+                self.stats.hits += 1
+                return completed
+            del self._entries[key]
+            self.stats.invalidations += 1
+        self.stats.misses += 1
+        return None
+
+    def put(
+        self,
+        args: list[str],
+        max_output_chars: int,
+        generation: int,
+        fingerprints: tuple[Fingerprint, ...],
+        completed: _Completed,
+    ) -> None:
+        key = (tuple(args), max_output_chars)
+        self._entries[key] = (generation, fingerprints, completed)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+result_cache = _ResultCache()
+
+
+def _kill_process_group(process: asyncio.subprocess.Process) -> None:
+    try:
+        os.killpg(process.pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+
+
+class _BoundedCapture:
+    """Incrementally decoded output that keeps at most ``limit`` characters."""
+
+    def __init__(self, limit: int) -> None:
+        self.limit = limit
+        self.kept = 0
+        self.discarded_bytes = 0
+        self.overflowed = False
+        self._parts: list[str] = []
+        self._decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+
+    def feed(self, chunk: bytes) -> bool:
+        """Store ``chunk``; returns True once the limit has been exceeded."""
+
+        if self.overflowed:
+            self.discarded_bytes += len(chunk)
+            return True
+        text = self._decoder.decode(chunk)
+        room = self.limit - self.kept
+        if len(text) <= room:
+            self._parts.append(text)
+            self.kept += len(text)
+            return False
+        self._parts.append(text[:room])
+        self.kept = self.limit
+        self.discarded_bytes += len(text[room:].encode("utf-8"))
+        self.overflowed = True
+        return True
+
+    @property
+    def text(self) -> str:
+        return "".join(self._parts)
+
+
+async def _pump(
+    stream: asyncio.StreamReader,
+    capture: _BoundedCapture,
+    on_overflow: Callable[[], None] | None = None,
+) -> None:
+    while chunk := await stream.read(_READ_CHUNK):
+        if capture.feed(chunk) and on_overflow is not None:
+            on_overflow()
+
+
+@dataclass
+class _Completed:
+    returncode: int | None
+    stdout: str
+    stderr: str
+    discarded_bytes: int = 0
+    stopped_early: bool = False
+
+
+async def _run_subprocess(
+    args: list[str], timeout_seconds: float, max_output_chars: int
+) -> _Completed:
     """
+    Run ``args`` in its own process group without blocking the event loop.
+
+    Output is read incrementally into bounded buffers. Once stdout exceeds
+    ``max_output_chars`` the process group is killed instead of letting it
+    produce (and us buffer) the rest. On timeout or cancellation the group is
+    killed and reaped too, so children spawned by the command do not linger.
+    """
+    async with _command_limit():
+        process = await asyncio.create_subprocess_exec(
+            *args,
+            cwd=str(WORKSPACE_ROOT),
+            stdin=asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            start_new_session=True,
+        )
+        stdout = _BoundedCapture(max_output_chars)
+        stderr = _BoundedCapture(STDERR_MARGIN_CHARS)
+        stopped_early = False
+
+        def stop() -> None:
+            nonlocal stopped_early
+            if not stopped_early:
+                stopped_early = True
+                _kill_process_group(process)
+
+        async def capture() -> None:
+            assert process.stdout is not None and process.stderr is not None
+            await asyncio.gather(_pump(process.stdout, stdout, stop), _pump(process.stderr, stderr))
+            await process.wait()
+
+        try:
+            await asyncio.wait_for(capture(), timeout_seconds)
+        except BaseException:
+            # TimeoutError or CancelledError: never leave the group running.
+            _kill_process_group(process)
+            await asyncio.shield(process.wait())
+            raise
+    return _Completed(
+        returncode=process.returncode,
+        stdout=stdout.text,
+        stderr=stderr.text,
+        discarded_bytes=stdout.discarded_bytes + stderr.discarded_bytes,
+        stopped_early=stopped_early,
+    )
+
+
+async def _run_fast_path(
+    args: list[str], timeout_seconds: float, max_output_chars: int
+) -> _Completed | None:
+    """
+    Serve ``args`` in-process on a worker thread so large listings or reads
+    never stall the event loop. The thread cannot be interrupted, but the
+    fast paths stop on their own entry/byte budget.
+    """
+    if not FAST_PATHS_ENABLED:
+        return None
+    result = await asyncio.wait_for(
+        asyncio.to_thread(run_in_process, args, WORKSPACE_ROOT), timeout_seconds
+    )
+    if result is None:
+        return None
+    returncode, stdout, stderr = result
+    return _Completed(
+        returncode=returncode,
+        stdout=stdout[:max_output_chars],
+        stderr=stderr[:STDERR_MARGIN_CHARS],
+        discarded_bytes=len(stdout[max_output_chars:].encode("utf-8"))
+        + len(stderr[STDERR_MARGIN_CHARS:].encode("utf-8")),
+    )
+
+
+async def _execute(
+    command: str, timeout_seconds: float, max_output_chars: int
+) -> tuple[str, CommandReport | None]:
+    """Run one command line and format it the way ``bash.run`` returns it."""
+
     try:
         args = _build_command_args(command)
     except ValueError as exc:
-        return ToolOutputText(text=str(exc))
+        return str(exc), None
 
+    started = time.perf_counter()
+    writes = not _is_read_only(args)
+    cacheable = not writes and _cacheable(args)
+    # Captured before running so concurrent changes invalidate this result.
+    generation = workspace_generation()
+    fingerprints = result_cache.fingerprints(args) if cacheable else ()
+    completed = (
+        result_cache.get(args, max_output_chars, generation, fingerprints) if cacheable else None
+    )
+    source = "cache"
     try:
-        completed = subprocess.run(
-            args,
-            cwd=str(WORKSPACE_ROOT),
-            check=False,
-            capture_output=True,
-            text=True,
-            timeout=timeout_seconds,
-        )
-    except subprocess.TimeoutExpired:
-        return ToolOutputText(text=f"Command timed out after {timeout_seconds}s.")
+        if completed is None:
+            source = "in-process"
+            completed = await _run_fast_path(args, timeout_seconds, max_output_chars)
+        if completed is None:
+            source = "subprocess"
+            completed = await _run_subprocess(args, timeout_seconds, max_output_chars)
+    except asyncio.TimeoutError:
+        return f"Command timed out after {timeout_seconds}s.", None
     except OSError as exc:
-        return ToolOutputText(text=f"Failed to launch command: {exc}")
+        return f"Failed to launch command: {exc}", None
+    finally:
+        if writes:
+            bump_workspace_generation()
+    if cacheable and source != "cache":
+        result_cache.put(args, max_output_chars, generation, fingerprints, completed)
 
     stdout = completed.stdout.strip()
     stderr = completed.stderr.strip()
@@ -73,11 +469,124 @@ def run_bash_command(
     if stderr:
         output = f"{output}\n[stderr]\n{stderr}"
 
+    truncated = completed.discarded_bytes > 0 or completed.stopped_early
     if len(output) > max_output_chars:
         output = output[: max_output_chars - 3] + "..."
+    elif truncated:
+        output = f"{output}..."
+
+    report = CommandReport(
+        command=command,
+        source=source,
+        elapsed=time.perf_counter() - started,
+        returncode=completed.returncode,
+        kept_chars=len(output),
+        discarded_bytes=completed.discarded_bytes,
+        stopped_early=completed.stopped_early,
+        cache_hit_rate=result_cache.stats.hit_rate if cacheable else None,
+    )
+    # Keep the model-visible text deterministic (no timings) so it stays cacheable.
+    if completed.stopped_early:
+        exit_note = f"(output exceeded {max_output_chars} chars; command stopped and the rest discarded)"
+    elif truncated:
+        exit_note = f"(exit code {completed.returncode}; output truncated to {max_output_chars} chars)"
+    else:
+        exit_note = f"(exit code {completed.returncode})"
+    return f"{output}\n{exit_note}", report
 
-    exit_note = f"(exit code {completed.returncode})"
-    return ToolOutputText(text=f"{output}\n{exit_note}")
+
+@function_tool(name_override="bash.run")
+async def run_bash_command(
+    ctx: ToolContext[Any],
+    command: str,
+    timeout_seconds: int = 5,
+    max_output_chars: int = 4000,
+) -> ToolOutputText:
+    """
+    Execute a limited bash command (ls, pwd, cat, head, tail, stat, wc, find, grep, sed) inside the workspace.
+
+    Args:
+        command: Full command line, e.g. "ls stages".
+        timeout_seconds: Upper bound before the subprocess is terminated.
+        max_output_chars: Long outputs are truncated to this many characters.
+    """
+    text, report = await _execute(command, timeout_seconds, max_output_chars)
+    if report is not None:
+        _store_report(ctx.tool_call_id, report)
+    return ToolOutputText(text=text)
+
+
+@function_tool(name_override="bash.run_many")
+async def run_many_bash_commands(
+    ctx: ToolContext[Any],
+    commands: list[str],
+    timeout_seconds: int = 10,
+    max_output_chars: int = 8000,
+) -> ToolOutputText:
+    """
+    Run several independent bash.run commands concurrently and return all results at once.
+
+    Prefer this over repeated bash.run calls when exploring, e.g. listing a few
+    directories and reading a few files in one step.
+
+    Args:
+        commands: Up to 8 command lines, e.g. ["ls stages", "cat README.md"].
+        timeout_seconds: Deadline shared by the whole batch.
+        max_output_chars: Output budget shared equally between the commands.
+    """
+    if not commands:
+        return ToolOutputText(text="Provide at least one command (e.g. ['ls', 'ls stages']).")
+    if len(commands) > MAX_BATCH_COMMANDS:
+        return ToolOutputText(
+            text=f"At most {MAX_BATCH_COMMANDS} commands per batch; got {len(commands)}."
+        )
+
+    started = time.perf_counter()
+    share = max(max_output_chars // len(commands), 1)
+    tasks = [
+        asyncio.create_task(_execute(command, timeout_seconds, share)) for command in commands
+    ]
+    done, pending = await asyncio.wait(tasks, timeout=timeout_seconds)
+    for task in pending:
+        task.cancel()
+    await asyncio.gather(*pending, return_exceptions=True)
+
+    sections: list[str] = []
+    reports: list[CommandReport] = []
+    for index, (command, task) in enumerate(zip(commands, tasks), 1):
+        if task in done:
+            text, report = task.result()
+            if report is not None:
+                reports.append(report)
+        else:
+            text = f"Command timed out after the batch deadline of {timeout_seconds}s."
+        sections.append(f"### [{index}] $ {command}\n{text}")
+
+    if reports:
+        _store_report(
+            ctx.tool_call_id,
+            CommandReport(
+                command="; ".join(commands),
+                source=f"batch of {len(commands)}",
+                elapsed=time.perf_counter() - started,
+                returncode=max((report.returncode or 0) for report in reports),
+                kept_chars=sum(report.kept_chars for report in reports),
+                discarded_bytes=sum(report.discarded_bytes for report in reports),
+                stopped_early=any(report.stopped_early for report in reports),
+                cache_hit_rate=result_cache.stats.hit_rate,
+            ),
+        )
+    return ToolOutputText(text="\n\n".join(sections))
 
 
-__all__ = ["run_bash_command", "ALLOWED_COMMANDS"]
+__all__ = [
+    "ALLOWED_COMMANDS",
+    "CommandReport",
+    "MAX_BATCH_COMMANDS",
+    "MAX_CONCURRENT_COMMANDS",
+    "ResultCacheStats",
+    "pop_command_report",
+    "result_cache",
+    "run_bash_command",
+    "run_many_bash_commands",
+]
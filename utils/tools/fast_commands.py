@@ -0,0 +1,591 @@
+"""
+In-process implementations of the read-only ``bash.run`` commands.
+
+Agents mostly call ``ls``, ``cat``, ``head``, ``tail``, ``wc``, ``stat``,
+``find`` and ``grep`` on small repository files, and each of those used to pay
+a fork/exec. ``run_in_process`` handles the common flag subsets of these
+commands in Python, matching GNU coreutils/grep output byte for byte. It
+returns ``None`` for anything outside those subsets (unknown flags, regex
+patterns, binary files, unusual errors, large trees) so the caller falls
+back to the real binary.
+"""
+
+from __future__ import annotations
+
+import fnmatch
+import os
+import stat
+from pathlib import Path
+from typing import Callable
+
+# Work past these limits goes to a subprocess so the event loop never blocks
+# for long on a single command.
+MAX_ENTRIES = 5000
+MAX_BYTES = 4 * 1024 * 1024
+
+Result = tuple[int, str, str]
+
+
+class _Fallback(Exception):
+    """Raised anywhere inside a fast path to defer to the real binary."""
+
+
+def _collation_is_bytewise() -> bool:
+    locale = os.environ.get("LC_ALL") or os.environ.get("LC_COLLATE") or os.environ.get("LANG") or "C"
+    return locale in {"C", "POSIX"} or locale.startswith(("C.", "POSIX."))
+
+
+class _Budget:
+    def __init__(self) -> None:
+        self.entries = 0
+        self.bytes = 0
+
+    def visit(self, count: int = 1) -> None:
+        self.entries += count
+        if self.entries > MAX_ENTRIES:
+            raise _Fallback
+
+    def read(self, path: str) -> bytes:
+        try:
+            size = os.stat(path).st_size
+        except FileNotFoundError:
+            raise
+        except OSError as exc:
+            raise _Fallback from exc
+        self.bytes += size
+        if self.bytes > MAX_BYTES:
+            raise _Fallback
+        try:
+            with open(path, "rb") as handle:
+                return handle.read()
+        except (FileNotFoundError, IsADirectoryError):
+            raise
+        except OSError as exc:
+            raise _Fallback from exc
+
+
+def _split_lines(data: bytes) -> list[bytes]:
+    """Split on ``\\n`` only, keeping terminators; a trailing partial line counts."""
+
+    parts = data.split(b"\n")
+    lines = [part + b"\n" for part in parts[:-1]]
+    if parts[-1]:
+        lines.append(parts[-1])
+    return lines
+
+
+def _encode(name: str) -> bytes:
+    return os.fsencode(name)
+
+
+def _missing(tool: str, name: str) -> bytes:
+    return f"{tool}: {name}: No such file or directory\n".encode()
+
+
+def _simple_operand(name: str) -> bool:
+    # ls quotes unusual names in its error messages; leave those to ls.
+    return all(ch.isalnum() or ch in "._/-+@" for ch in name)
+
+
+def _ls(args: list[str], cwd: str, budget: _Budget) -> Result:
+    show_all = almost_all = False
+    operands: list[str] = []
+    for token in args:
+        if token.startswith("-") and len(token) > 1:
+            for flag in token[1:]:
+                if flag == "a":
+                    show_all = True
+                elif flag == "A":
+                    almost_all = True
+                elif flag != "1":
+                    raise _Fallback
+        else:
+            operands.append(token)
+    if not operands:
+        operands = ["."]
+    if not all(_simple_operand(name) for name in operands):
+        raise _Fallback
+
+    files: list[str] = []
+    directories: list[str] = []
+    err: list[bytes] = []
+    for name in operands:
+        full = os.path.join(cwd, name)
+        if os.path.isdir(full):
+            directories.append(name)
+        elif os.path.lexists(full):
+            files.append(name)
+        else:
+            err.append(f"ls: cannot access '{name}': No such file or directory\n".encode())
+
+    out: list[bytes] = [_encode(name) + b"\n" for name in sorted(files)]
+    with_headers = len(operands) > 1
+    for name in sorted(directories):
+        try:
+            entries = os.listdir(os.path.join(cwd, name))
+        except OSError as exc:
+            raise _Fallback from exc
+        budget.visit(len(entries))
+        if not (show_all or almost_all):
+            entries = [entry for entry in entries if not entry.startswith(".")]
+        if show_all:
+            entries += [".", ".."]
+        if out:
+            out.append(b"\n")
+        if with_headers:
+            out.append(_encode(name) + b":\n")
+        out.extend(_encode(entry) + b"\n" for entry in sorted(entries))
+    return (2 if err else 0), b"".join(out).decode("utf-8", "replace"), b"".join(err).decode()
+
+
+def _cat(args: list[str], cwd: str, budget: _Budget) -> Result:
+    if not args or any(token.startswith("-") for token in args):
+        raise _Fallback
+    out: list[bytes] = []
+    err: list[bytes] = []
+    for name in args:
+        try:
+            out.append(budget.read(os.path.join(cwd, name)))
+        except FileNotFoundError:
+            err.append(_missing("cat", name))
+        except IsADirectoryError:
+            err.append(f"cat: {name}: Is a directory\n".encode())
+    return (1 if err else 0), b"".join(out).decode("utf-8", "replace"), b"".join(err).decode()
+
+
+def _parse_line_count(args: list[str]) -> tuple[int, list[str]]:
+    count = 10
+    files: list[str] = []
+    index = 0
+    while index < len(args):
+        token = args[index]
+        if token == "-n":
+            index += 1
+            if index == len(args):
+                raise _Fallback
+            value = args[index]
+        elif token.startswith("-n"):
+            value = token[2:]
+        elif token.startswith("-") and len(token) > 1:
+            value = token[1:]
+        else:
+            files.append(token)
+            index += 1
+            continue
+        if not value.isdigit():
+            raise _Fallback
+        count = int(value)
+        index += 1
+    if not files:
+        raise _Fallback
+    return count, files
+
+
+def _head_tail(tool: str, pick: Callable[[list[bytes], int], list[bytes]]):
+    def run(args: list[str], cwd: str, budget: _Budget) -> Result:
+        count, files = _parse_line_count(args)
+        out: list[bytes] = []
+        err: list[bytes] = []
+        for name in files:
+            try:
+                data = budget.read(os.path.join(cwd, name))
+            except FileNotFoundError:
+                err.append(f"{tool}: cannot open '{name}' for reading: No such file or directory\n".encode())
+                continue
+            except IsADirectoryError as exc:
+                raise _Fallback from exc
+            if len(files) > 1:
+                if out:
+                    out.append(b"\n")
+                out.append(b"==> " + _encode(name) + b" <==\n")
+            out.extend(pick(_split_lines(data), count))
+        return (1 if err else 0), b"".join(out).decode("utf-8", "replace"), b"".join(err).decode()
+
+    return run
+
+
+_head = _head_tail("head", lambda lines, count: lines[:count])
+_tail = _head_tail("tail", lambda lines, count: lines[-count:] if count else [])
+
+
+def _wc(args: list[str], cwd: str, budget: _Budget) -> Result:
+    selected: set[str] = set()
+    files: list[str] = []
+    for token in args:
+        if token.startswith("-") and len(token) > 1:
+            for flag in token[1:]:
+                if flag not in "lwc":
+                    raise _Fallback
+                selected.add(flag)
+        else:
+            files.append(token)
+    if not files:
+        raise _Fallback
+    columns = [flag for flag in "lwc" if flag in (selected or {"l", "w", "c"})]
+
+    counted: list[tuple[str, dict[str, int] | None]] = []
+    for name in files:
+        try:
+            data = budget.read(os.path.join(cwd, name))
+        except FileNotFoundError:
+            counted.append((name, None))
+            continue
+        except IsADirectoryError as exc:
+            raise _Fallback from exc
+        if "w" in columns and not data.isascii():
+            # Multibyte whitespace depends on the locale's ctype tables.
+            raise _Fallback
+        counted.append(
+            (name, {"l": data.count(b"\n"), "w": len(data.split()), "c": len(data)})
+        )
+
+    # Mirrors coreutils' compute_number_width().
+    width = 1
+    if not (len(files) == 1 and len(columns) == 1) and counted[0][1] is not None:
+        total_bytes = sum(counts["c"] for _, counts in counted if counts is not None)
+        width = len(str(total_bytes))
+
+    def row(counts: dict[str, int], label: str) -> bytes:
+        cells = " ".join(str(counts[flag]).rjust(width) for flag in columns)
+        return f"{cells} ".encode() + _encode(label) + b"\n"
+
+    out: list[bytes] = []
+    err: list[bytes] = []
+    totals = {"l": 0, "w": 0, "c": 0}
+    for name, counts in counted:
+        if counts is None:
+            err.append(_missing("wc", name))
+            continue
+        out.append(row(counts, name))
+        for key in totals:
+            totals[key] += counts[key]
+    if len(files) > 1:
+        out.append(row(totals, "total"))
+    return (1 if err else 0), b"".join(out).decode("utf-8", "replace"), b"".join(err).decode()
+
+
+_FILE_TYPES = (
+    (stat.S_ISDIR, "directory"),
+    (stat.S_ISLNK, "symbolic link"),
+    (stat.S_ISFIFO, "fifo"),
+    (stat.S_ISSOCK, "socket"),
+    (stat.S_ISCHR, "character special file"),
+    (stat.S_ISBLK, "block special file"),
+)
+
+
+def _file_type(info: os.stat_result) -> str:
+    if stat.S_ISREG(info.st_mode):
+        return "regular empty file" if info.st_size == 0 else "regular file"
+    for check, label in _FILE_TYPES:
+        if check(info.st_mode):
+            return label
+    raise _Fallback
+
+
+def _stat(args: list[str], cwd: str, budget: _Budget) -> Result:
+    if len(args) < 3 or args[0] not in {"-c", "--format"}:
+        raise _Fallback
+    fmt, files = args[1], args[2:]
+    if any(name.startswith("-") for name in files):
+        raise _Fallback
+
+    specifiers: dict[str, Callable[[str, os.stat_result], str]] = {
+        "n": lambda name, info: name,
+        "s": lambda name, info: str(info.st_size),
+        "F": lambda name, info: _file_type(info),
+        "a": lambda name, info: format(stat.S_IMODE(info.st_mode), "o"),
+        "A": lambda name, info: stat.filemode(info.st_mode),
+        "Y": lambda name, info: str(int(info.st_mtime)),
+        "%": lambda name, info: "%",
+    }
+
+    def render(name: str, info: os.stat_result) -> str:
+        pieces: list[str] = []
+        index = 0
+        while index < len(fmt):
+            char = fmt[index]
+            if char != "%":
+                pieces.append(char)
+                index += 1
+                continue
+            spec = fmt[index + 1 : index + 2]
+            if spec not in specifiers:
+                raise _Fallback
+            pieces.append(specifiers[spec](name, info))
+            index += 2
+        return "".join(pieces)
+
+    out: list[str] = []
+    err: list[str] = []
+    for name in files:
+        budget.visit()
+        try:
+            info = os.lstat(os.path.join(cwd, name))
+        except FileNotFoundError:
+            err.append(f"stat: cannot statx '{name}': No such file or directory\n")
+            continue
+        except OSError as exc:
+            raise _Fallback from exc
+        out.append(render(name, info) + "\n")
+    return (1 if err else 0), "".join(out), "".join(err)
+
+
+def _find(args: list[str], cwd: str, budget: _Budget) -> Result:
+    index = 0
+    roots: list[str] = []
+    while index < len(args) and not args[index].startswith("-"):
+        roots.append(args[index])
+        index += 1
+    roots = roots or ["."]
+
+    min_depth, max_depth = 0, None
+    tests: list[Callable[[str, os.DirEntry | None, os.stat_result], bool]] = []
+    while index < len(args):
+        option = args[index]
+        if index + 1 == len(args):
+            raise _Fallback
+        value = args[index + 1]
+        index += 2
+        if option in {"-maxdepth", "-mindepth"}:
+            if tests or not value.isdigit():
+                # GNU find warns about global options placed after tests.
+                raise _Fallback
+            if option == "-maxdepth":
+                max_depth = int(value)
+            else:
+                min_depth = int(value)
+        elif option in {"-name", "-iname"}:
+            if "[" in value or "\\" in value:
+                raise _Fallback
+            if option == "-name":
+                tests.append(lambda name, info, pattern=value: fnmatch.fnmatchcase(name, pattern))
+            else:
+                tests.append(
+                    lambda name, info, pattern=value.lower(): fnmatch.fnmatchcase(name.lower(), pattern)
+                )
+        elif option == "-type":
+            checks = {"f": stat.S_ISREG, "d": stat.S_ISDIR, "l": stat.S_ISLNK}
+            if value not in checks:
+                raise _Fallback
+            tests.append(lambda name, info, check=checks[value]: check(info.st_mode))
+        else:
+            raise _Fallback
+
+    out: list[bytes] = []
+
+    def emit(display: str, name: str, info: os.stat_result, depth: int) -> None:
+        if depth >= min_depth and all(test(name, info) for test in tests):
+            out.append(_encode(display) + b"\n")
+
+    def walk(display: str, full: str, depth: int) -> None:
+        if max_depth is not None and depth >= max_depth:
+            return
+        try:
+            with os.scandir(full) as entries:
+                children = list(entries)
+        except OSError as exc:
+            raise _Fallback from exc
+        budget.visit(len(children))
+        prefix = display if display.endswith("/") else display + "/"
+        for entry in children:
+            info = entry.stat(follow_symlinks=False)
+            child = prefix + entry.name
+            emit(child, entry.name, info, depth + 1)
+            if stat.S_ISDIR(info.st_mode):
+                walk(child, entry.path, depth + 1)
+
+    for root in roots:
+        full = os.path.join(cwd, root)
+        try:
+            info = os.lstat(full)
+        except OSError as exc:
+            # find's error quoting depends on the locale; let find report it.
+            raise _Fallback from exc
+        emit(root, os.path.basename(root.rstrip("/")) or root, info, 0)
+        if stat.S_ISDIR(info.st_mode):
+            walk(root, full, 0)
+    return 0, b"".join(out).decode("utf-8", "replace"), ""
+
+
+_REGEX_CHARS = set(".[]*^$\\+?(){}|")
+
+
+def _selected_lines(data: bytes, needle: bytes, ignore_case: bool, invert: bool):
+    """Yield ``(line_number, line)`` for lines that contain ``needle`` (or not)."""
+
+    haystack = data.lower() if ignore_case else data
+    if invert or not needle:
+        offset = 0
+        for number, line in enumerate(_split_lines(data), 1):
+            folded = haystack[offset : offset + len(line)]
+            offset += len(line)
+            if (needle in folded) != invert:
+                yield number, line.rstrip(b"\n")
+        return
+
+    # Jump between occurrences instead of scanning every line.
+    number, counted_to = 1, 0
+    position = haystack.find(needle)
+    while position != -1:
+        start = data.rfind(b"\n", 0, position) + 1
+        end = data.find(b"\n", position)
+        end = len(data) if end == -1 else end
+        number += data.count(b"\n", counted_to, start)
+        counted_to = start
+        yield number, data[start:end]
+        position = haystack.find(needle, end + 1)
+
+
+def _grep(args: list[str], cwd: str, budget: _Budget) -> Result:
+    flags: set[str] = set()
+    operands: list[str] = []
+    options_done = False
+    for token in args:
+        if not options_done and token == "--":
+            options_done = True
+        elif not options_done and token.startswith("-") and len(token) > 1:
+            for flag in token[1:]:
+                if flag not in "nirlcvF":
+                    raise _Fallback
+                flags.add(flag)
+        else:
+            operands.append(token)
+    if not operands:
+        raise _Fallback
+    pattern, files = operands[0], operands[1:]
+    if "\n" in pattern or ("F" not in flags and _REGEX_CHARS & set(pattern)):
+        raise _Fallback
+    needle = pattern.encode()
+    ignore_case = "i" in flags
+    if ignore_case:
+        if not needle.isascii():
+            raise _Fallback
+        needle = needle.lower()
+    recursive = "r" in flags
+    if not files:
+        if not recursive:
+            raise _Fallback
+        files = ["."]
+        strip_dot = True
+    else:
+        strip_dot = False
+
+    targets: list[str] = []
+    err: list[bytes] = []
+    failed = False
+
+    def collect(display: str, full: str) -> None:
+        try:
+            with os.scandir(full) as entries:
+                children = list(entries)
+        except OSError as exc:
+            raise _Fallback from exc
+        budget.visit(len(children))
+        prefix = display if display.endswith("/") else display + "/"
+        for entry in children:
+            if entry.is_symlink():
+                continue
+            # ``grep -r PATTERN`` with no operand prints paths without "./".
+            child = entry.name if strip_dot and display == "." else prefix + entry.name
+            if entry.is_dir():
+                collect(child, entry.path)
+            elif entry.is_file():
+                targets.append(child)
+
+    for name in files:
+        full = os.path.join(cwd, name)
+        if os.path.isdir(full):
+            if not recursive:
+                raise _Fallback
+            collect(name, full)
+        else:
+            targets.append(name)
+
+    with_names = recursive or len(files) > 1
+    invert = "v" in flags
+    out: list[bytes] = []
+    matched_any = False
+    for name in targets:
+        try:
+            data = budget.read(os.path.join(cwd, name))
+        except FileNotFoundError:
+            err.append(_missing("grep", name))
+            failed = True
+            continue
+        except IsADirectoryError as exc:
+            raise _Fallback from exc
+        binary = b"\0" in data
+        if not binary:
+            try:
+                data.decode("utf-8")
+            except UnicodeDecodeError as exc:
+                # Whether this counts as binary depends on the locale's charset.
+                raise _Fallback from exc
+        if ignore_case and not data.isascii():
+            raise _Fallback
+
+        label = _encode(name)
+        hits = 0
+        for number, body in _selected_lines(data, needle, ignore_case, invert):
+            hits += 1
+            if "l" in flags:
+                break
+            if "c" in flags:
+                continue
+            if binary:
+                # Reported on stderr; does not change the exit status.
+                err.append(b"grep: " + label + b": binary file matches\n")
+                break
+            prefix = label + b":" if with_names else b""
+            if "n" in flags:
+                prefix += str(number).encode() + b":"
+            out.append(prefix + body + b"\n")
+        matched_any = matched_any or hits > 0
+        if "l" in flags:
+            if hits:
+                out.append(label + b"\n")
+        elif "c" in flags:
+            out.append((label + b":" if with_names else b"") + str(hits).encode() + b"\n")
+
+    returncode = 2 if failed else (0 if matched_any else 1)
+    return returncode, b"".join(out).decode("utf-8", "replace"), b"".join(err).decode()
+
+
+def _pwd(args: list[str], cwd: str, budget: _Budget) -> Result:
+    if args:
+        raise _Fallback
+    return 0, os.path.realpath(cwd) + "\n", ""
+
+
+_COMMANDS: dict[str, Callable[[list[str], str, _Budget], Result]] = {
+    "cat": _cat,
+    "find": _find,
+    "grep": _grep,
+    "head": _head,
+    "ls": _ls,
+    "pwd": _pwd,
+    "stat": _stat,
+    "tail": _tail,
+    "wc": _wc,
+}
+
+
+def run_in_process(args: list[str], cwd: Path) -> Result | None:
+    """
+    Run ``args`` without a subprocess when a fast path covers it.
+
+    Returns ``(returncode, stdout, stderr)`` like the subprocess path, or
+    ``None`` when the real binary must handle the command.
+    """
+
+    handler = _COMMANDS.get(args[0]) if args else None
+    if handler is None or not _collation_is_bytewise():
+        return None
+    try:
+        return handler(args[1:], str(cwd), _Budget())
+    except (_Fallback, RecursionError):
+        return None
+
+
+__all__ = ["MAX_BYTES", "MAX_ENTRIES", "run_in_process"]
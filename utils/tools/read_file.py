@@ -1,8 +1,28 @@
 from __future__ import annotations
 
 from agents import ToolOutputText, function_tool
+from utils.file_cache import file_cache
+from utils.line_index import LineIndex, get_line_index, split_lines
 from utils.workspace_path import resolve_workspace_path
 
+# Files up to this size come from the shared content cache; larger ones are
+# paged through the line-offset index instead of being held in memory.
+CACHED_READ_MAX_BYTES = 1024 * 1024
+
+
+class _CachedLines:
+    """``LineIndex``-compatible view over text from the content cache."""
+
+    def __init__(self, text: str) -> None:
+        self.lines = split_lines(text)
+
+    @property
+    def line_count(self) -> int:
+        return len(self.lines)
+
+    def read_lines(self, start: int, end: int, max_bytes: int | None = None) -> list[str]:
+        return self.lines[start - 1 : end]
+
 
 @function_tool(name_override="read.file")
 def read_text_file(
@@ -24,12 +44,15 @@ def read_text_file(
         return ToolOutputText(text=f"{path} does not exist.")
 
     try:
-        text = target.read_text(encoding="utf-8")
-    except OSError as exc:
+        index: LineIndex | _CachedLines
+        if target.stat().st_size <= CACHED_READ_MAX_BYTES:
+            index = _CachedLines(file_cache.read_text(target, newline=""))
+        else:
+            index = get_line_index(target)
+    except (OSError, UnicodeDecodeError) as exc:
         return ToolOutputText(text=f"Failed to read file: {exc}")
 
-    lines = text.splitlines()
-    total_lines = len(lines)
+    total_lines = index.line_count
     if total_lines == 0:
         return ToolOutputText(text="(file is empty)")
 
@@ -48,8 +71,10 @@ def read_text_file(
                 text=f"File only has {total_lines} lines; requested {end}."
             )
 
-    # TODO: Numbering each emitted line and clamping the overall response to
-    # ``max_output_chars`` characters, adding ``...`` when truncated.
+    # TODO: Read the slice with ``index.read_lines(start, end, max_bytes=4 *
+    # max_output_chars)`` (only the requested lines are loaded; ``lines[0]`` is
+    # line ``start``), number each emitted line and clamp the overall response
+    # to ``max_output_chars`` characters, adding ``...`` when truncated.
 
     return ToolOutputText(
         text=(
@@ -0,0 +1,114 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import re
+import threading
+from pathlib import Path
+
+from agents import ToolOutputText, function_tool
+
+from utils.trigram_index import TrigramIndex, plan_query
+from utils.workspace_path import WORKSPACE_ROOT, get_workspace, workspace_generation
+
+INDEX_PATH = Path(
+    os.getenv("REPO_GREP_INDEX_PATH", WORKSPACE_ROOT / ".cache" / "repo_grep_index.bin")
+)
+MAX_LINE_CHARS = 300
+
+_index: TrigramIndex | None = None
+_indexed_generation: int | None = None
+_index_lock = threading.Lock()
+
+
+def get_repo_index() -> TrigramIndex:
+    """Return the workspace index, refreshed when the workspace changed since the last query."""
+
+    global _index, _indexed_generation
+    with _index_lock:
+        if _index is None:
+            _index = TrigramIndex(WORKSPACE_ROOT, INDEX_PATH)
+        generation = workspace_generation()
+        # Without a watcher the generation only moves on tool writes, so always re-check.
+        if generation != _indexed_generation or get_workspace().mode == "off":
+            if _index.refresh().changed:
+                _index.save()
+            _indexed_generation = generation
+        return _index
+
+
+def search_repository(
+    pattern: str,
+    path: str = ".",
+    *,
+    fixed_strings: bool = False,
+    ignore_case: bool = False,
+    max_results: int = 100,
+) -> str:
+    """Blocking implementation of ``repo.grep``; returns the tool's text."""
+
+    flags = re.MULTILINE | (re.IGNORECASE if ignore_case else 0)
+    try:
+        regex = re.compile(re.escape(pattern) if fixed_strings else pattern, flags)
+    except re.error as exc:
+        return f"Invalid pattern '{pattern}': {exc}"
+    workspace = get_workspace()
+    try:
+        target = workspace.resolve(path)
+    except ValueError as exc:
+        return str(exc)
+    if workspace.stat(target) is None:
+        return f"{path} does not exist."
+
+    index = get_repo_index()
+    prefix = target.relative_to(index.root).as_posix() if target != index.root else ""
+    query = plan_query(pattern, fixed_strings=fixed_strings, ignore_case=ignore_case)
+    lines: list[str] = []
+    for relative, number, line in index.search(regex, query, prefix):
+        if len(lines) == max_results:
+            lines.append(f"[stopped after {max_results} matches; narrow the pattern or path]")
+            break
+        if len(line) > MAX_LINE_CHARS:
+            line = line[:MAX_LINE_CHARS] + "..."
+        lines.append(f"{relative}:{number}:{line.rstrip()}")
+    if not lines:
+        return f"No matches for '{pattern}' (searched {path})."
+    return "\n".join(lines)
+
+
+@function_tool(name_override="repo.grep")
+async def grep_repository(
+    pattern: str,
+    path: str = ".",
+    fixed_strings: bool = False,
+    ignore_case: bool = False,
+    max_results: int = 100,
+) -> ToolOutputText:
+    """
+    Search text files under a workspace directory and return ``file:line:text`` matches.
+
+    Backed by a trigram index, so only files that can contain the pattern are read.
+    Binary files are skipped.
+
+    Args:
+        pattern: Python regular expression (or a literal string with fixed_strings).
+        path: Directory or file relative to the workspace root.
+        fixed_strings: Treat pattern as a literal string, like grep -F.
+        ignore_case: Match case-insensitively, like grep -i.
+        max_results: Maximum number of matching lines to return.
+    """
+
+    if max_results < 1:
+        return ToolOutputText(text="max_results must be at least 1.")
+    text = await asyncio.to_thread(
+        search_repository,
+        pattern,
+        path,
+        fixed_strings=fixed_strings,
+        ignore_case=ignore_case,
+        max_results=max_results,
+    )
+    return ToolOutputText(text=text)
+
+
+__all__ = ["INDEX_PATH", "get_repo_index", "grep_repository", "search_repository"]
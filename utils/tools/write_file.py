@@ -1,32 +1,126 @@
-
 from __future__ import annotations
 
+import os
+import shutil
+import tempfile
+from contextlib import suppress
 from pathlib import Path
+from typing import Sequence
+
 from agents import ToolOutputText, function_tool
-from utils.workspace_path import resolve_workspace_path
+from pydantic import BaseModel
 
+from utils.file_cache import file_cache
+from utils.workspace_path import bump_workspace_generation, resolve_workspace_path
 
-WORKSPACE_ROOT = Path("/workspace").resolve()
 TASK_FILE = "stages/stage1/activity/test_read_file.py"
 
-def _replace_line_range(
-    original: str, start_line: int, end_line: int, new_block: str
-) -> str:
-    lines = original.splitlines(keepends=True)
-    total_lines = len(lines)
-    if total_lines == 0:
-        msg = "File is empty; unable to replace specific line ranges."
-        raise ValueError(msg)
-    if start_line < 1 or end_line < start_line or end_line > total_lines:
-        msg = (
-            f"Invalid range {start_line}-{end_line}. "
-            f"File currently has {total_lines} lines."
-        )
-        raise ValueError(msg)
-    start_idx = start_line - 1
-    end_idx = end_line
-    return "".join(lines[:start_idx]) + new_block + "".join(lines[end_idx:])
 
+class Hunk(BaseModel, frozen=True):
+    """Replace ``start_line..end_line`` (1-based, inclusive, original numbering) with ``content``."""
+
+    start_line: int
+    end_line: int
+    content: str
+
+
+def _ordered_hunks(hunks: Sequence[Hunk]) -> list[Hunk]:
+    """Sort ``hunks`` by position; the one place ranges are validated."""
+
+    ordered = sorted(hunks, key=lambda hunk: hunk.start_line)
+    previous_end = 0
+    for hunk in ordered:
+        if hunk.start_line < 1 or hunk.end_line < hunk.start_line:
+            msg = f"Invalid range {hunk.start_line}-{hunk.end_line}."
+            raise ValueError(msg)
+        if hunk.start_line <= previous_end:
+            msg = (
+                f"Range {hunk.start_line}-{hunk.end_line} overlaps another edit "
+                f"ending at line {previous_end}."
+            )
+            raise ValueError(msg)
+        previous_end = hunk.end_line
+    return ordered
+
+
+def apply_hunks(target: Path, hunks: Sequence[Hunk]) -> int:
+    """
+    Apply non-overlapping line-range replacements to ``target`` in one pass.
+
+    Line numbers refer to the file as it was before any hunk is applied. The
+    source is streamed line by line into a temp file in the same directory,
+    which is fsynced and swapped in with ``os.replace``: a crash leaves either
+    the old or the new file, never a truncated one. Lines end at ``\\n`` only,
+    as ``read.file`` numbers them (``utils.line_index.split_lines``). Returns
+    the original line count; raises ``ValueError`` (leaving the file
+    untouched) for bad ranges.
+    """
+    pending = iter(_ordered_hunks(hunks))
+    current = next(pending, None)
+    total_lines = 0
+    # Files the content cache would hold are also collected, to refresh it in place.
+    written: list[bytes] | None = (
+        [] if target.stat().st_size <= file_cache.max_bytes // 4 else None
+    )
+    fd, temp_name = tempfile.mkstemp(dir=target.parent, prefix=f".{target.name}.", suffix=".tmp")
+    try:
+        # Binary iteration splits on b"\n" only and keeps every other byte,
+        # including \r, exactly as it was.
+        with os.fdopen(fd, "wb") as sink, target.open("rb") as source:
+            def write(chunk: bytes) -> None:
+                sink.write(chunk)
+                if written is not None:
+                    written.append(chunk)
+
+            for total_lines, line in enumerate(source, start=1):
+                if current is None or total_lines < current.start_line:
+                    write(line)
+                    continue
+                if total_lines == current.start_line:
+                    write(current.content.encode("utf-8"))
+                if total_lines == current.end_line:
+                    current = next(pending, None)
+            sink.flush()
+            os.fsync(sink.fileno())
+        if total_lines == 0:
+            msg = "File is empty; unable to replace specific line ranges."
+            raise ValueError(msg)
+        if current is not None:
+            msg = (
+                f"Invalid range {current.start_line}-{current.end_line}. "
+                f"File currently has {total_lines} lines."
+            )
+            raise ValueError(msg)
+        shutil.copymode(target, temp_name)
+        os.replace(temp_name, target)
+    except BaseException:
+        with suppress(FileNotFoundError):
+            os.unlink(temp_name)
+        raise
+    text = None
+    if written is not None:
+        with suppress(UnicodeDecodeError):
+            text = b"".join(written).decode("utf-8")
+    if text is None:
+        file_cache.invalidate(target)
+    else:
+        file_cache.update(target, text)
+    bump_workspace_generation(target)
+    return total_lines
+
+
+def _apply(target: Path, hunks: Sequence[Hunk]) -> str | None:
+    """Apply ``hunks`` to ``target``; returns an error message on failure."""
+
+    try:
+        apply_hunks(target, hunks)
+    except FileNotFoundError:
+        return "File does not exist yet; populate it before using write.file."
+    except ValueError as exc:
+        return str(exc)
+    except OSError as exc:
+        return f"Failed to write file: {exc}"
+    return None
 
 
 @function_tool(name_override="write.file")
@@ -52,32 +146,39 @@ def write_text_file(
             text="write.file only supports line-range replacements; provide start_line and end_line."
         )
 
-    try:
-        original = target.read_text(encoding="utf-8")
-    except FileNotFoundError:
-        return ToolOutputText(
-            text="File does not exist yet; populate it before using write.file."
+    error = _apply(target, [Hunk(start_line=start_line, end_line=end_line, content=content)])
+    if error is not None:
+        return ToolOutputText(text=error)
+    return ToolOutputText(
+        text=(
+            f"Replaced lines {start_line}-{end_line} in {path} "
+            f"with {len(content)} characters."
         )
-    except OSError as exc:
-        return ToolOutputText(text=f"Failed to read file: {exc}")
+    )
+
+
+@function_tool(name_override="write.edits")
+def write_text_edits(path: str, edits: list[Hunk]) -> ToolOutputText:
+    """
+    Apply several line-range replacements to one workspace file atomically.
 
+    Args:
+        path: File path relative to the repository root.
+        edits: Non-overlapping replacements. Line numbers always refer to the
+            file before any edit, so there is no need to adjust for earlier
+            edits that add or remove lines.
+    """
     try:
-        updated = _replace_line_range(
-            original,
-            start_line,
-            end_line,
-            content,
-        )
+        target = resolve_workspace_path(path)
     except ValueError as exc:
         return ToolOutputText(text=str(exc))
+    if not edits:
+        return ToolOutputText(text="Provide at least one edit.")
 
-    try:
-        target.write_text(updated, encoding="utf-8")
-    except OSError as exc:
-        return ToolOutputText(text=f"Failed to write file: {exc}")
-    return ToolOutputText(
-        text=(
-            f"Replaced lines {start_line}-{end_line} in {path} "
-            f"with {len(content)} characters."
-        )
+    error = _apply(target, edits)
+    if error is not None:
+        return ToolOutputText(text=error)
+    ranges = ", ".join(
+        f"{hunk.start_line}-{hunk.end_line}" for hunk in sorted(edits, key=lambda h: h.start_line)
     )
+    return ToolOutputText(text=f"Applied {len(edits)} edit(s) to {path} (original lines {ranges}).")
@@ -0,0 +1,358 @@
+"""
+Span tracing for agent runs, exported as Chrome trace events or JSONL.
+
+``TracingRunHooks`` records one span per run, per agent turn sequence
+(closed at handoff or final output), per LLM call, per tool call and per
+handoff. Spans carry start/end times, token usage and payload sizes in
+characters. Open ``--trace trace.json`` output in https://ui.perfetto.dev or
+chrome://tracing; ``--trace trace.jsonl`` writes one span per line instead.
+
+Each run gets its own track. Tool calls that overlap within a run (parallel
+function calls) are spread over extra lanes so every track nests cleanly.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import atexit
+import itertools
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any
+
+from agents import Agent
+from agents.items import ModelResponse
+from agents.lifecycle import RunHooksBase
+from agents.run_context import RunContextWrapper
+from agents.tool import Tool, ToolOutputText
+
+from utils.hooks import RunScope, install_run_hooks, run_key
+
+
+def _agent_name(agent: Agent[Any]) -> str:
+    return getattr(agent, "name", agent.__class__.__name__)
+
+
+def _tool_name(tool: Tool) -> str:
+    return getattr(tool, "name", tool.__class__.__name__)
+
+
+def _payload_chars(value: Any) -> int:
+    if value is None:
+        return 0
+    if isinstance(value, ToolOutputText):
+        value = value.text
+    if isinstance(value, str):
+        return len(value)
+    return len(json.dumps(value, ensure_ascii=False, default=str))
+
+
+@dataclass
+class Span:
+    span_id: int
+    name: str
+    category: str
+    start_ns: int
+    track: int
+    parent_id: int | None = None
+    end_ns: int | None = None
+    args: dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def duration_ns(self) -> int | None:
+        return None if self.end_ns is None else self.end_ns - self.start_ns
+
+
+class Tracer:
+    """Thread-safe span store with a monotonic clock shared by all runs."""
+
+    def __init__(self) -> None:
+        self.spans: list[Span] = []
+        self.started_at = datetime.now(timezone.utc)
+        self._origin_ns = time.perf_counter_ns()
+        self._ids = itertools.count(1)
+        self._tracks: dict[int, str] = {}
+        self._lock = threading.Lock()
+
+    def now_ns(self) -> int:
+        return time.perf_counter_ns() - self._origin_ns
+
+    def name_track(self, track: int, label: str) -> None:
+        self._tracks[track] = label
+
+    def track_name(self, track: int) -> str:
+        return self._tracks.get(track, str(track))
+
+    def start(
+        self, name: str, category: str, track: int, parent: Span | None = None, **args: Any
+    ) -> Span:
+        span = Span(
+            span_id=next(self._ids),
+            name=name,
+            category=category,
+            start_ns=self.now_ns(),
+            track=track,
+            parent_id=parent.span_id if parent else None,
+            args=args,
+        )
+        with self._lock:
+            self.spans.append(span)
+        return span
+
+    def end(self, span: Span | None, **args: Any) -> None:
+        if span is None or span.end_ns is not None:
+            return
+        span.end_ns = self.now_ns()
+        span.args.update(args)
+
+    def _closed_spans(self) -> list[Span]:
+        """Snapshot of all spans; unfinished ones end now and are flagged."""
+
+        now = self.now_ns()
+        with self._lock:
+            spans = list(self.spans)
+        for span in spans:
+            if span.end_ns is None:
+                span.end_ns = now
+                span.args["unfinished"] = True
+        return spans
+
+    def chrome_trace(self) -> dict[str, Any]:
+        pid = os.getpid()
+        events: list[dict[str, Any]] = [
+            {"name": "process_name", "ph": "M", "pid": pid, "args": {"name": "agent runs"}}
+        ]
+        for track, label in sorted(self._tracks.items()):
+            events.append(
+                {"name": "thread_name", "ph": "M", "pid": pid, "tid": track, "args": {"name": label}}
+            )
+        for span in self._closed_spans():
+            events.append(
+                {
+                    "name": span.name,
+                    "cat": span.category,
+                    "ph": "X",
+                    "ts": span.start_ns / 1000,
+                    "dur": (span.end_ns - span.start_ns) / 1000,
+                    "pid": pid,
+                    "tid": span.track,
+                    "args": {"span_id": span.span_id, "parent_id": span.parent_id, **span.args},
+                }
+            )
+        return {
+            "traceEvents": events,
+            "displayTimeUnit": "ms",
+            "otherData": {"started_at": self.started_at.isoformat()},
+        }
+
+    def jsonl_lines(self) -> list[str]:
+        lines = []
+        for span in self._closed_spans():
+            record = {
+                "span_id": span.span_id,
+                "parent_id": span.parent_id,
+                "name": span.name,
+                "category": span.category,
+                "track": self.track_name(span.track),
+                "start_us": span.start_ns // 1000,
+                "end_us": span.end_ns // 1000,
+                "duration_us": (span.end_ns - span.start_ns) // 1000,
+                "args": span.args,
+            }
+            lines.append(json.dumps(record, ensure_ascii=False, default=str))
+        return lines
+
+    def write(self, path: str | Path) -> Path:
+        """Write a ``.jsonl`` span log or (any other suffix) a Chrome trace file."""
+
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        if path.suffix == ".jsonl":
+            text = "".join(line + "\n" for line in self.jsonl_lines())
+        else:
+            text = json.dumps(self.chrome_trace(), ensure_ascii=False, default=str)
+        path.write_text(text, encoding="utf-8")
+        return path
+
+
+@dataclass
+class _RunState:
+    track: int
+    span: Span
+    agent_span: Span | None = None
+    llm_span: Span | None = None
+    busy_lanes: set[int] = field(default_factory=set)
+
+
+class TracingRunHooks(RunHooksBase[Any, Agent[Any]]):
+    """
+    Record nested spans for every run these hooks are attached to.
+
+    Runs are told apart by ``run_key``, so concurrent runs can share one
+    hooks instance. A run that raises or is cancelled inside ``run_agent``
+    has its open spans ended with an ``error`` arg by ``on_run_finished``.
+    """
+
+    LANES_PER_RUN = 100
+
+    def __init__(self, tracer: Tracer | None = None) -> None:
+        self.tracer = tracer or Tracer()
+        self._runs: dict[object, _RunState] = {}
+        self._tools: dict[str, tuple[Span, _RunState, int]] = {}
+        self._run_numbers = itertools.count(1)
+
+    def _run(self, context: RunContextWrapper[Any]) -> _RunState | None:
+        return self._runs.get(run_key(context))
+
+    async def on_agent_start(self, context: RunContextWrapper[Any], agent: Agent[Any]) -> None:
+        state = self._run(context)
+        if state is None:
+            number = next(self._run_numbers)
+            track = number * self.LANES_PER_RUN
+            self.tracer.name_track(track, f"run {number}")
+            span = self.tracer.start(f"run: {_agent_name(agent)}", "run", track)
+            state = self._runs[run_key(context)] = _RunState(track=track, span=span)
+        self.tracer.end(state.agent_span)
+        state.agent_span = self.tracer.start(
+            _agent_name(agent), "agent", state.track, state.span, agent=_agent_name(agent)
+        )
+
+    async def on_agent_end(
+        self, context: RunContextWrapper[Any], agent: Agent[Any], output: Any
+    ) -> None:
+        state = self._runs.pop(run_key(context), None)
+        if state is None:
+            return
+        self.tracer.end(state.agent_span, output_chars=_payload_chars(output))
+        usage = context.usage
+        self.tracer.end(
+            state.span,
+            requests=usage.requests,
+            input_tokens=usage.input_tokens,
+            output_tokens=usage.output_tokens,
+            total_tokens=usage.total_tokens,
+        )
+
+    async def on_handoff(
+        self, context: RunContextWrapper[Any], from_agent: Agent[Any], to_agent: Agent[Any]
+    ) -> None:
+        state = self._run(context)
+        if state is None:
+            return
+        span = self.tracer.start(
+            f"handoff → {_agent_name(to_agent)}",
+            "handoff",
+            state.track,
+            state.agent_span,
+            from_agent=_agent_name(from_agent),
+            to_agent=_agent_name(to_agent),
+        )
+        self.tracer.end(span)
+        self.tracer.end(state.agent_span)
+        state.agent_span = None
+
+    async def on_llm_start(
+        self,
+        context: RunContextWrapper[Any],
+        agent: Agent[Any],
+        system_prompt: str | None,
+        input_items: list[Any],
+    ) -> None:
+        state = self._run(context)
+        if state is None:
+            return
+        state.llm_span = self.tracer.start(
+            f"llm: {_agent_name(agent)}",
+            "llm",
+            state.track,
+            state.agent_span,
+            input_items=len(input_items),
+            instructions_chars=len(system_prompt or ""),
+            input_chars=_payload_chars(input_items),
+        )
+
+    async def on_llm_end(
+        self, context: RunContextWrapper[Any], agent: Agent[Any], response: ModelResponse
+    ) -> None:
+        state = self._run(context)
+        if state is None:
+            return
+        usage = response.usage
+        self.tracer.end(
+            state.llm_span,
+            output_items=len(response.output),
+            output_chars=_payload_chars([item.model_dump() for item in response.output]),
+            input_tokens=usage.input_tokens,
+            output_tokens=usage.output_tokens,
+            total_tokens=usage.total_tokens,
+        )
+        state.llm_span = None
+
+    async def on_tool_start(
+        self, context: RunContextWrapper[Any], agent: Agent[Any], tool: Tool
+    ) -> None:
+        state = self._run(context)
+        if state is None:
+            return
+        lane = next(lane for lane in itertools.count() if lane not in state.busy_lanes)
+        state.busy_lanes.add(lane)
+        track = state.track + lane
+        if lane:
+            self.tracer.name_track(track, f"{self.tracer.track_name(state.track)} tools #{lane}")
+        span = self.tracer.start(
+            _tool_name(tool),
+            "tool",
+            track,
+            state.agent_span,
+            args_chars=_payload_chars(getattr(context, "tool_arguments", None)),
+        )
+        self._tools[getattr(context, "tool_call_id", None) or str(id(context))] = (span, state, lane)
+
+    async def on_tool_end(
+        self, context: RunContextWrapper[Any], agent: Agent[Any], tool: Tool, result: Any
+    ) -> None:
+        entry = self._tools.pop(getattr(context, "tool_call_id", None) or str(id(context)), None)
+        if entry is None:
+            return
+        span, state, lane = entry
+        state.busy_lanes.discard(lane)
+        self.tracer.end(span, result_chars=_payload_chars(result))
+
+    def on_run_finished(self, run: RunScope, error: BaseException | None) -> None:
+        state = self._runs.pop(run, None)
+        if state is None:
+            return
+        args: dict[str, Any] = {}
+        if isinstance(error, asyncio.CancelledError):
+            args["error"] = "cancelled"
+        elif error is not None:
+            args["error"] = f"{type(error).__name__}: {error}"
+        for call_id, (span, owner, _lane) in list(self._tools.items()):
+            if owner is state:
+                del self._tools[call_id]
+                self.tracer.end(span, **args)
+        self.tracer.end(state.llm_span, **args)
+        self.tracer.end(state.agent_span, **args)
+        self.tracer.end(state.span, **args)
+
+
+def enable_tracing(path: str | Path) -> TracingRunHooks:
+    """Attach tracing hooks to every run and write the trace to ``path`` at exit."""
+
+    hooks = TracingRunHooks()
+    install_run_hooks(hooks)
+
+    def write() -> None:
+        written = hooks.tracer.write(path)
+        print(f"Trace with {len(hooks.tracer.spans)} span(s) written to {written}")
+
+    atexit.register(write)
+    return hooks
+
+
+__all__ = ["Span", "Tracer", "TracingRunHooks", "enable_tracing"]
@@ -0,0 +1,419 @@
+"""
+Persistent trigram index of the workspace for ``repo.grep``.
+
+Every text file is reduced to the set of trigrams found inside its
+identifier-like runs (``[0-9a-z_]``, case-folded). A query is turned into
+the trigrams any matching file must contain - all literals of a fixed
+string, or the literal runs a regex cannot match without - and only files
+holding all of them are opened and searched. Files whose trigrams cannot be
+pinned down (large files, patterns with no literal runs) are simply searched,
+so the index only ever narrows the candidate list and never changes results.
+
+``refresh()`` walks the tree and re-indexes files whose mtime or size
+changed. The index is saved next to the model response cache, so a new
+process only pays for files that changed since the last run. The file is a
+JSON header line followed by the raw posting arrays; the workspace is
+writable by the agent, so nothing in it is ever unpickled or executed.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import re
+import sys
+import tempfile
+import threading
+from array import array
+from contextlib import suppress
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterator, Union
+
+try:
+    from re import _parser as sre_parse  # Python 3.11+
+except ImportError:  # pragma: no cover - Python 3.10
+    import sre_parse  # type: ignore[no-redef]
+
+from utils.workspace import IGNORED_DIRS
+
+logger = logging.getLogger(__name__)
+
+# Files above this size are searched on every query instead of being indexed.
+MAX_INDEXED_BYTES = 1024 * 1024
+_FORMAT_VERSION = 2
+_SNIFF_BYTES = 8192
+_TOKEN = re.compile(rb"[0-9a-z_]{3,}")
+# Non-ASCII characters that case-insensitive regexes match against i, k and s.
+_CASE_FOLDS = ((b"\xc4\xb0", b"i"), (b"\xc4\xb1", b"i"), (b"\xe2\x84\xaa", b"k"), (b"\xc5\xbf", b"s"))
+
+# A query is a literal, or ("and" | "or", [subqueries]); None means "any file".
+Query = Union[str, tuple[str, list["Query"]], None]
+
+
+def _token_trigrams(data: bytes) -> set[bytes]:
+    if not data.isascii():
+        for folded, replacement in _CASE_FOLDS:
+            data = data.replace(folded, replacement)
+    trigrams: set[bytes] = set()
+    for token in set(_TOKEN.findall(data.lower())):
+        trigrams.update(token[i : i + 3] for i in range(len(token) - 2))
+    return trigrams
+
+
+def _is_binary(data: bytes) -> bool:
+    return b"\0" in data[:_SNIFF_BYTES]
+
+
+def _literal_query(literal: str) -> Query:
+    # The index is case-folded, so one lookup serves both case modes.
+    return literal if _token_trigrams(literal.encode("utf-8")) else None
+
+
+def _regex_query(pattern: str, flags: int) -> Query:
+    """Literal runs the regex cannot match without, as an and/or query tree."""
+
+    try:
+        parsed = sre_parse.parse(pattern, flags)
+    except (re.error, RecursionError):
+        return None
+    return _sequence_query(list(parsed))
+
+
+def _sequence_query(items: list) -> Query:
+    required: list[Query] = []
+    run: list[str] = []
+
+    def flush() -> None:
+        if run:
+            required.append(_literal_query("".join(run)))
+            run.clear()
+
+    for op, av in items:
+        name = str(op)
+        if name == "LITERAL":
+            run.append(chr(av))
+            continue
+        flush()
+        if name == "SUBPATTERN":
+            required.append(_sequence_query(list(av[-1])))
+        elif name == "ATOMIC_GROUP":
+            required.append(_sequence_query(list(av)))
+        elif name in {"MAX_REPEAT", "MIN_REPEAT", "POSSESSIVE_REPEAT"}:
+            low, _high, body = av
+            if low >= 1:
+                required.append(_sequence_query(list(body)))
+        elif name == "BRANCH":
+            required.append(_any_of([_sequence_query(list(branch)) for branch in av[1]]))
+    flush()
+    return _all_of(required)
+
+
+def _all_of(queries: list[Query]) -> Query:
+    queries = [query for query in queries if query is not None]
+    if not queries:
+        return None
+    return queries[0] if len(queries) == 1 else ("and", queries)
+
+
+def _any_of(queries: list[Query]) -> Query:
+    if not queries or any(query is None for query in queries):
+        return None
+    return queries[0] if len(queries) == 1 else ("or", queries)
+
+
+def plan_query(pattern: str, *, fixed_strings: bool = False, ignore_case: bool = False) -> Query:
+    if fixed_strings:
+        return _literal_query(pattern)
+    return _regex_query(pattern, re.IGNORECASE if ignore_case else 0)
+
+
+@dataclass
+class _Entry:
+    mtime_ns: int
+    size: int
+    file_id: int
+
+
+@dataclass
+class RefreshStats:
+    scanned: int = 0
+    indexed: int = 0
+    removed: int = 0
+
+    @property
+    def changed(self) -> bool:
+        return bool(self.indexed or self.removed)
+
+
+class TrigramIndex:
+    """
+    Trigram postings for every text file under ``root``.
+
+    Postings are append-only ``array('I')`` lists of file ids. Re-indexing a
+    file gives it a new id and retires the old one, and dead ids are pruned
+    in bulk once they outnumber the live ones.
+    """
+
+    def __init__(self, root: Path, cache_path: Path | None = None) -> None:
+        self.root = root.resolve()
+        self.cache_path = cache_path
+        self._files: dict[str, _Entry] = {}
+        self._paths: list[str | None] = []
+        self._postings: dict[bytes, array] = {}
+        # Ids of files that are searched without consulting the postings.
+        self._unindexed: set[int] = set()
+        self._dead = 0
+        self._lock = threading.Lock()
+        if cache_path is not None:
+            self._load(cache_path)
+
+    @property
+    def file_count(self) -> int:
+        return len(self._files)
+
+    def _load(self, cache_path: Path) -> None:
+        try:
+            with cache_path.open("rb") as handle:
+                header = json.loads(handle.readline())
+                blob = handle.read()
+            self._decode(header, blob)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError, TypeError, KeyError, IndexError) as exc:
+            # Corrupt or foreign file: rebuild from scratch.
+            logger.warning("Ignoring unreadable trigram index %s (%s)", cache_path, exc)
+
+    def _decode(self, header: dict, blob: bytes) -> None:
+        if (
+            header.get("version") != _FORMAT_VERSION
+            or header.get("root") != str(self.root)
+            or header.get("itemsize") != array("I").itemsize
+            or header.get("byteorder") != sys.byteorder
+        ):
+            return
+        paths = header["paths"]
+        if not isinstance(paths, list) or not all(path is None or isinstance(path, str) for path in paths):
+            raise ValueError("malformed paths")
+        ids = array("I")
+        ids.frombytes(blob)
+        if sum(count for _trigram, count in header["postings"]) != len(ids) or (ids and max(ids) >= len(paths)):
+            raise ValueError("malformed postings")
+        postings: dict[bytes, array] = {}
+        offset = 0
+        for trigram, count in header["postings"]:
+            postings[trigram.encode("ascii")] = ids[offset : offset + count]
+            offset += count
+        files = {}
+        for relative, (mtime_ns, size, file_id) in header["files"].items():
+            if paths[file_id] != relative:
+                raise ValueError(f"file id mismatch for {relative!r}")
+            files[relative] = _Entry(int(mtime_ns), int(size), file_id)
+        unindexed = {int(file_id) for file_id in header["unindexed"]}
+        if any(not 0 <= file_id < len(paths) for file_id in unindexed):
+            raise ValueError("malformed unindexed ids")
+        self._files = files
+        self._paths = paths
+        self._postings = postings
+        self._unindexed = unindexed
+        self._dead = int(header["dead"])
+
+    def save(self) -> None:
+        if self.cache_path is None:
+            return
+        with self._lock:
+            header, postings = self._state()
+        self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+        handle, temp_name = tempfile.mkstemp(dir=self.cache_path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(handle, "wb") as stream:
+                stream.write(json.dumps(header, separators=(",", ":")).encode("utf-8") + b"\n")
+                for posting in postings:
+                    stream.write(posting.tobytes())
+            os.replace(temp_name, self.cache_path)
+        except BaseException:
+            with suppress(FileNotFoundError):
+                os.unlink(temp_name)
+            raise
+
+    def _state(self) -> tuple[dict, list[array]]:
+        # Copied under the lock, so a refresh can continue while the snapshot is written.
+        postings = [(trigram, array("I", posting)) for trigram, posting in self._postings.items()]
+        header = {
+            "version": _FORMAT_VERSION,
+            "root": str(self.root),
+            "itemsize": array("I").itemsize,
+            "byteorder": sys.byteorder,
+            "files": {
+                relative: [entry.mtime_ns, entry.size, entry.file_id] for relative, entry in self._files.items()
+            },
+            "paths": list(self._paths),
+            "postings": [[trigram.decode("ascii"), len(posting)] for trigram, posting in postings],
+            "unindexed": sorted(self._unindexed),
+            "dead": self._dead,
+        }
+        return header, [posting for _trigram, posting in postings]
+
+    def _walk(self) -> Iterator[tuple[str, os.stat_result]]:
+        stack = [""]
+        while stack:
+            relative = stack.pop()
+            try:
+                with os.scandir(self.root / relative) as entries:
+                    for entry in entries:
+                        name = f"{relative}/{entry.name}" if relative else entry.name
+                        if entry.is_dir(follow_symlinks=False):
+                            if entry.name not in IGNORED_DIRS:
+                                stack.append(name)
+                        elif entry.is_file(follow_symlinks=False):
+                            yield name, entry.stat(follow_symlinks=False)
+            except OSError:
+                continue
+
+    def _retire(self, entry: _Entry) -> None:
+        self._paths[entry.file_id] = None
+        self._unindexed.discard(entry.file_id)
+        self._dead += 1
+
+    def _add(self, relative: str, info: os.stat_result) -> None:
+        file_id = len(self._paths)
+        self._paths.append(relative)
+        self._files[relative] = _Entry(info.st_mtime_ns, info.st_size, file_id)
+        if info.st_size > MAX_INDEXED_BYTES:
+            self._unindexed.add(file_id)
+            return
+        try:
+            data = (self.root / relative).read_bytes()
+        except OSError:
+            self._unindexed.add(file_id)
+            return
+        if _is_binary(data):
+            return  # Never searched, like grep -I.
+        postings = self._postings
+        for trigram in _token_trigrams(data):
+            posting = postings.get(trigram)
+            if posting is None:
+                postings[trigram] = array("I", (file_id,))
+            else:
+                posting.append(file_id)
+
+    def _compact(self) -> None:
+        live = self._paths
+        for trigram, posting in list(self._postings.items()):
+            kept = array("I", (file_id for file_id in posting if live[file_id] is not None))
+            if kept:
+                self._postings[trigram] = kept
+            else:
+                del self._postings[trigram]
+        self._dead = 0
+
+    def refresh(self) -> RefreshStats:
+        """Bring the index in line with the files on disk."""
+
+        stats = RefreshStats()
+        with self._lock:
+            seen: set[str] = set()
+            for relative, info in self._walk():
+                stats.scanned += 1
+                seen.add(relative)
+                entry = self._files.get(relative)
+                if entry is not None:
+                    if entry.mtime_ns == info.st_mtime_ns and entry.size == info.st_size:
+                        continue
+                    self._retire(entry)
+                self._add(relative, info)
+                stats.indexed += 1
+            for relative in self._files.keys() - seen:
+                self._retire(self._files.pop(relative))
+                stats.removed += 1
+            if self._dead > max(len(self._files), 1000):
+                self._compact()
+        return stats
+
+    def _lookup(self, query: Query) -> set[int] | None:
+        if query is None:
+            return None
+        if isinstance(query, str):
+            trigrams = sorted(
+                _token_trigrams(query.encode("utf-8")),
+                key=lambda trigram: len(self._postings.get(trigram, ())),
+            )
+            result: set[int] | None = None
+            for trigram in trigrams:
+                posting = self._postings.get(trigram)
+                if posting is None:
+                    return set()
+                result = set(posting) if result is None else result.intersection(posting)
+                if not result:
+                    break
+            return result
+        kind, children = query
+        results = [self._lookup(child) for child in children]
+        if kind == "and":
+            narrowed = [result for result in results if result is not None]
+            if not narrowed:
+                return None
+            narrowed.sort(key=len)
+            return narrowed[0].intersection(*narrowed[1:])
+        if any(result is None for result in results):
+            return None
+        return set().union(*results)
+
+    def candidates(self, query: Query, prefix: str = "") -> list[str]:
+        """Sorted relative paths of files that may match ``query`` under ``prefix``."""
+
+        with self._lock:
+            ids = self._lookup(query)
+            if ids is None:
+                paths = list(self._files)
+            else:
+                paths = [self._paths[file_id] for file_id in ids | self._unindexed]
+        prefix = prefix.strip("/")
+        if prefix:
+            paths = [
+                path for path in paths if path is not None and (path == prefix or path.startswith(prefix + "/"))
+            ]
+        return sorted(path for path in paths if path is not None)
+
+    def search(
+        self, regex: re.Pattern[str], query: Query, prefix: str = ""
+    ) -> Iterator[tuple[str, int, str]]:
+        """Yield ``(path, line_number, line)`` for every matching line in candidate files."""
+
+        for relative in self.candidates(query, prefix):
+            try:
+                data = (self.root / relative).read_bytes()
+            except OSError:
+                continue
+            if _is_binary(data):
+                continue
+            text = data.decode("utf-8", errors="replace")
+            for number, line in matching_lines(text, regex):
+                yield relative, number, line
+
+
+def matching_lines(text: str, regex: re.Pattern[str]) -> Iterator[tuple[int, str]]:
+    """Yield ``(line_number, line)`` for lines where ``regex`` matches, like grep."""
+
+    number, counted_to = 1, 0
+    position = 0
+    while True:
+        match = regex.search(text, position)
+        if match is None or (match.start() == len(text) and text[-1:] in ("", "\n")):
+            return
+        start = text.rfind("\n", 0, match.start()) + 1
+        end = text.find("\n", match.start())
+        end = len(text) if end == -1 else end
+        line = text[start:end]
+        # A match that crosses a newline does not count; grep matches single lines.
+        if match.end() <= end or regex.search(line):
+            number += text.count("\n", counted_to, start)
+            counted_to = start
+            yield number, line
+        position = end + 1
+        if position > len(text):
+            return
+
+
+__all__ = ["MAX_INDEXED_BYTES", "RefreshStats", "TrigramIndex", "matching_lines", "plan_query"]
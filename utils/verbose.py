@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import asyncio
 import json
 import sys
 from textwrap import shorten
@@ -12,6 +13,12 @@ from agents.lifecycle import RunHooksBase
 from agents.run_context import RunContextWrapper
 from agents.tool import Tool, ToolOutputText
 
+from utils.hooks import RunHooks, combine_hooks
+from utils.log_emitter import LogEmitter, default_emitter
+from utils.tools.bash import pop_command_report
+
+END_OF_RUN_FLUSH_SECONDS = 0.1
+
 
 def _agent_name(agent: Agent[Any]) -> str:
     return getattr(agent, "name", agent.__class__.__name__)
@@ -28,6 +35,9 @@ def _compact(text: str, width: int = 96) -> str:
 class VerboseRunHooks(RunHooksBase[Any, Agent[Any]]):
     """
     Lightweight tracing hooks that print key lifecycle events while an agent runs.
+
+    Lines go through a background ``LogEmitter`` unless a custom ``emit`` is
+    given, so printing never blocks the event loop.
     """
 
     CHANNEL_COLORS = {
@@ -44,15 +54,19 @@ class VerboseRunHooks(RunHooksBase[Any, Agent[Any]]):
         emit: Callable[[str], None] | None = None,
         use_color: bool | None = None,
     ) -> None:
-        self._emit = emit or print
+        self._emitter: LogEmitter | None = None if emit else default_emitter()
+        self._emit = emit
         self._use_color = use_color if use_color is not None else sys.stdout.isatty()
 
-    def _log(self, channel: str, message: str) -> None:
+    async def _log(self, channel: str, message: str) -> None:
         prefix = f"[verbose][{channel}]"
         if self._use_color:
             color = self.CHANNEL_COLORS.get(channel, self.CHANNEL_COLORS["default"])
             prefix = f"{color}{prefix}{self.RESET_COLOR}"
-        self._emit(f"{prefix} {message}")
+        if self._emitter is not None:
+            await self._emitter.emit_async(f"{prefix} {message}")
+        else:
+            self._emit(f"{prefix} {message}")
 
     def _format_tool_args(self, context: RunContextWrapper[Any]) -> str | None:
         raw_args = getattr(context, "tool_arguments", None)
@@ -70,7 +84,7 @@ class VerboseRunHooks(RunHooksBase[Any, Agent[Any]]):
     async def on_agent_start(
         self, context: RunContextWrapper[Any], agent: Agent[Any]
     ) -> None:
-        self._log("agent", f"Starting {_agent_name(agent)}")
+        await self._log("agent", f"Starting {_agent_name(agent)}")
 
     async def on_agent_end(
         self,
@@ -80,7 +94,11 @@ class VerboseRunHooks(RunHooksBase[Any, Agent[Any]]):
     ) -> None:
         preview = _compact(str(output)) if output is not None else ""
         suffix = f": {preview}" if preview else ""
-        self._log("agent", f"Finished {_agent_name(agent)}{suffix}")
+        await self._log("agent", f"Finished {_agent_name(agent)}{suffix}")
+        if self._emitter is not None:
+            # Give queued lines a moment to reach the terminal before the caller
+            # prints the result; whatever is left is written at exit.
+            await asyncio.to_thread(self._emitter.flush, END_OF_RUN_FLUSH_SECONDS)
 
     async def on_handoff(
         self,
@@ -88,7 +106,7 @@ class VerboseRunHooks(RunHooksBase[Any, Agent[Any]]):
         from_agent: Agent[Any],
         to_agent: Agent[Any],
     ) -> None:
-        self._log("handoff", f"{_agent_name(from_agent)} → {_agent_name(to_agent)}")
+        await self._log("handoff", f"{_agent_name(from_agent)} → {_agent_name(to_agent)}")
 
     async def on_tool_start(
         self,
@@ -98,7 +116,7 @@ class VerboseRunHooks(RunHooksBase[Any, Agent[Any]]):
     ) -> None:
         args_preview = self._format_tool_args(context)
         suffix = f" args={args_preview}" if args_preview else ""
-        self._log("tool", f"{_agent_name(agent)} calling {_tool_name(tool)}{suffix}")
+        await self._log("tool", f"{_agent_name(agent)} calling {_tool_name(tool)}{suffix}")
 
     async def on_tool_end(
         self,
@@ -110,7 +128,10 @@ class VerboseRunHooks(RunHooksBase[Any, Agent[Any]]):
         result = result.text if isinstance(result, ToolOutputText) else result
         preview = _compact(result) if result else ""
         suffix = f": {preview}" if preview else ""
-        self._log("tool", f"{_agent_name(agent)} completed {_tool_name(tool)}{suffix}")
+        await self._log("tool", f"{_agent_name(agent)} completed {_tool_name(tool)}{suffix}")
+        report = pop_command_report(getattr(context, "tool_call_id", None))
+        if report is not None:
+            await self._log("tool", f"{_tool_name(tool)} cost: {report.summary()}")
 
     async def on_llm_start(
         self,
@@ -124,7 +145,7 @@ class VerboseRunHooks(RunHooksBase[Any, Agent[Any]]):
             if system_prompt
             else "default system prompt"
         )
-        # self._log(
+        # await self._log(
         #     "llm",
         #     f"{_agent_name(agent)} prompting model ({len(input_items)} input item(s), prompt: {prompt_hint})",
         # )
@@ -136,20 +157,19 @@ class VerboseRunHooks(RunHooksBase[Any, Agent[Any]]):
         response: ModelResponse,
     ) -> None:
         if response.output and isinstance(response.output[0], ResponseOutputMessage):
-            self._log(
+            await self._log(
                 "llm",
                 f"Response content: {response.output[0].content[0].text}",
             )
 
 
-def build_verbose_hooks(enabled: bool) -> VerboseRunHooks | None:
+def build_verbose_hooks(enabled: bool) -> RunHooks | None:
     """
-    Convenience helper that returns VerboseRunHooks when tracing is enabled.
+    Convenience helper that returns VerboseRunHooks when verbose logging is
+    enabled, combined with any hooks installed by CLI flags such as --trace.
     """
 
-    if not enabled:
-        return None
-    return VerboseRunHooks()
+    return combine_hooks(VerboseRunHooks() if enabled else None)
 
 
 __all__ = ["VerboseRunHooks", "build_verbose_hooks"]
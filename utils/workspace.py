@@ -0,0 +1,343 @@
+"""
+Watched workspace metadata shared by every tool.
+
+``WorkspaceService`` memoizes path resolution and ``stat`` results for the
+workspace tree and keeps them fresh with an inotify watcher (Linux, via
+ctypes, no extra dependency), falling back to periodic polling elsewhere or
+when inotify watches run out. Every observed change, and every write a tool
+reports through ``bump()``, advances ``generation``, a monotonically
+increasing counter other caches can key on.
+
+Set ``WORKSPACE_WATCH`` to ``inotify``, ``poll`` or ``off`` to force a mode
+(default ``auto``) and ``WORKSPACE_POLL_SECONDS`` to tune polling. Trees with
+more than ``MAX_WATCHED_ENTRIES`` directories (inotify) or entries (polling)
+drop to ``off``, where nothing is memoized and callers always re-check.
+"""
+
+from __future__ import annotations
+
+import ctypes
+import ctypes.util
+import errno
+import logging
+import os
+import select
+import struct
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+WATCH_MODE = os.getenv("WORKSPACE_WATCH", "auto")
+POLL_INTERVAL = float(os.getenv("WORKSPACE_POLL_SECONDS", "2"))
+# Churny directories whose contents the tools never need fresh metadata for.
+IGNORED_DIRS = frozenset({".git", "__pycache__", ".cache", ".venv", "node_modules"})
+MAX_WATCHED_ENTRIES = 20000
+_MEMO_SIZE = 4096
+
+_IN_MODIFY = 0x002
+_IN_ATTRIB = 0x004
+_IN_MOVED_FROM = 0x040
+_IN_MOVED_TO = 0x080
+_IN_CREATE = 0x100
+_IN_DELETE = 0x200
+_IN_DELETE_SELF = 0x400
+_IN_MOVE_SELF = 0x800
+_IN_Q_OVERFLOW = 0x4000
+_IN_IGNORED = 0x8000
+_IN_ISDIR = 0x40000000
+_IN_NONBLOCK = os.O_NONBLOCK
+_IN_CLOEXEC = 0o2000000
+_WATCH_MASK = (
+    _IN_MODIFY
+    | _IN_ATTRIB
+    | _IN_MOVED_FROM
+    | _IN_MOVED_TO
+    | _IN_CREATE
+    | _IN_DELETE
+    | _IN_DELETE_SELF
+    | _IN_MOVE_SELF
+)
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+class _Memo(OrderedDict):
+    """Small LRU dict."""
+
+    def remember(self, key, value):
+        self[key] = value
+        self.move_to_end(key)
+        if len(self) > _MEMO_SIZE:
+            self.popitem(last=False)
+        return value
+
+
+def _walk_dirs(root: Path):
+    """Yield every directory under ``root`` except ignored ones."""
+
+    stack = [root]
+    while stack:
+        directory = stack.pop()
+        yield directory
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False) and entry.name not in IGNORED_DIRS:
+                        stack.append(Path(entry.path))
+        except OSError:
+            continue
+
+
+class _InotifyWatcher:
+    def __init__(self, service: WorkspaceService) -> None:
+        libc_name = ctypes.util.find_library("c")
+        if not libc_name:
+            raise OSError("libc not found")
+        self._libc = ctypes.CDLL(libc_name, use_errno=True)
+        fd = self._libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+        if fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._fd = fd
+        self._service = service
+        self._watches: dict[int, Path] = {}
+        try:
+            for directory in _walk_dirs(service.root):
+                self._add_watch(directory)
+        except OSError:
+            os.close(fd)
+            raise
+
+    def _add_watch(self, directory: Path) -> None:
+        if len(self._watches) >= MAX_WATCHED_ENTRIES:
+            raise OSError(errno.ENOSPC, "too many directories to watch")
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(directory), _WATCH_MASK)
+        if wd < 0:
+            code = ctypes.get_errno()
+            if code in (errno.ENOENT, errno.ENOTDIR, errno.EACCES):
+                return
+            raise OSError(code, f"inotify_add_watch failed for {directory}")
+        self._watches[wd] = directory
+
+    def run(self, stop: threading.Event) -> None:
+        try:
+            while not stop.is_set():
+                ready, _, _ = select.select([self._fd], [], [], 0.5)
+                if not ready:
+                    continue
+                try:
+                    data = os.read(self._fd, 64 * 1024)
+                except BlockingIOError:
+                    continue
+                self._dispatch(data)
+        finally:
+            os.close(self._fd)
+
+    def _dispatch(self, data: bytes) -> None:
+        changed: list[Path | None] = []
+        offset = 0
+        while offset < len(data):
+            wd, mask, _cookie, length = _EVENT_HEADER.unpack_from(data, offset)
+            raw_name = data[offset + _EVENT_HEADER.size : offset + _EVENT_HEADER.size + length]
+            offset += _EVENT_HEADER.size + length
+            if mask & _IN_Q_OVERFLOW:
+                changed.append(None)
+                continue
+            if mask & _IN_IGNORED:
+                self._watches.pop(wd, None)
+                continue
+            directory = self._watches.get(wd)
+            if directory is None:
+                continue
+            name = os.fsdecode(raw_name.rstrip(b"\0"))
+            if name in IGNORED_DIRS:
+                continue
+            path = directory / name if name else directory
+            if mask & _IN_ISDIR and mask & (_IN_CREATE | _IN_MOVED_TO):
+                for subdirectory in _walk_dirs(path):
+                    self._add_watch(subdirectory)
+            changed.append(path)
+        if changed:
+            self._service.notify_changed(None if None in changed else changed)
+
+
+class _PollingWatcher:
+    def __init__(self, service: WorkspaceService, interval: float) -> None:
+        self._service = service
+        self._interval = interval
+        self._snapshot = self._scan()
+
+    def _scan(self) -> dict[Path, tuple[int, int]]:
+        """
+        Snapshot every entry's mtime and size. Raises ``OSError(ENOSPC)``
+        past ``MAX_WATCHED_ENTRIES``: a partial snapshot would miss changes.
+        """
+
+        snapshot: dict[Path, tuple[int, int]] = {}
+        for directory in _walk_dirs(self._service.root):
+            try:
+                with os.scandir(directory) as entries:
+                    for entry in entries:
+                        if entry.name in IGNORED_DIRS:
+                            continue
+                        info = entry.stat(follow_symlinks=False)
+                        snapshot[Path(entry.path)] = (info.st_mtime_ns, info.st_size)
+            except OSError:
+                continue
+            if len(snapshot) > MAX_WATCHED_ENTRIES:
+                raise OSError(errno.ENOSPC, f"more than {MAX_WATCHED_ENTRIES} entries to poll")
+        return snapshot
+
+    def run(self, stop: threading.Event) -> None:
+        while not stop.wait(self._interval):
+            current = self._scan()
+            previous, self._snapshot = self._snapshot, current
+            changed = [path for path in current.keys() | previous.keys() if current.get(path) != previous.get(path)]
+            if changed:
+                self._service.notify_changed(changed)
+
+
+class WorkspaceService:
+    """
+    Memoized path resolution and ``stat`` for one workspace root.
+
+    ``resolve()`` maps a relative (or absolute) path to its real location and
+    refuses anything that escapes the root. Both lookups are cached until the
+    watcher reports a change: resolution memos are dropped on any change
+    (symlinks and creations affect them), stat entries per changed path.
+    Resolutions are only memoized under inotify, so the escape check never
+    trusts a polled or unwatched tree.
+    """
+
+    def __init__(self, root: Path, watch: str = WATCH_MODE, poll_interval: float = POLL_INTERVAL) -> None:
+        self.root = root.resolve()
+        self.mode = "off"
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._resolved: _Memo = _Memo()
+        self._stats: _Memo = _Memo()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        if watch != "off":
+            self._start_watcher(watch, poll_interval)
+
+    def _start_watcher(self, watch: str, poll_interval: float) -> None:
+        watcher: _InotifyWatcher | _PollingWatcher | None = None
+        if watch in {"auto", "inotify"}:
+            try:
+                watcher = _InotifyWatcher(self)
+                self.mode = "inotify"
+            except (OSError, AttributeError) as exc:
+                logger.info("inotify unavailable (%s); polling the workspace instead", exc)
+        if watcher is None:
+            try:
+                watcher = _PollingWatcher(self, poll_interval)
+            except OSError as exc:
+                self._stop_watching(exc)
+                return
+            self.mode = "poll"
+        self._thread = threading.Thread(
+            target=self._watch, args=(watcher,), name="workspace-watcher", daemon=True
+        )
+        self._thread.start()
+
+    def _watch(self, watcher: _InotifyWatcher | _PollingWatcher) -> None:
+        try:
+            watcher.run(self._stop)
+        except OSError as exc:
+            if self._stop.is_set():
+                return
+            if isinstance(watcher, _PollingWatcher):
+                self._stop_watching(exc)
+                return
+            # e.g. watch limit hit while following new directories.
+            logger.info("workspace watcher failed (%s); switching to polling", exc)
+            self.notify_changed(None)
+            try:
+                poller = _PollingWatcher(self, POLL_INTERVAL)
+            except OSError as poll_exc:
+                self._stop_watching(poll_exc)
+                return
+            self.mode = "poll"
+            self._watch(poller)
+
+    def _stop_watching(self, reason: OSError) -> None:
+        """
+        Fall back to ``off``: nothing is memoized and callers re-check the
+        disk, since changes past the watch budget would go unnoticed.
+        """
+
+        logger.warning(
+            "workspace too large to watch (%s); metadata is no longer cached", reason
+        )
+        self.mode = "off"
+        self.notify_changed(None)
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    def bump(self, path: Path | None = None) -> int:
+        """Record a change made by this process (e.g. a tool write)."""
+
+        return self.notify_changed(None if path is None else [path])
+
+    def notify_changed(self, paths: list[Path] | None) -> int:
+        """Invalidate metadata for ``paths`` (everything when None) and advance the generation."""
+
+        with self._lock:
+            self._generation += 1
+            self._resolved.clear()
+            if paths is None:
+                self._stats.clear()
+            else:
+                for path in paths:
+                    self._stats.pop(path, None)
+                    self._stats.pop(path.parent, None)
+            return self._generation
+
+    def resolve(self, path: str | Path) -> Path:
+        key = str(path)
+        # A memo skips the escape check, so only trust one while inotify drops
+        # it as soon as a symlink changes; polling would leave a window.
+        memoize = self.mode == "inotify"
+        if memoize:
+            with self._lock:
+                cached = self._resolved.get(key)
+            if cached is not None:
+                return cached
+        candidate = Path(path)
+        if not candidate.is_absolute():
+            candidate = self.root / candidate
+        resolved = candidate.resolve()
+        if resolved != self.root and self.root not in resolved.parents:
+            msg = f"Path escape blocked for '{path}'. Stay inside {self.root}."
+            raise ValueError(msg)
+        if not memoize:
+            return resolved
+        with self._lock:
+            return self._resolved.remember(key, resolved)
+
+    def stat(self, path: Path) -> os.stat_result | None:
+        """Cached ``os.stat`` of a resolved path; None when it does not exist."""
+
+        with self._lock:
+            if path in self._stats:
+                self._stats.move_to_end(path)
+                return self._stats[path]
+        try:
+            info: os.stat_result | None = os.stat(path)
+        except (FileNotFoundError, NotADirectoryError):
+            info = None
+        if self.mode == "off":
+            return info
+        with self._lock:
+            return self._stats.remember(path, info)
+
+    def close(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+
+
+__all__ = ["IGNORED_DIRS", "WorkspaceService"]
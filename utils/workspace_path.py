@@ -1,21 +1,53 @@
+import stat
+import threading
 from pathlib import Path
 
+from utils.workspace import WorkspaceService
+
 WORKSPACE_ROOT = Path(__file__).resolve().parent.parent
 
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_workspace() -> WorkspaceService:
+    """Return the process-wide workspace service, starting its watcher on first use."""
+
+    global _service
+    if _service is None:
+        with _service_lock:
+            if _service is None:
+                _service = WorkspaceService(WORKSPACE_ROOT)
+    return _service
+
+
+# Advanced by the watcher and by tools that modify the workspace so read caches
+# can drop stale entries.
+def workspace_generation() -> int:
+    return get_workspace().generation
+
+
+def bump_workspace_generation(path: Path | None = None) -> int:
+    return get_workspace().bump(path)
+
+
 def resolve_workspace_path(path: str, *, ensure_parent: bool = True) -> Path:
-    candidate = Path(path)
-    if not candidate.is_absolute():
-        candidate = WORKSPACE_ROOT / path
-    resolved = candidate.resolve()
-    if not str(resolved).startswith(str(WORKSPACE_ROOT)):
-        msg = f"Path escape blocked for '{path}'. Stay inside {WORKSPACE_ROOT}."
-        raise ValueError(msg)
-    if resolved.is_dir():
+    workspace = get_workspace()
+    resolved = workspace.resolve(path)
+    info = workspace.stat(resolved)
+    if info is not None and stat.S_ISDIR(info.st_mode):
         msg = f"'{path}' is a directory. write.file targets files only."
         raise ValueError(msg)
-    if ensure_parent:
+    if ensure_parent and workspace.stat(resolved.parent) is None:
         resolved.parent.mkdir(parents=True, exist_ok=True)
+        workspace.bump(resolved.parent)
     return resolved
 
 
-__all__ = ["WORKSPACE_ROOT", "resolve_workspace_path"]
\ No newline at end of file
+__all__ = [
+    "WORKSPACE_ROOT",
+    "bump_workspace_generation",
+    "get_workspace",
+    "resolve_workspace_path",
+    "workspace_generation",
+]